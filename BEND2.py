@@ -3,7 +3,8 @@
 # 各出力設定で複数回実験を行い、平均誤差を算出して最適な出力設定を特定します
 
 from setup import initialize_robot  # ロボット初期化関数をインポート
-from pybricks.tools import wait     # 待機時間制御用
+from pybricks.tools import run_task  # 非同期の実験を実行するため
+from sweep import make_grid, run_sweep, print_table, print_tradeoff  # 条件の組み合わせ実験
 
 # ===== 実験パラメータの設定 =====
 # モーター出力リスト（10%〜100%）
@@ -15,8 +16,13 @@ power_list = [10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
 angle = 60
 
 # 各条件での実験回数
-# 統計的な信頼性を確保するため、複数回実験
-repeat_num = 3
+# 固定回数ではなく、平均誤差の信頼区間が十分狭くなるまで実験を追加する
+repeat_num = 2      # 最少実験回数
+max_trials = 8      # 最多実験回数
+ci_width_deg = 1.0  # 平均誤差の95%信頼区間の幅の目標 [度]
+
+# 最も速い出力を選ぶときの許容誤差 [度]（ミッションの区間ごとに使い分ける）
+tolerances_deg = [0.5, 1.0, 2.0]
 
 # ===== ロボットの初期化 =====
 # 最初に一度だけ初期化
@@ -27,83 +33,23 @@ hub, left, right, robot = initialize_robot(
     motor_power_percent=100    # 仮の値（後でdcで上書き）
 )
 
-# ===== 実験結果を格納するリスト =====
-all_results = []  # 全ての結果を記録するリスト
+# ===== 実験条件の作成 =====
+# 出力ごとに1条件（出力は最大旋回速度500deg/sに対する割合として旋回速度に反映）
+conditions = make_grid(("power", power_list), ("angle", [angle]))
 
-# ===== 各出力設定での実験ループ =====
-for power in power_list:
-    print(f"\n==============================")
-    print(f"モーター出力: {power}% で実験開始")
-    print(f"==============================")
-    
-    # 出力を設定
-    # robot.settings()で旋回速度を設定（left.dc()とright.dc()の代わり）
-    # power/100で0.0〜1.0の範囲に正規化し、旋回速度として設定
-    # 最大旋回速度500deg/sに対する割合として設定
-    turn_rate = 500 * (power / 100)  # deg/s単位
-    robot.settings(turn_rate=turn_rate)
-    
-    # この出力設定での誤差を記録するリスト
-    errors = []      # 符号付き誤差（正負の値）
-    abs_errors = []  # 絶対誤差（常に正の値）
-    
-    # ===== 各実験回数のループ =====
-    for trial in range(1, repeat_num + 1):
-        print(f"\n--- [出力{power}% 角度{angle}度] 実験{trial}/{repeat_num} ---")
-        
-        # ロボットを指定角度だけ回転させる
-        robot.turn(angle)
-        
-        # 回転完了を待つ（1秒）
-        wait(1000)
-        
-        # 現在の向きを取得（IMUセンサーから）
-        current_heading = hub.imu.heading()
-        
-        # 誤差を計算
-        # 正の値：目標より多く回転、負の値：目標より少なく回転
-        error = current_heading - angle
-        errors.append(error)
-        abs_errors.append(abs(error))
-        
-        # 結果を表示
-        sign = "+" if error >= 0 else "-"
-        print(f"→ 実際の向き: {current_heading:.1f}度")
-        print(f"→ 誤差: {sign}{abs(error):.1f}度")
-        print("-------------------------------")
-        
-        # ロボットを停止
-        robot.stop()
-        wait(200)  # 停止を確実にするため少し待機
-        
-        # センサーをリセット（次の実験のため）
-        hub.imu.reset_heading(0)
-        wait(500)  # リセット完了を待つ
-    
-    # ===== この出力設定での統計計算 =====
-    # 平均誤差計算（符号付き）
-    mean_error = sum(errors) / repeat_num
-    # 平均絶対誤差計算（精度の指標）
-    mean_abs_error = sum(abs_errors) / repeat_num
-    
-    # 結果をリストに追加
-    all_results.append((power, mean_error, mean_abs_error, repeat_num))
+# ===== 各条件での実験 =====
+# 各条件で repeat_num〜max_trials 回旋回し、静止するのを待って heading の誤差を測る
+# 1条件ごとに結果がハブに保存されるので、途中で止めても続きから再開できる
+results = run_task(run_sweep(hub, robot, "turn", conditions, repeat_num,
+                             ci_width=ci_width_deg, max_trials=max_trials))
 
 # ===== 結果の表示 =====
 # 罫線付き表形式で結果を出力
 print(f"\n=== 60度曲げ精度テスト結果（Gemini-2.5-pro） ===")
-print("+------------+----------------+-------------------+------------+")
-print("| 出力[%]    | 平均誤差[度]   | 平均絶対誤差[度]   | 実験回数   |")
-print("+------------+----------------+-------------------+------------+")
-
-# 各出力設定の結果を表形式で表示
-for power, mean_error, mean_abs_error, repeat_num in all_results:
-    # 符号を決定（正の誤差は+、負の誤差は-）
-    sign = "+" if mean_error >= 0 else "-"
-    # 表形式で出力（右寄せで整列）
-    print(f"| {power:>10} |   {sign}{abs(mean_error):>8.2f}   |      {mean_abs_error:>8.2f}      | {repeat_num:>6}    |")
+print_table(results, ("power",), "度")
 
-print("+------------+----------------+-------------------+------------+")
+# 時間と誤差のパレートフロントと、許容誤差ごとの最も速い出力
+print_tradeoff(results, ("power",), "度", tolerances_deg)
 
 # ===== 結果の解釈 =====
 # 平均絶対誤差が最も小さい出力設定が、最も精度が高い
@@ -3,23 +3,11 @@ from pybricks.parameters import Port, Axis, Direction, Stop
 from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
 from pybricks.tools import wait, multitask, run_task
-
-# ───────────────────────────────────────────
-# 1) ハブの向きを宣言 ★USB の向きを合わせる★
-# ───────────────────────────────────────────
-hub = PrimeHub(top_side=Axis.Z,
-               front_side=Axis.X)
-
-# ───────────────────────────────────────────
-# 2) モーターの極性を宣言 ★タイヤが"前"へ回る向きか確認★
-# ───────────────────────────────────────────
-left  = Motor(Port.F, positive_direction=Direction.COUNTERCLOCKWISE)
-right = Motor(Port.B, positive_direction=Direction.CLOCKWISE)
-
-lift = Motor(Port.A, positive_direction=Direction.CLOCKWISE)
-
-# ロボットパラメータ（実測に合わせると直進精度↑）
-robot = DriveBase(left, right, wheel_diameter=56, axle_track=115)
+from telemetry import TelemetryRecorder
+from mission import run_table, print_profile
+from motion import table_rows, report_time_saved
+from odometry import Odometry
+from calibration import load_calibration
 
 # 走行設定
 FIRST_STRAIGHT_DISTANCE_MM = 260
@@ -27,6 +15,25 @@ TURN_ANGLE_DEG = -45
 TO_TOWER_DISTANCE_MM = 670
 LIFT_ARM_TURN_ANGLE = 500
 LIFT_ARM_TURN_SPEED = 180
+CORNER_RADIUS_MM = 80          # 旋回の代わりに走る円弧の半径
+LIFT_START_DISTANCE_MM = 650   # この距離を走ったらタワーに着く前にアームを上げ始める
+
+# タワーまでの道のり（その場旋回で書き、table_rows() が角を円弧に置き換える）
+ROUTE = (
+    ("straight", FIRST_STRAIGHT_DISTANCE_MM),
+    ("turn", TURN_ANGLE_DEG),
+    ("straight", TO_TOWER_DISTANCE_MM),
+)
+
+# ミッションのステップ表 (op, arg, speed, then, timeout)（書き方は mission.py を参照）
+# 止まらずに円弧で曲がってタワーへ向かい、走行の途中からアームを上げ始める
+MISSION = table_rows(ROUTE, CORNER_RADIUS_MM, wait_last=False) + (
+    ("D", LIFT_START_DISTANCE_MM, None, None, None),
+    ("L&", LIFT_ARM_TURN_ANGLE, LIFT_ARM_TURN_SPEED, None, None),
+    ("J", None, None, None, 5000),          # タワーに着いてアームが上がりきるまで
+    ("W", 1000, None, None, None),
+    ("L", 0, LIFT_ARM_TURN_SPEED, None, None),
+)
 
 # --- PIDゲイン変数の定義 ---
 DISTANCE_KP = 1000
@@ -37,90 +44,97 @@ HEADING_KP = 2000
 HEADING_KI = 50
 HEADING_KD = 100
 
-# --- PIDゲインの設定 ---
-robot.distance_control.pid(
-    kp=DISTANCE_KP,
-    ki=DISTANCE_KI,
-    kd=DISTANCE_KD
-)
-
-robot.heading_control.pid(
-    kp=HEADING_KP,
-    ki=HEADING_KI,
-    kd=HEADING_KD
-)
-
 # ───────────────────────────────────────────
-# 3) ジャイロ PID を有効化し、計測を初期化
+# ロボットの準備（import しただけではハブやモーターに触らない）
 # ───────────────────────────────────────────
-robot.use_gyro(True)
-hub.imu.reset_heading(0)
-robot.reset()
-lift.reset_angle(0)
 
+def setup_robot():
+    """ハブ・モーター・DriveBase を作って初期化し、(hub, left, right, robot, lift, calibration) を返す"""
+    # 1) ハブの向きを宣言 ★USB の向きを合わせる★
+    hub = PrimeHub(top_side=Axis.Z,
+                   front_side=Axis.X)
+
+    # 2) モーターの極性を宣言 ★タイヤが"前"へ回る向きか確認★
+    left  = Motor(Port.F, positive_direction=Direction.COUNTERCLOCKWISE)
+    right = Motor(Port.B, positive_direction=Direction.CLOCKWISE)
+
+    lift = Motor(Port.A, positive_direction=Direction.CLOCKWISE)
+
+    # ロボットパラメータ（実測に合わせると直進精度↑）
+    # 保存済みのキャリブレーション値（なければ既定値）。Odometry にも同じタイヤ径を渡す
+    calibration = load_calibration(hub)
+    robot = DriveBase(left, right, wheel_diameter=calibration["wheel_diameter"],
+                      axle_track=calibration["axle_track"])
+
+    # --- PIDゲインの設定 ---
+    robot.distance_control.pid(
+        kp=DISTANCE_KP,
+        ki=DISTANCE_KI,
+        kd=DISTANCE_KD
+    )
+
+    robot.heading_control.pid(
+        kp=HEADING_KP,
+        ki=HEADING_KI,
+        kd=HEADING_KD
+    )
+
+    # 3) ジャイロ PID を有効化し、計測を初期化
+    robot.use_gyro(True)
+    hub.imu.reset_heading(0)
+    robot.reset()
+    lift.reset_angle(0)
+    return hub, left, right, robot, lift, calibration
 
 
 # ───────────────────────────────────────────
 # 非同期タスクの定義
 # ───────────────────────────────────────────
 
-async def sensor_logger_task():
-    """
-    センサー値を定期的にターミナルに表示する非同期タスク。
-    他のタスク（ロボットの移動）と並行して実行されます。
-    """
-    print("--- センサーログタスク開始 ---")
-    while True: # プログラムが終了するまで継続的にログを出力
-        heading = hub.imu.heading()
-        left_deg = left.angle()
-        right_deg = right.angle()
-        dist = robot.distance()
-        print(f"LOG: dist={dist:4.0f} mm  heading={heading:4.0f}°  L={left_deg:5.0f}°  R={right_deg:5.0f}°")
-        await wait(1000) # 100ミリ秒待機して、他のタスクに実行を譲る
-
-async def main_robot_sequence_task():
-    print("Start Go Forward")
-    await robot.straight(FIRST_STRAIGHT_DISTANCE_MM)
-    print("Stop")
-    
-    await wait(1000)
-    
-    print("Start Turn To Mission Tower")
-    await robot.turn(TURN_ANGLE_DEG)
-    print("Stop")
-    
-    await wait(1000)
-    
-    print("Start Go To Mission Tower")
-    await robot.straight(TO_TOWER_DISTANCE_MM)
-    print("Stop")
-
-    await wait(1000)
-    
-    print("Start Lifting Tower")
-    await lift.run_target(LIFT_ARM_TURN_SPEED, LIFT_ARM_TURN_ANGLE)
-
-    await wait(1000)
-
-    print("Return")
-    await lift.run_target(LIFT_ARM_TURN_SPEED, 0)
+async def main_robot_sequence_task(robot, lift):
+    """ミッション本体（change_projects.py からも robot と lift を渡して呼び出す）"""
+    print("Start Mission Tower")
+    starts, stops, ends = await run_table(robot, lift, MISSION)
+    print_profile(MISSION, starts, stops, ends)
+    # 走行が終わった時刻（"J" の停止）を、停止して待つ書き方の推定時間と比べる
+    join = [row[0] for row in MISSION].index("J")
+    report_time_saved(robot, ROUTE, stops[join])
     print("Mission Complete")
 
     robot.stop()
 
 
-
 # ───────────────────────────────────────────
 # プログラムの実行
 # ───────────────────────────────────────────
 
-# run_task() を使うことで、main_robot_sequence_task が完了するまで
-# プログラム全体が終了しないようにします。
-# sensor_logger_task は main_robot_sequence_task と並行して動作します。
-# run_task() が終わると、他のすべてのタスクも停止します。
-run_task(multitask(
-    sensor_logger_task(),         # センサー値を継続的にログに出力するタスク
-    main_robot_sequence_task()    # ロボットの移動シーケンスを実行するタスク
-))
+def run_mission():
+    """このファイルだけで実行するときの入口"""
+    hub, left, right, robot, lift, calibration = setup_robot()
+
+    # センサー値を20ミリ秒周期でバッファに記録し、走行後にまとめて出力する
+    # （走行中の print による割り込みと BLE 通信をなくすため）
+    recorder = TelemetryRecorder(hub, left, right, robot, period_ms=20)
+
+    # run_task() を使うことで、main_robot_sequence_task が完了するまで
+    # プログラム全体が終了しないようにします。
+    # recorder.run() は main_robot_sequence_task と並行して動作します。
+    # race=True なので、移動シーケンスが終わると記録タスクも停止します。
+    # タイヤの回転と IMU から位置 (x, y, heading) を推定し、走行のずれを確認できるようにする
+    odometry = Odometry(hub, left, right, calibration["wheel_diameter"])
+
+    run_task(multitask(
+        recorder.run(),                             # センサー値をバッファに記録するタスク
+        odometry.run(),                             # 位置を推定するタスク
+        main_robot_sequence_task(robot, lift),      # ロボットの移動シーケンスを実行するタスク
+        race=True
+    ))
+
+    recorder.dump()  # 記録したセンサーログをまとめて出力
+    odometry.print_pose("終了位置")
+
+    print("Finished! (すべてのタスクが完了しました)") # この行はタスク完了後に実行される
+
 
-print("Finished! (すべてのタスクが完了しました)") # この行はタスク完了後に実行される
\ No newline at end of file
+if __name__ == "__main__":
+    run_mission()
@@ -3,6 +3,11 @@ from pybricks.parameters import Port, Axis, Direction, Stop
 from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
 from pybricks.tools import wait, multitask, run_task
+from telemetry import TelemetryRecorder
+from mission import run_table, print_profile
+from motion import table_rows, report_time_saved
+from settle import wait_until_settled_async
+from heading import HeadingReference
 
 def setup_hub():
     """ハブの向きを設定"""
@@ -80,50 +85,40 @@ def get_mission_parameters():
         'TURN_ANGLE_DEG': -45,
         'TO_TOWER_DISTANCE_MM': 710,
         'LIFT_ARM_TURN_ANGLE': 500,
-        'LIFT_ARM_TURN_SPEED': 180
+        'LIFT_ARM_TURN_SPEED': 180,
+        'CORNER_RADIUS_MM': 80,         # 旋回の代わりに走る円弧の半径
+        'LIFT_START_DISTANCE_MM': 690   # この距離を走ったらアームを上げ始める
     }
 
-async def sensor_logger_task(hub, left, right, robot):
-    """
-    センサー値を定期的にターミナルに表示する非同期タスク。
-    他のタスク（ロボットの移動）と並行して実行されます。
-    """
-    print("--- センサーログタスク開始 ---")
-    while True: # プログラムが終了するまで継続的にログを出力
-        heading = hub.imu.heading()
-        left_deg = left.angle()
-        right_deg = right.angle()
-        dist = robot.distance()
-        print(f"LOG: dist={dist:4.0f} mm  heading={heading:4.0f}°  L={left_deg:5.0f}°  R={right_deg:5.0f}°")
-        await wait(200) # 100ミリ秒待機して、他のタスクに実行を譲る
+def get_route(params):
+    """タワーまでの道のり（その場旋回で書き、table_rows() が角を円弧に置き換える）"""
+    return (
+        ("straight", params['FIRST_STRAIGHT_DISTANCE_MM']),
+        ("turn", params['TURN_ANGLE_DEG']),
+        ("straight", params['TO_TOWER_DISTANCE_MM']),
+    )
+
+def get_mission_table(params):
+    """ミッションのステップ表 (op, arg, speed, then, timeout) を作る（書き方は mission.py を参照）"""
+    speed = params['LIFT_ARM_TURN_SPEED']
+    # 止まらずに円弧で曲がってタワーへ向かい、走行の途中からアームを上げ始める
+    return table_rows(get_route(params), params['CORNER_RADIUS_MM'], wait_last=False) + (
+        ("D", params['LIFT_START_DISTANCE_MM'], None, None, None),
+        ("L&", params['LIFT_ARM_TURN_ANGLE'], speed, None, None),
+        ("J", None, None, None, 5000),          # タワーに着いてアームが上がりきるまで
+        ("W", 1000, None, None, None),
+        ("L", 0, speed, None, None),
+    )
 
 async def main_robot_sequence_task(robot, lift, params):
     """メインのロボット動作シーケンス"""
-    print("Start Go Forward")
-    await robot.straight(params['FIRST_STRAIGHT_DISTANCE_MM'])
-    print("Stop")
-    
-    await wait(1000)
-    
-    print("Start Turn To Mission Tower")
-    await robot.turn(params['TURN_ANGLE_DEG'])
-    print("Stop")
-    
-    await wait(1000)
-    
+    table = get_mission_table(params)
     print("Start Go To Mission Tower")
-    await robot.straight(params['TO_TOWER_DISTANCE_MM'])
-    print("Stop")
-
-    await wait(1000)
-    
-    print("Start Lifting Tower")
-    await lift.run_target(params['LIFT_ARM_TURN_SPEED'], params['LIFT_ARM_TURN_ANGLE'])
-
-    await wait(1000)
-
-    print("Return")
-    await lift.run_target(params['LIFT_ARM_TURN_SPEED'], 0)
+    starts, stops, ends = await run_table(robot, lift, table)
+    print_profile(table, starts, stops, ends)
+    # 走行が終わった時刻（"J" の停止）を、停止して待つ書き方の推定時間と比べる
+    join = [row[0] for row in table].index("J")
+    report_time_saved(robot, get_route(params), stops[join])
     print("Mission Complete")
 
     robot.stop()
@@ -131,17 +126,18 @@ async def main_robot_sequence_task(robot, lift, params):
 async def turn_test(robot, hub):
     """旋回テスト機能"""
     set_angle = 30
-    for i in range(1, (180/set_angle)+1, 1): 
+    reference = HeadingReference(hub)
+    for i in range(1, 180 // set_angle + 1, 1): 
         angle = set_angle * i
         print(f"setting_angles = {angle:4.0f}°")
         await robot.turn(angle)
-        await wait(1000)
+        await wait_until_settled_async(robot, hub)
+        print(f"actual = {reference.heading():6.1f}°")
 
         robot.stop()
 
-        robot.use_gyro(False)
-        hub.imu.reset_heading(0)
-        robot.use_gyro(True)
+        # 次の旋回の原点は今の向き（IMU はリセットしない）
+        reference.zero()
     
     print("Test_Complete")
 
@@ -154,22 +150,24 @@ async def turn_accuracy_test(robot, hub):
     
     # 精度データを保存するリスト
     accuracy_data = []
+    # heading は IMU をリセットせずにソフトウェアの原点から測る
+    reference = HeadingReference(hub)
     
     for target_angle in test_angles:
         print(f"\n--- {target_angle}度旋回テスト ---")
         
         # 旋回前の角度を記録
-        start_heading = hub.imu.heading()
+        start_heading = reference.heading()
         print(f"開始角度: {start_heading:.1f}°")
         
         # 旋回実行
         print(f"目標角度: {target_angle}° で旋回開始")
         await robot.turn(target_angle)
         
-        # 旋回後の角度を記録
-        await wait(500)  # 安定化のため少し待機
-        end_heading = hub.imu.heading()
-        print(f"終了角度: {end_heading:.1f}°")
+        # 旋回後の角度を記録（静止を確認してから読む）
+        settle_ms = await wait_until_settled_async(robot, hub)
+        end_heading = reference.heading()
+        print(f"終了角度: {end_heading:.1f}° (静定 {settle_ms}ms)")
         
         # 実際の旋回角度を計算
         actual_angle = end_heading - start_heading
@@ -190,13 +188,9 @@ async def turn_accuracy_test(robot, hub):
             'accuracy': accuracy_percent
         })
         
-        # 次のテストのためリセット
-        await wait(1000)
+        # 次のテストの原点は今の向き（旋回後はすでに静止しているので待たずに続ける）
         robot.stop()
-        robot.use_gyro(False)
-        hub.imu.reset_heading(0)
-        robot.use_gyro(True)
-        await wait(500)
+        reference.zero()
     
     # 結果サマリーを表示
     print("\n=== 旋回精度測定結果サマリー ===")
@@ -236,6 +230,7 @@ async def continuous_accuracy_monitor(robot, hub):
     print("任意の角度で旋回テストを行います")
     print("終了するには 'q' を入力してください")
     
+    reference = HeadingReference(hub)
     while True:
         try:
             # ユーザー入力（実際のロボットでは固定値を使用）
@@ -244,15 +239,15 @@ async def continuous_accuracy_monitor(robot, hub):
             print(f"\n--- {target_angle}度旋回テスト ---")
             
             # 旋回前の角度
-            start_heading = hub.imu.heading()
+            start_heading = reference.heading()
             print(f"開始角度: {start_heading:.1f}°")
             
             # 旋回実行
             await robot.turn(target_angle)
-            await wait(500)
+            await wait_until_settled_async(robot, hub)
             
             # 旋回後の角度
-            end_heading = hub.imu.heading()
+            end_heading = reference.heading()
             actual_angle = end_heading - start_heading
             
             # 精度計算
@@ -262,13 +257,9 @@ async def continuous_accuracy_monitor(robot, hub):
             print(f"目標: {target_angle}° → 実際: {actual_angle:.1f}°")
             print(f"誤差: {error:.1f}° (精度: {accuracy:.1f}%)")
             
-            # リセット
-            await wait(1000)
+            # 次の旋回の原点は今の向き
             robot.stop()
-            robot.use_gyro(False)
-            hub.imu.reset_heading(0)
-            robot.use_gyro(True)
-            await wait(500)
+            reference.zero()
             
             # 実際のロボットでは無限ループを避けるため、テスト回数を制限
             break
@@ -291,15 +282,21 @@ def run_mission():
     # パラメータ取得
     params = get_mission_parameters()
     
+    # センサー値はバッファに記録し、終了後にまとめて出力する
+    recorder = TelemetryRecorder(hub, left, right, robot)
+
     # タスク実行
     run_task(multitask(
-        sensor_logger_task(hub, left, right, robot),         # センサー値を継続的にログに出力するタスク
+        recorder.run(),                                      # センサー値をバッファに記録するタスク
         # main_robot_sequence_task(robot, lift, params)      # ロボットの移動シーケンスを実行するタスク
         # turn_test(robot, hub)                              # 基本的な旋回テスト
-        turn_accuracy_test(robot, hub)                       # 旋回精度測定テスト
+        turn_accuracy_test(robot, hub),                      # 旋回精度測定テスト
         # continuous_accuracy_monitor(robot, hub)            # 連続精度モニタリング
+        race=True
     ))
 
+    recorder.dump()  # 記録したセンサーログをまとめて出力
+
     print("Finished! (すべてのタスクが完了しました)") # この行はタスク完了後に実行される
 
 # プログラムの実行
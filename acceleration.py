@@ -0,0 +1,213 @@
+from pybricks.parameters import Axis
+from pybricks.tools import run_task, wait, multitask, StopWatch
+from settle import wait_until_settled_async
+from sweep import make_grid, run_sweep, measure_turn, print_table, print_pareto, confidence_width
+from heading import HeadingReference
+from calibration import load_calibration
+
+# 加速度と速度の組み合わせ（straight_acceleration [mm/s^2], turn_acceleration [deg/s^2]）
+# Speed_test.py はコメントアウト（既定値）、code_that_causes_the_robot_to_rotate.py は 100 / 50 を勘で設定している
+# 直進の 3000 はタイヤが滑り始める加速度（シミュレーターでは traction=2500）より上の点
+STRAIGHT_ACCELERATIONS = [100, 250, 500, 1000, 2000, 3000]
+STRAIGHT_SPEEDS = [300, 500, 760]
+STRAIGHT_DISTANCE = 500
+TURN_ACCELERATIONS = [50, 200, 400, 800, 1600]
+TURN_RATES = [150, 300, 450]
+TURN_ANGLE = 90
+REPEAT = 3
+
+# 同じ速度で緩い側の半分の加速度（基準）より滑りがこれ以上増えたら滑ったとみなす（最小値）
+# 実際の判定値は、基準とその条件の滑りの95%信頼区間（差の信頼区間の半分）とこの値の大きい方
+SLIP_FLOOR_MM = 2.0
+SLIP_FLOOR_DEG = 0.3
+
+BIAS_MS = 200        # 直進の前に静止した状態で加速度センサーの偏りを測る時間
+IMU_POLL_MS = 5      # 加速度を積分する周期
+
+
+class SlipMeter:
+    """タイヤの回転とロボット本体の実際の動きの差（滑り）を測る
+
+    旋回では、左右の回転差から計算した向きの変化と IMU の向きの変化を比べます。
+    直進では左右のタイヤが一緒に滑るので向きには表れません。そこで、進行方向の加速度
+    （hub.imu.acceleration(Axis.X)）を2回積分した距離とエンコーダーの距離を比べます。
+    タイヤ直径とトレッド幅は geometry_calibration.py で保存した値を使います（なければ既定値）。
+    """
+
+    def __init__(self, hub, left, right):
+        self.hub = hub
+        self.left = left
+        self.right = right
+        calibration = load_calibration(hub)
+        wheel_diameter = calibration["wheel_diameter"]
+        axle_track = calibration["axle_track"]
+        # 左右の回転差 1 度あたりの向きの変化 [度]
+        self.deg_per_deg = wheel_diameter / (2 * axle_track)
+        self.reference = HeadingReference(hub)
+        self.bias = 0
+        self.start()
+
+    def _encoder_heading(self):
+        return (self.left.angle() - self.right.angle()) * self.deg_per_deg
+
+    def start(self):
+        """今の位置から測り始める"""
+        self.reference.zero()
+        self.encoder_start = self._encoder_heading()
+        self.velocity = 0
+        self.distance = 0
+        self.elapsed = 0
+
+    def heading_slip(self):
+        """start() からの（エンコーダーの向きの変化）−（IMU の向きの変化）[度]"""
+        return self._encoder_heading() - self.encoder_start - self.reference.heading()
+
+    async def measure_bias(self):
+        """静止した状態で進行方向の加速度の平均（床の傾きとセンサーの偏り）を測る"""
+        total = 0
+        count = 0
+        watch = StopWatch()
+        while watch.time() < BIAS_MS:
+            total += self.hub.imu.acceleration(Axis.X)
+            count += 1
+            await wait(IMU_POLL_MS)
+        self.bias = total / count
+
+    async def integrate(self):
+        """進行方向の加速度を積分し続ける（multitask(..., race=True) で動作と一緒に実行）"""
+        watch = StopWatch()
+        last = 0
+        while True:
+            await wait(IMU_POLL_MS)
+            now = watch.time()
+            dt = (now - last) / 1000
+            last = now
+            self.velocity += (self.hub.imu.acceleration(Axis.X) - self.bias) * dt
+            self.distance += self.velocity * dt
+            self.elapsed = now / 1000
+
+    def imu_distance(self):
+        """積分した距離 [mm]
+
+        止まった時点の速度は本当は 0 なので、残った速度は偏りの測り残しによるものとみなし、
+        一定の偏りが積み重なった分（残った速度 x 時間 / 2）を差し引きます。
+        """
+        return self.distance - self.velocity * self.elapsed / 2
+
+
+async def sweep_accelerations(hub, left, right, robot, kind, conditions, repeat=REPEAT):
+    """加速度と速度の条件ごとに時間・誤差・滑りを測り、結果（dict）のリストを返す
+
+    直進の誤差は、エンコーダーではなく加速度を積分した実際の移動距離と目標の差です
+    （robot.distance() はタイヤが滑っても目標どおりの値になるため）。
+    結果には run_sweep の値に加えて次の値が入ります（直進は [mm]、旋回は [度]）。
+        mean_slip: エンコーダーと IMU の差の平均
+        max_slip: 差の絶対値の最大
+        excess_slip: 同じ速度で緩い側の半分の加速度（基準）の滑りの平均からの増え方
+            （トレッド幅のずれや旋回時の横滑りのように加速度によらない差を除いたもの）
+        slip_limit: 滑ったとみなす excess_slip の値
+        slipping: 滑ったかどうか
+    """
+    meter = SlipMeter(hub, left, right)
+    slips = {}
+
+    async def move_straight(target):
+        await robot.straight(target)
+        await wait_until_settled_async(robot, hub)
+
+    async def measure(condition):
+        if kind == "straight":
+            # measure_straight と同じく元の位置に戻る。滑りと誤差は戻る前に読む
+            target = condition["distance"]
+            await meter.measure_bias()
+            meter.start()
+            robot.reset()
+            watch = StopWatch()
+            await multitask(move_straight(target), meter.integrate(), race=True)
+            elapsed = watch.time()
+            actual = meter.imu_distance()
+            slip = robot.distance() - actual
+            await robot.straight(-robot.distance())
+            await wait_until_settled_async(robot, hub)
+            error = actual - target
+        else:
+            meter.start()
+            error, elapsed = await measure_turn(hub, robot, condition)
+            slip = meter.heading_slip()
+        slips.setdefault(_key(condition), []).append(slip)
+        return error, elapsed
+
+    results = await run_sweep(hub, robot, kind, conditions, repeat, measure=measure, resume=False)
+    floor = SLIP_FLOOR_MM if kind == "straight" else SLIP_FLOOR_DEG
+    for result in results:
+        values = slips.get(_key(result), [0])
+        result["mean_slip"] = sum(values) / len(values)
+        result["max_slip"] = max(abs(v) for v in values)
+    for speed in set(result["speed"] for result in results):
+        rows = sorted((r for r in results if r["speed"] == speed), key=lambda r: r["acceleration"])
+        # 緩い側の半分をまとめて基準にする（1条件だけでは回数が少なく、信頼区間が広くなりすぎる）
+        baseline = []
+        for result in rows[:(len(rows) + 1) // 2]:
+            baseline += slips.get(_key(result), [])
+        mean = sum(baseline) / len(baseline) if baseline else 0
+        base_width = confidence_width(baseline) or 0
+        for result in rows:
+            # 基準とその条件の平均の差の信頼区間に収まる増え方は雑音とみなす
+            width = confidence_width(slips.get(_key(result), [])) or 0
+            limit = max(floor, (base_width * base_width + width * width) ** 0.5 / 2)
+            result["excess_slip"] = abs(result["mean_slip"] - mean)
+            result["slip_limit"] = limit
+            result["slipping"] = result["excess_slip"] > limit
+    return results
+
+
+def _key(condition):
+    return (condition.get("speed"), condition.get("acceleration"))
+
+
+def print_slip(results, unit):
+    """条件ごとの滑りを表示"""
+    print(f"\n=== タイヤの滑り（エンコーダーと IMU の差 [{unit}]）===")
+    for result in results:
+        mark = "  ← 滑り" if result["slipping"] else ""
+        print(f"speed={result['speed']}, acceleration={result['acceleration']}: "
+              f"平均 {result['mean_slip']:+.2f}, 最大 {result['max_slip']:.2f}, "
+              f"加速度による増加 {result['excess_slip']:.2f}（判定値 {result['slip_limit']:.2f}）{mark}")
+
+
+def print_recommendation(front, unit):
+    """パレートフロントの中で滑らない最も速い設定を表示して返す（なければ None）"""
+    for result in front:
+        if not result["slipping"]:
+            print(f"滑らない最も速い設定: speed={result['speed']}, acceleration={result['acceleration']} "
+                  f"（{result['mean_time_ms']:.0f}ms, 平均絶対誤差 {result['mean_abs_error']:.2f}{unit}）")
+            return result
+    print("滑らない設定がパレートフロントにありません（加速度を下げて測り直してください）")
+    return None
+
+
+async def run_acceleration_sweep(hub, left, right, robot):
+    """直進と旋回の加速度を速度と一緒に振り、パレートフロントと滑らない最速の設定を表示"""
+    print("=== 直進: straight_acceleration x straight_speed ===")
+    conditions = make_grid(("speed", STRAIGHT_SPEEDS), ("acceleration", STRAIGHT_ACCELERATIONS),
+                           ("distance", [STRAIGHT_DISTANCE]))
+    straight_results = await sweep_accelerations(hub, left, right, robot, "straight", conditions)
+    print_table(straight_results, ("speed", "acceleration"), "mm")
+    print_slip(straight_results, "mm")
+    front = print_pareto(straight_results, ("speed", "acceleration"), "mm")
+    print_recommendation(front, "mm")
+
+    print("\n=== 旋回: turn_acceleration x turn_rate ===")
+    conditions = make_grid(("speed", TURN_RATES), ("acceleration", TURN_ACCELERATIONS), ("angle", [TURN_ANGLE]))
+    turn_results = await sweep_accelerations(hub, left, right, robot, "turn", conditions)
+    print_table(turn_results, ("speed", "acceleration"), "度")
+    print_slip(turn_results, "度")
+    front = print_pareto(turn_results, ("speed", "acceleration"), "度")
+    print_recommendation(front, "度")
+    return straight_results, turn_results
+
+
+if __name__ == "__main__":
+    from setup import initialize_robot
+    hub, left, right, robot = initialize_robot()
+    run_task(run_acceleration_sweep(hub, left, right, robot))
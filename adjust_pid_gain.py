@@ -2,7 +2,9 @@ from pybricks.hubs import PrimeHub
 from pybricks.parameters import Port, Axis, Direction, Stop
 from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
-from pybricks.tools import wait
+from pybricks.tools import wait, run_task
+from pid_tuner import tune
+from calibration import update_calibration
 
 # ───────────────────────────────────────────
 # 1) ハブの向きを宣言 ★USB の向きを合わせる★
@@ -54,6 +56,22 @@ robot.use_gyro(True)          # ジャイロで姿勢自動補正
 hub.imu.reset_heading(0)      # ヘディングを 0°
 robot.reset()                 # 走行距離を 0 mm
 
+# ───────────────────────────────────────────
+# 4) PIDゲインの自動調整（上のゲインを初期値として探索）
+# ───────────────────────────────────────────
+# True にすると、短いステップ移動の応答（立ち上がり・オーバーシュート・整定時間・
+# 定常偏差）を測ってゲインを調整し、結果を DISTANCE_KP などの形で表示します。
+# 確認して y と答えたときだけハブに保存し、setup.py の initialize_robot() が次回から読み込みます。
+# False のままなら、上で設定したゲインで走るだけです（保存値は変わりません）。
+AUTO_TUNE = False
+
+if AUTO_TUNE:
+    DISTANCE_KP, DISTANCE_KI, DISTANCE_KD = run_task(tune(hub, robot, "distance"))
+    HEADING_KP, HEADING_KI, HEADING_KD = run_task(tune(hub, robot, "heading"))
+    if input("調整したゲインをハブに保存しますか？ (y/n): ") == "y":
+        update_calibration(hub, "distance_pid", (DISTANCE_KP, DISTANCE_KI, DISTANCE_KD))
+        update_calibration(hub, "heading_pid", (HEADING_KP, HEADING_KI, HEADING_KD))
+
 # 走行設定
 DISTANCE_MM = 500             # 走行距離
 STRAIGHT_SPEED = 150          # ≒30 %パワー（150 mm/s）
@@ -3,6 +3,8 @@ from pybricks.parameters import Port, Axis, Direction, Stop
 from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
 from pybricks.tools import wait, multitask, run_task, StopWatch
+from settle import wait_until_settled_async
+from sweep import run_sweep
 
 # ───────────────────────────────────────────
 # 1) ハブの向きを宣言 ★USB の向きを合わせる★
@@ -25,7 +27,7 @@ robot = DriveBase(left, right, wheel_diameter=56, axle_track=115)
 # 実験設定
 # ───────────────────────────────────────────
 
-# テストパターンの定義
+# テストパターンの定義（run_sweep に渡す条件のリスト）
 TEST_PATTERNS = [
     {"speed": 100, "distance": 200, "name": "低速・短距離"},
     {"speed": 100, "distance": 500, "name": "低速・中距離"},
@@ -99,10 +101,10 @@ async def sensor_logger_task():
         await wait(500)  # 500ミリ秒間隔でログ出力
     print("--- センサーログタスク終了 ---")
 
-def reset_position():
-    """位置とセンサーをリセット"""
+async def reset_position():
+    """ロボットが止まるのを待ってから位置とセンサーをリセット"""
     robot.stop()  # まずロボットを停止
-    wait(100)     # 少し待機
+    await wait_until_settled_async(robot, hub)
     hub.imu.reset_heading(0)
     robot.reset()
     left.reset_angle(0)
@@ -123,9 +125,8 @@ async def measure_straight_performance(speed, target_distance, test_name):
     print(f"\n=== {test_name} テスト開始 ===")
     print(f"速度: {speed} mm/s, 目標距離: {target_distance} mm")
     
-    # 測定開始前の初期化
-    reset_position()
-    await wait(1000)  # 1秒待機して安定化
+    # 測定開始前の初期化（静止を確認してからリセットするので固定の待ち時間は不要）
+    await reset_position()
     
     # 開始時のデータ記録
     stopwatch = StopWatch()
@@ -140,7 +141,7 @@ async def measure_straight_performance(speed, target_distance, test_name):
     
     # ★重要修正★ 速度を指定して直進実行
     robot.settings(straight_speed=speed)  # 速度設定
-    robot.straight(target_distance, then=Stop.BRAKE, wait=True)
+    await robot.straight(target_distance, then=Stop.BRAKE)
     
     # 測定終了後のデータ記録
     elapsed_time = stopwatch.time() / 1000  # ミリ秒を秒に変換
@@ -184,43 +185,27 @@ async def measure_straight_performance(speed, target_distance, test_name):
     print(f"右モーター回転: {right_rotation:.1f}°")
     print(f"左右角度差: {motor_angle_diff:.1f}°")
     
+    # 元の位置に戻る（次のテストのために手で置き直す必要がない）
+    await robot.straight(-actual_distance)
+    
     return result
 
+async def measure_pattern(pattern):
+    """run_sweep から呼ばれる測定関数（詳しい結果は experiment_data に残す）"""
+    result = await measure_straight_performance(pattern["speed"], pattern["distance"], pattern["name"])
+    experiment_data.append(result)
+    return result["distance_error"], result["elapsed_time"] * 1000
+
 async def main_robot_sequence_task():
     """メインの実験シーケンス"""
     global logging_active
     
     print("=== 直進性能測定実験開始 ===")
     
-    # 各テストパターンを実行
-    for i, pattern in enumerate(TEST_PATTERNS):
-        print(f"\n【テスト {i+1}/{len(TEST_PATTERNS)}】")
-        
-        # ユーザーの準備確認
-        print(f"次のテスト: {pattern['name']}")
-        print("ロボットを開始位置に配置してください。")
-        print("5秒後に自動でテストを開始します...")
-        
-        for countdown in range(5, 0, -1):
-            print(f"開始まで {countdown} 秒...")
-            await wait(1000)
-        
-        print("テスト開始します！")
-        
-        # 性能測定実行
-        result = await measure_straight_performance(
-            pattern["speed"], 
-            pattern["distance"], 
-            pattern["name"]
-        )
-        
-        # 結果を実験データに追加
-        experiment_data.append(result)
-        
-        # 次のテストまでの待機時間
-        if i < len(TEST_PATTERNS) - 1:
-            print("次のテストまで3秒待機...")
-            await wait(3000)
+    # 各テストパターンを1回ずつ実行
+    # 測定のたびに元の位置に戻るので、テストの間に置き直す待ち時間はない
+    # 1パターンごとに進み具合がハブに保存され、中断しても続きから再開できる
+    await run_sweep(hub, robot, "straight", TEST_PATTERNS, repeat=1, measure=measure_pattern)
     
     # ★重要修正★ 実験完了時にログタスクを停止
     logging_active = False
@@ -260,7 +245,7 @@ async def main_robot_sequence_task():
 
 print("直進性能測定実験プログラム")
 print("このプログラムは12つの異なる条件で直進性能をテストします。")
-print("各テストの前にロボットを開始位置に配置してください。")
+print("ロボットを開始位置に配置してください（各テストの後は自動で開始位置に戻ります）。")
 
 try:
     run_task(multitask(
@@ -1,12 +1,19 @@
 from setup import initialize_robot
-from pybricks.tools import wait
+from pybricks.tools import run_task
+from sweep import make_grid, run_sweep, print_table, print_tradeoff
+from compensation import build_table, print_table_literal
+from calibration import update_calibration
 
 # モーター出力リスト（15%ずつ）
 power_list = [40, 55, 70, 85, 100]
 # 調べる角度リスト
 angles = [30, 60, 90, 120, 180]
-# 各条件での実験回数
-repeat_num = 3
+# 各条件の実験回数（ばらつきが小さい条件は少なく、大きい条件は多く）
+repeat_num = 2      # 最少
+max_trials = 8      # 最多
+ci_width_deg = 1.0  # 平均誤差の95%信頼区間の幅がこれ以下になったら次の条件へ
+# 最も速い出力を選ぶときの許容誤差 [度]
+tolerances_deg = [0.5, 1.0, 2.0]
 
 # 最初に一度だけ初期化
 hub, left, right, robot = initialize_robot(
@@ -15,48 +22,23 @@ hub, left, right, robot = initialize_robot(
     motor_power_percent=100    # 仮の値（後でdcで上書き）
 )
 
-all_results = []  # 全ての結果を記録
-
-for power in power_list:
-    print(f"\n==============================")
-    print(f"モーター出力: {power}% で実験開始")
-    print(f"==============================")
-    # 出力を設定
-    left.dc(power / 100)
-    right.dc(power / 100)
-    angle_results = []
-    for angle in angles:
-        errors = []
-        abs_errors = []
-        for trial in range(1, repeat_num + 1):
-            print(f"\n--- [出力{power}% 角度{angle}度] 実験{trial}/{repeat_num} ---")
-            robot.turn(angle)
-            wait(1000)
-            current_heading = hub.imu.heading()
-            error = current_heading - angle
-            errors.append(error)
-            abs_errors.append(abs(error))
-            sign = "+" if error >= 0 else "-"
-            print(f"→ 実際の向き: {current_heading:.1f}度")
-            print(f"→ 誤差: {sign}{abs(error):.1f}度")
-            print("-------------------------------")
-            robot.stop()
-            wait(200)
-            hub.imu.reset_heading(0)
-            wait(500)
-        # 平均誤差計算
-        mean_error = sum(errors) / repeat_num
-        mean_abs_error = sum(abs_errors) / repeat_num
-        angle_results.append((angle, mean_error, mean_abs_error, repeat_num))
-    all_results.append((power, angle_results))
+# 出力は最大旋回速度500deg/sに対する割合として旋回速度に反映する
+conditions = make_grid(("power", power_list), ("angle", angles))
+results = run_task(run_sweep(hub, robot, "turn", conditions, repeat_num,
+                             ci_width=ci_width_deg, max_trials=max_trials))
 
 # 結果を罫線付き表形式で出力
-for power, angle_results in all_results:
-    print(f"\n=== モーター出力: {power}% の結果 ===")
-    print("+------------+----------------+-------------------+------------+")
-    print("| 指定角度[度] | 平均誤差[度]   | 平均絶対誤差[度]   | 実験回数   |")
-    print("+------------+----------------+-------------------+------------+")
-    for angle, mean_error, mean_abs_error, repeat_num in angle_results:
-        sign = "+" if mean_error >= 0 else "-"
-        print(f"| {angle:>10} |   {sign}{abs(mean_error):>8.2f}   |      {mean_abs_error:>8.2f}      | {repeat_num:>6}    |")
-    print("+------------+----------------+-------------------+------------+")
+print_table(results, ("power", "angle"), "度")
+
+# 角度ごとに、時間と誤差のパレートフロントと許容誤差ごとの最も速い出力を出力
+print_tradeoff(results, ("power",), "度", tolerances_deg, group="angle")
+
+# 補正テーブルとして出力（compensation.py の TURN_TABLE に貼り付けると、
+# compensation.turn() がこの誤差を見込んで指令値を補正する）
+table = build_table(results, "angle")
+print_table_literal("TURN_TABLE", table)
+
+# 確認して y と答えたときだけハブにも保存する（次回から initialize_robot() が読み込んで使う）
+# 条件を減らした試しの実行で、本番用のテーブルを上書きしないため
+if input("この補正テーブルをハブに保存しますか？ (y/n): ") == "y":
+    update_calibration(hub, "turn_table", table)
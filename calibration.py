@@ -0,0 +1,169 @@
+from ustruct import pack, unpack_from
+from pybricks.parameters import Axis
+from pybricks.tools import wait
+
+# キャリブレーション値の保存場所（hub.system.storage の前半を使う。後半は sweep.py の途中再開用）
+CALIBRATION_OFFSET = 0
+CALIBRATION_SIZE = 256
+CALIBRATION_MAGIC = 0x4341     # "CA"
+CALIBRATION_VERSION = 1
+
+# マジック, バージョン, 直進テーブルの点数, 旋回テーブルの点数,
+# タイヤ直径, トレッド幅, ジャイロのバイアス, 直進PID(kp, ki, kd), 旋回PID(kp, ki, kd)
+HEADER_FORMAT = "<HBBBfff6H"
+HEADER_SIZE = 29
+ENTRY_FORMAT = "<Bhh"          # 出力[%], 目標値, 平均誤差x100
+ENTRY_SIZE = 5
+MAX_ENTRIES = (CALIBRATION_SIZE - HEADER_SIZE) // ENTRY_SIZE
+
+# 保存値がないときに使う値（setup.py で使っていた値）
+DEFAULTS = {
+    "wheel_diameter": 56,
+    "axle_track": 115,
+    "gyro_bias": 0.0,
+    "distance_pid": (1000, 50, 10),
+    "heading_pid": (2000, 50, 100),
+    "straight_table": {},
+    "turn_table": {},
+    "stored": False,
+}
+
+
+def _read_entries(data, offset, count):
+    table = {}
+    for i in range(count):
+        power, target, error = unpack_from(ENTRY_FORMAT, data, offset + i * ENTRY_SIZE)
+        table.setdefault(power, []).append((target, error / 100))
+    for power in table:
+        table[power] = tuple(table[power])
+    return table
+
+
+def load_calibration(hub):
+    """保存されたキャリブレーション値を1回の読み出しで読み込んで dict で返す
+
+    保存値がなければ DEFAULTS のコピーを返します（"stored" が False）。
+    """
+    data = hub.system.storage(CALIBRATION_OFFSET, read=CALIBRATION_SIZE)
+    values = unpack_from(HEADER_FORMAT, data)
+    if values[0] != CALIBRATION_MAGIC or values[1] != CALIBRATION_VERSION:
+        return dict(DEFAULTS)
+    _, _, straight_count, turn_count, wheel_diameter, axle_track, gyro_bias = values[:7]
+    offset = HEADER_SIZE
+    straight_table = _read_entries(data, offset, straight_count)
+    turn_table = _read_entries(data, offset + straight_count * ENTRY_SIZE, turn_count)
+    return {
+        "wheel_diameter": wheel_diameter,
+        "axle_track": axle_track,
+        "gyro_bias": gyro_bias,
+        "distance_pid": values[7:10],
+        "heading_pid": values[10:13],
+        "straight_table": straight_table,
+        "turn_table": turn_table,
+        "stored": True,
+    }
+
+
+def _thin(name, table, room):
+    """テーブルが room 点に収まらなければ間引いて返す
+
+    先頭の出力から順に捨てると、捨てた出力は compensation.py で最後に残った出力から外挿されてしまいます。
+    そこで全部の出力を残し、出力ごとの目標値を両端を含めて等間隔に間引きます
+    （それでも入らなければ、出力も両端を含めて等間隔に間引きます）。
+    """
+    total = sum(len(points) for points in table.values())
+    if total <= room:
+        return table
+    powers = sorted(table)
+    per_power = max(2, room // len(powers))
+    if per_power * len(powers) > room:
+        powers = [powers[i] for i in _spread(len(powers), max(1, room // per_power))]
+    thinned = {}
+    for power in powers:
+        points = table[power]
+        thinned[power] = tuple(points[i] for i in _spread(len(points), min(per_power, len(points))))
+    kept = sum(len(points) for points in thinned.values())
+    print(f"注意: {name}は {total}点のうち {kept}点だけ保存します（{len(powers)}出力 x 最大{per_power}点に間引きました）")
+    return thinned
+
+
+def _spread(count, keep):
+    """0〜count-1 から両端を含めて等間隔に keep 個の番号を選ぶ"""
+    if keep >= count:
+        return list(range(count))
+    if keep == 1:
+        return [0]
+    return sorted(set(round(i * (count - 1) / (keep - 1)) for i in range(keep)))
+
+
+def _pack_entries(table):
+    data = b""
+    count = 0
+    for power in sorted(table):
+        for target, error in table[power]:
+            data += pack(ENTRY_FORMAT, int(power), int(round(target)),
+                         max(-32768, min(32767, int(round(error * 100)))))
+            count += 1
+    return data, count
+
+
+def save_calibration(hub, calibration):
+    """キャリブレーション値を hub.system.storage に書き込む
+
+    補正テーブルは合わせて MAX_ENTRIES 点まで保存できます。入りきらないときは警告して間引きます。
+    """
+    # 両方のテーブルが入りきらないときは、直進に少なくとも半分を割り当てる
+    turn_points = sum(len(points) for points in calibration["turn_table"].values())
+    straight_room = max(MAX_ENTRIES // 2, MAX_ENTRIES - turn_points)
+    straight_table = _thin("直進の補正テーブル", calibration["straight_table"], straight_room)
+    straight_data, straight_count = _pack_entries(straight_table)
+    turn_table = _thin("旋回の補正テーブル", calibration["turn_table"], MAX_ENTRIES - straight_count)
+    turn_data, turn_count = _pack_entries(turn_table)
+    header = pack(HEADER_FORMAT, CALIBRATION_MAGIC, CALIBRATION_VERSION, straight_count, turn_count,
+                  calibration["wheel_diameter"], calibration["axle_track"], calibration["gyro_bias"],
+                  *(tuple(calibration["distance_pid"]) + tuple(calibration["heading_pid"])))
+    hub.system.storage(CALIBRATION_OFFSET, write=header + straight_data + turn_data)
+
+
+def update_calibration(hub, name, value):
+    """保存値のうち1項目だけを書き換えて保存し、更新後の dict を返す
+
+    例: update_calibration(hub, "heading_pid", (2000, 50, 67))
+    """
+    calibration = load_calibration(hub)
+    calibration[name] = value
+    save_calibration(hub, calibration)
+    print(f"キャリブレーション値を保存しました: {name} = {value}")
+    return calibration
+
+
+def clear_calibration(hub):
+    """保存値を消去（次回から DEFAULTS を使う）"""
+    hub.system.storage(CALIBRATION_OFFSET, write=pack("<HB", 0, 0))
+
+
+def measure_gyro_bias(hub, duration_ms=2000, period_ms=10):
+    """静止中の Z 軸角速度の平均（ジャイロのバイアス [deg/s]）を測る
+
+    ロボットを動かさずに置いた状態で呼んでください。
+    angular_velocity() の既定値はバイアスを差し引いた後の値なので、
+    calibrated=False で補正前の値を読みます（setup.py はこの値を angular_velocity_bias に設定する）。
+    """
+    total = 0.0
+    count = 0
+    for _ in range(duration_ms // period_ms):
+        total += hub.imu.angular_velocity(Axis.Z, calibrated=False)
+        count += 1
+        wait(period_ms)
+    return total / count
+
+
+def print_calibration(calibration):
+    """キャリブレーション値を一覧表示"""
+    source = "保存値" if calibration["stored"] else "既定値"
+    print(f"キャリブレーション（{source}）:")
+    print(f"  タイヤ直径: {calibration['wheel_diameter']:.2f} mm, トレッド幅: {calibration['axle_track']:.2f} mm")
+    print(f"  ジャイロのバイアス: {calibration['gyro_bias']:+.3f} deg/s")
+    print(f"  直進PID: {tuple(calibration['distance_pid'])}, 旋回PID: {tuple(calibration['heading_pid'])}")
+    print(f"  補正テーブル: 直進{sum(len(p) for p in calibration['straight_table'].values())}点, "
+          f"旋回{sum(len(p) for p in calibration['turn_table'].values())}点")
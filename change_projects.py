@@ -1,142 +1,195 @@
-from pybricks.hubs import PrimeHub
-from pybricks.pupdevices import Motor, ColorSensor, UltrasonicSensor, ForceSensor
-from pybricks.parameters import Button, Color, Direction, Port, Side, Stop, Icon, Axis
-from pybricks.robotics import DriveBase
-from pybricks.tools import wait, StopWatch
+import gc
+import sys
+from pybricks.pupdevices import ForceSensor, Motor
+from pybricks.parameters import Button, Color, Direction, Port, Icon
+from pybricks.tools import wait, multitask, run_task, StopWatch
+from setup import initialize_robot
 
-# Spike Prime本体のインスタンス形成
-hub = PrimeHub()
+# 起動してから選択できるようになるまでの時間を測る
+boot_watch = StopWatch()
+
+# ロボット（ハブ・モーター・DriveBase）は起動時に一度だけ初期化し、全プロジェクトで使い回す
+hub, left, right, robot = initialize_robot()
+lift = Motor(Port.A, positive_direction=Direction.CLOCKWISE)
+lift.reset_angle(0)
 
 # タッチセンサー（フォースセンサー）の設定
 # ポートを必要に応じて変更してください（Port.A, Port.B, Port.C, Port.D, Port.E, Port.F）
 touch_sensor = ForceSensor(Port.D)
 
-# プロジェクトの識別名
-projects = ["A", "B", "C"]
-
-icon_map = {
-    "A": Icon.HAPPY,
-    "B": Icon.HEART,
-    "C": Icon.SAD
-}
+POLL_MS = 10            # ボタンとタッチセンサーを読む周期
+MOTION_POLL_MS = 2      # 実行直後に「動き出したか」を確認する周期
+MOVING_SPEED = 10       # これを超える速度 [mm/s, deg/s] になったら動き出したとみなす
 
-# 各プロジェクトの関数定義
-def A():
+# 各プロジェクトの関数定義（async で書き、初期化済みの robot と lift を受け取る）
+async def A(robot, lift):
     print("=== Project A 実行中 ===")
-    hub.display.icon(Icon.TRIANGLE_UP)
-    wait(1000)
+    await robot.straight(200)
+    await robot.straight(-200)
     print("Project A 完了\n")
 
-def B():
+async def B(robot, lift):
     print("=== Project B 実行中 ===")
-    hub.display.icon(Icon.TRIANGLE_LEFT)
-    wait(1000)
+    await robot.turn(90)
+    await robot.turn(-90)
     print("Project B 完了\n")
 
-def C():
+async def C(robot, lift):
     print("=== Project C 実行中 ===")
-    hub.display.icon(Icon.TRIANGLE_RIGHT)
-    wait(1000)
+    await robot.curve(150, 90)
+    await robot.curve(150, -90)
     print("Project C 完了\n")
 
+# プロジェクトの一覧 (識別名, アイコン, モジュール名, 関数名)
+# モジュールは選択して実行するときに初めて import する（None はこのファイルの関数）。
+# 起動が速くなり、使わないミッションのぶんのメモリも使わない。
+# ミッションのモジュールは import しただけではハブやモーターに触らないように書くこと。
+projects = [
+    ("A", Icon.HAPPY, None, "A"),
+    ("B", Icon.HEART, None, "B"),
+    ("C", Icon.SAD, None, "C"),
+    ("M10", Icon.ARROW_UP, "SUBMERGED_M10", "main_robot_sequence_task"),
+    ("RUN", Icon.ARROW_RIGHT, "run", "main_robot_sequence_task"),
+]
+
+# 最後に実行したミッションのモジュール名（別のミッションを選んだら解放する）
+loaded_module = None
+
+def free_heap():
+    """空きメモリ [バイト]（gc.mem_free() のない環境では None）"""
+    gc.collect()
+    return gc.mem_free() if hasattr(gc, "mem_free") else None
+
+def print_memory(label):
+    free = free_heap()
+    if free is not None:
+        print(f"{label}: 空きメモリ {free} バイト")
+
+def load_function(module_name, function_name):
+    """プロジェクトの関数を返す（モジュールはここで初めて import する）"""
+    global loaded_module
+    if module_name is None:
+        return globals()[function_name]
+    if loaded_module is not None and loaded_module != module_name:
+        # 前に実行したミッションを解放してから読み込む
+        del sys.modules[loaded_module]
+        loaded_module = None
+        print_memory("解放後")
+    watch = StopWatch()
+    module = __import__(module_name)
+    loaded_module = module_name
+    print(f"{module_name} を読み込みました（{watch.time()}ms）")
+    print_memory("読み込み後")
+    return getattr(module, function_name)
+
 def show_current_selection(index):
-    """現在の選択項目を表示"""
+    """現在の選択項目を表示（選択が変わったときだけ呼ぶ）"""
     if index < len(projects):
-        project_name = projects[index]
-        print(f"選択中: Project {project_name}")
-        hub.display.icon(icon_map[project_name])
+        name, icon, _, _ = projects[index]
+        print(f"選択中: Project {name}")
+        hub.display.icon(icon)
     else:
         print("選択中: プログラム終了")
         hub.display.icon(Icon.FALSE)
 
-def projectExecute(index):
-    if index == 0:
-        A()
-    elif index == 1:
-        B()
-    elif index == 2:
-        C()
+async def watch_motion(watch, latency):
+    """ロボットが動き出した時刻を latency[0] に記録する（実行が終わるまで続く）"""
+    while True:
+        if latency[0] is None:
+            _, speed, _, turn_rate = robot.state()
+            if abs(speed) > MOVING_SPEED or abs(turn_rate) > MOVING_SPEED:
+                latency[0] = watch.time()
+            await wait(MOTION_POLL_MS)
+        else:
+            await wait(100)
 
-def wait_for_button_release():
-    """ボタンが離されるまで待機"""
-    while hub.buttons.pressed():
-        wait(10)
+async def launch(index, watch):
+    """プロジェクトを実行し、タッチセンサーの操作から動き出すまでの時間を表示"""
+    name, _, module_name, function_name = projects[index]
+    hub.light.on(Color.RED)
+    function = load_function(module_name, function_name)
+    # 前回の実行で止まった位置を新しい原点にする（停止は実行後に済ませてある）
+    robot.reset()
+    hub.imu.reset_heading(0)
 
-def wait_for_touch_release():
-    """タッチセンサーが離されるまで待機"""
-    while touch_sensor.pressed():
-        wait(10)
+    latency = [None]
+    try:
+        await multitask(function(robot, lift), watch_motion(watch, latency), race=True)
+    except Exception as e:
+        print(f"エラー: {e}")
+    robot.stop()
+    hub.light.on(Color.GREEN)
+
+    if latency[0] is None:
+        print(f"Project {name}: 動きなし（実行時間 {watch.time()}ms）")
+    else:
+        print(f"Project {name}: 操作から動き出すまで {latency[0]}ms（実行時間 {watch.time()}ms）")
 
 # メイン処理
-def main():
+async def main():
     print("左右ボタンで選択、タッチセンサーで決定してください")
     print("操作方法:")
     print("- 左ボタン: 前の項目")
     print("- 右ボタン: 次の項目")
-    print("- タッチセンサー(Port.A): 決定")
+    print("- タッチセンサー(Port.D): 決定（指を離した瞬間に実行）")
     print("- Bluetoothボタン: 緊急終了")
-    
-    current_index = 0  # 現在の選択インデックス (0=A, 1=B, 2=C, 3=終了)
-    max_index = len(projects)  # 0-3 (A,B,C,終了)
-    
+
+    current_index = 0  # 現在の選択インデックス（最後の1つは「終了」）
+    max_index = len(projects)
+
     # 初期表示
     show_current_selection(current_index)
-    
+    hub.light.on(Color.GREEN)
+    print(f"起動から選択できるまで {boot_watch.time()}ms")
+    print_memory("起動後")
+
+    # 前回の入力と比べて「押された瞬間」「離された瞬間」だけを処理する
+    # （押しっぱなしで何度も切り替わらないので、待ち時間でのデバウンスは不要）
+    last_buttons = hub.buttons.pressed()
+    last_touch = touch_sensor.pressed()
     while True:
-        pressed_buttons = hub.buttons.pressed()
-        
+        buttons = hub.buttons.pressed()
+        touch = touch_sensor.pressed()
+        new_buttons = [b for b in buttons if b not in last_buttons]
+        released = last_touch and not touch
+        last_buttons, last_touch = buttons, touch
+
         # 左ボタンが押された場合（前の項目へ）
-        if Button.LEFT in pressed_buttons:
-            wait_for_button_release()  # ボタンが離されるまで待機
+        if Button.LEFT in new_buttons:
             current_index = (current_index - 1) % (max_index + 1)
             show_current_selection(current_index)
-            wait(200)  # デバウンス
-            
+
         # 右ボタンが押された場合（次の項目へ）
-        elif Button.RIGHT in pressed_buttons:
-            wait_for_button_release()  # ボタンが離されるまで待機
+        elif Button.RIGHT in new_buttons:
             current_index = (current_index + 1) % (max_index + 1)
             show_current_selection(current_index)
-            wait(200)  # デバウンス
-            
-        # タッチセンサーが押された場合（決定）
-        elif touch_sensor.pressed():
-            wait_for_touch_release()  # タッチセンサーが離されるまで待機
-            
+
+        # タッチセンサーから指が離れた場合（決定）
+        # 押した瞬間に走り出すと指でロボットを押してしまうので、離した瞬間を開始の合図にする
+        elif released:
+            watch = StopWatch()
             if current_index == max_index:  # 終了が選択された場合
                 print("プログラムを終了します")
                 hub.display.icon(Icon.HEART)
-                wait(1000)
                 break
-            else:
-                project_name = projects[current_index]
-                print(f"\nProject {project_name} を実行します...")
-                wait(100)
-                
-                # プロジェクト実行
-                projectExecute(current_index)
-                
-                # 実行後の確認
-                print(f"Project {project_name} が完了しました")
-                print("左右ボタンで選択、タッチセンサーで決定してください")
-                
-                # 選択画面に戻る
-                show_current_selection(current_index)
-                wait(1000)
-        
+            await launch(current_index, watch)
+            print("左右ボタンで選択、タッチセンサーで決定してください")
+            # 実行中に押されたボタンは、離してから押し直したときだけ反応させる
+            last_buttons = hub.buttons.pressed()
+            last_touch = touch_sensor.pressed()
+
         # Bluetoothボタンが押された場合（緊急終了）
-        elif Button.BLUETOOTH in pressed_buttons:
-            wait_for_button_release()
+        elif Button.BLUETOOTH in new_buttons:
             print("緊急終了します")
             hub.display.icon(Icon.FALSE)
             break
-            
-        wait(50)  # CPUへの負荷を軽減
+
+        await wait(POLL_MS)
 
 # プログラム実行
 if __name__ == "__main__":
     try:
-        main()
+        run_task(main())
     except Exception as e:
         print(f"エラーが発生しました: {e}")
-        hub.display.icon(Icon.FALSE)
\ No newline at end of file
+        hub.display.icon(Icon.FALSE)
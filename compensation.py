@@ -0,0 +1,114 @@
+from pybricks.parameters import Stop
+
+# 補正テーブル {出力[%]: ((目標値, 平均誤差), ...)}
+# straight.py / bend.py の実行後に表示される内容を貼り付けて使います。
+# 空のテーブルでは補正しません。
+STRAIGHT_TABLE = {}
+TURN_TABLE = {}
+
+
+def use_tables(straight_table, turn_table):
+    """保存済みの補正テーブル（calibration.py で読み込んだもの）を使うように切り替える
+
+    空のテーブルは無視し、このファイルに貼り付けた値をそのまま使います。
+    """
+    global STRAIGHT_TABLE, TURN_TABLE
+    if straight_table:
+        STRAIGHT_TABLE = straight_table
+    if turn_table:
+        TURN_TABLE = turn_table
+
+
+def build_table(results, key):
+    """run_sweep の結果から補正テーブルを作る
+
+    key は目標値の条件名（"distance" または "angle"）です。
+    出力（power）ごとに (目標値, 平均誤差) を目標値の順に並べます。
+    """
+    table = {}
+    for result in results:
+        if result.get("mean_error") is None:
+            continue
+        points = table.setdefault(result["power"], [])
+        points.append((result[key], round(result["mean_error"], 2)))
+    for power in table:
+        table[power] = tuple(sorted(table[power]))
+    return table
+
+
+def print_table_literal(name, table):
+    """補正テーブルを compensation.py に貼り付けられる形で出力"""
+    print(f"{name} = {{")
+    for power in sorted(table):
+        print(f"    {power}: {table[power]},")
+    print("}")
+
+
+def _interpolate(points, x):
+    """(目標値, 誤差) の列から x での誤差を線形補間で求める
+
+    範囲外では端の点の「誤差 / 目標値」の比率をそのまま使います。
+    """
+    if x <= points[0][0]:
+        x0, e0 = points[0]
+        return e0 * x / x0 if x0 else e0
+    for (x0, e0), (x1, e1) in zip(points, points[1:]):
+        if x <= x1:
+            return e0 + (e1 - e0) * (x - x0) / (x1 - x0)
+    x1, e1 = points[-1]
+    return e1 * x / x1 if x1 else e1
+
+
+def predict_error(table, power, target):
+    """出力 power [%] で target だけ動かしたときの誤差の予測値
+
+    出力方向も隣り合う2つの出力の間で線形補間します。
+    負の目標値は正の目標値の誤差を符号反転したものとみなします。
+    """
+    if not table or not target:
+        return 0
+    sign = 1 if target > 0 else -1
+    x = abs(target)
+    powers = sorted(table)
+    if power <= powers[0]:
+        return sign * _interpolate(table[powers[0]], x)
+    for p0, p1 in zip(powers, powers[1:]):
+        if power <= p1:
+            e0 = _interpolate(table[p0], x)
+            e1 = _interpolate(table[p1], x)
+            return sign * (e0 + (e1 - e0) * (power - p0) / (p1 - p0))
+    return sign * _interpolate(table[powers[-1]], x)
+
+
+def corrected_target(table, power, target):
+    """誤差の予測値を差し引いた指令値を返す
+
+    誤差は指令値によって変わるので、補正後の指令値で予測し直して1回だけ繰り返します。
+    """
+    command = target - predict_error(table, power, target)
+    return target - predict_error(table, power, command)
+
+
+def _current_power(robot, index):
+    # settings() の速度を最大500に対する割合 [%] に換算（sweep.py と同じ換算）
+    return robot.settings()[index] * 100 / 500
+
+
+def straight(robot, distance, then=Stop.HOLD, wait=True, table=None):
+    """robot.straight() の代わりに使う補正付きの直進
+
+    現在の直進速度に対応する出力で STRAIGHT_TABLE を引き、指令距離を補正します。
+    run_task の中では await して使います。
+    """
+    if table is None:
+        table = STRAIGHT_TABLE
+    command = corrected_target(table, _current_power(robot, 0), distance)
+    return robot.straight(command, then=then, wait=wait)
+
+
+def turn(robot, angle, then=Stop.HOLD, wait=True, table=None):
+    """robot.turn() の代わりに使う補正付きの旋回"""
+    if table is None:
+        table = TURN_TABLE
+    command = corrected_target(table, _current_power(robot, 2), angle)
+    return robot.turn(command, then=then, wait=wait)
@@ -4,17 +4,11 @@ from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
 from pybricks.tools import wait, multitask, run_task
 from setup import initialize_robot
-
-async def sensor_logger_task(hub, left, right, robot):
-    """センサー値を定期的にターミナルに表示する非同期タスク"""
-    print("--- センサーログタスク開始 ---")
-    while True:
-        heading = hub.imu.heading()
-        left_deg = left.angle()
-        right_deg = right.angle()
-        dist = robot.distance()
-        print(f"LOG: dist={dist:4.0f} mm  heading={heading:4.0f}°  L={left_deg:5.0f}°  R={right_deg:5.0f}°")
-        await wait(200)
+from telemetry import TelemetryRecorder
+from settle import wait_until_settled_async
+from sweep import make_grid, run_sweep, confidence_width, needs_more_trials, print_tradeoff
+from optimizer import successive_halving
+from heading import HeadingReference
 
 async def turn_accuracy_test(robot, hub):
     """旋回精度測定テスト"""
@@ -25,22 +19,24 @@ async def turn_accuracy_test(robot, hub):
     
     # 精度データを保存するリスト
     accuracy_data = []
+    # heading は IMU をリセットせずにソフトウェアの原点から測る
+    reference = HeadingReference(hub)
     
     for target_angle in test_angles:
         print(f"\n--- {target_angle}度旋回テスト ---")
         
         # 旋回前の角度を記録
-        start_heading = hub.imu.heading()
+        start_heading = reference.heading()
         print(f"開始角度: {start_heading:.1f}°")
         
         # 旋回実行
         print(f"目標角度: {target_angle}° で旋回開始")
         await robot.turn(target_angle)
         
-        # 旋回後の角度を記録
-        await wait(500)  # 安定化のため少し待機
-        end_heading = hub.imu.heading()
-        print(f"終了角度: {end_heading:.1f}°")
+        # 旋回後の角度を記録（静止を確認してから読む）
+        settle_ms = await wait_until_settled_async(robot, hub)
+        end_heading = reference.heading()
+        print(f"終了角度: {end_heading:.1f}° (静定 {settle_ms}ms)")
         
         # 実際の旋回角度を計算
         actual_angle = end_heading - start_heading
@@ -61,13 +57,9 @@ async def turn_accuracy_test(robot, hub):
             'accuracy': accuracy_percent
         })
         
-        # 次のテストのためリセット
-        await wait(1000)
+        # 次のテストの原点は今の向き（旋回後はすでに静止しているので待たずに続ける）
         robot.stop()
-        robot.use_gyro(False)
-        hub.imu.reset_heading(0)
-        robot.use_gyro(True)
-        await wait(500)
+        reference.zero()
     
     # 結果サマリーを表示
     print("\n=== 旋回精度測定結果サマリー ===")
@@ -101,22 +93,24 @@ async def turn_accuracy_test(robot, hub):
     
     print("=== 旋回精度測定テスト完了 ===")
 
-async def single_angle_test(robot, hub, target_angle):
-    """単一角度での旋回精度テスト"""
+async def single_angle_test(robot, hub, target_angle, reference=None):
+    """単一角度での旋回精度テスト（reference を渡すとその原点からの角度を表示）"""
     print(f"\n=== {target_angle}度旋回精度テスト ===")
+    if reference is None:
+        reference = HeadingReference(hub)
     
     # 旋回前の角度を記録
-    start_heading = hub.imu.heading()
+    start_heading = reference.heading()
     print(f"開始角度: {start_heading:.1f}°")
     
     # 旋回実行
     print(f"目標角度: {target_angle}° で旋回開始")
     await robot.turn(target_angle)
     
-    # 旋回後の角度を記録
-    await wait(500)
-    end_heading = hub.imu.heading()
-    print(f"終了角度: {end_heading:.1f}°")
+    # 旋回後の角度を記録（静止を確認してから読む）
+    settle_ms = await wait_until_settled_async(robot, hub)
+    end_heading = reference.heading()
+    print(f"終了角度: {end_heading:.1f}° (静定 {settle_ms}ms)")
     
     # 実際の旋回角度を計算
     actual_angle = end_heading - start_heading
@@ -143,30 +137,36 @@ async def single_angle_test(robot, hub, target_angle):
         'target': target_angle,
         'actual': actual_angle,
         'error': error,
-        'accuracy': accuracy_percent
+        'accuracy': accuracy_percent,
+        'settle_ms': settle_ms
     }
 
-async def repeat_accuracy_test(robot, hub, target_angle, repeat_count=5):
-    """同じ角度での繰り返し精度テスト"""
-    print(f"\n=== {target_angle}度旋回 繰り返し精度テスト ({repeat_count}回) ===")
+async def repeat_accuracy_test(robot, hub, target_angle, repeat_count=5, ci_width=None, max_count=15):
+    """同じ角度での繰り返し精度テスト
+
+    ci_width を指定すると、repeat_count 回を最少として、平均誤差の95%信頼区間の幅が
+    ci_width 以下になるまで（最多 max_count 回）繰り返します。
+    """
+    count_info = f"{repeat_count}回" if ci_width is None else f"{repeat_count}〜{max_count}回"
+    print(f"\n=== {target_angle}度旋回 繰り返し精度テスト ({count_info}) ===")
     
     results = []
+    signed_errors = []
+    reference = HeadingReference(hub)
     
-    for i in range(repeat_count):
+    while needs_more_trials(signed_errors, repeat_count, ci_width, max_count):
+        i = len(results)
         print(f"\n--- {i+1}回目 ---")
         
-        # リセット
-        robot.use_gyro(False)
-        hub.imu.reset_heading(0)
-        robot.use_gyro(True)
-        await wait(500)
+        # 今の向きを原点にする（IMU はリセットしないので待たずに旋回できる）
+        reference.zero()
         
         # テスト実行
-        result = await single_angle_test(robot, hub, target_angle)
+        result = await single_angle_test(robot, hub, target_angle, reference)
         results.append(result)
+        signed_errors.append(result['actual'] - target_angle)
         
-        # 次のテストのため待機
-        await wait(1000)
+        # single_angle_test で静止を確認済みなので、すぐに次へ進む
         robot.stop()
     
     # 統計結果を表示
@@ -184,55 +184,49 @@ async def repeat_accuracy_test(robot, hub, target_angle, repeat_count=5):
     print(f"最小誤差: {min_error:.1f}°")
     print(f"平均精度: {avg_accuracy:.1f}%")
     print(f"精度のばらつき: {max_error - min_error:.1f}°")
+    print(f"平均静定時間: {sum(r['settle_ms'] for r in results) / len(results):.0f}ms")
+    width = confidence_width(signed_errors)
+    if width is not None:
+        print(f"95%信頼区間の幅: {width:.2f}° ({len(results)}回)")
+
+# テストする速度設定（15%ずつ）
+SPEED_SETTINGS = [
+    {'straight_percent': 15, 'turn_percent': 10},   # 直進15%, 旋回10%
+    {'straight_percent': 30, 'turn_percent': 25},   # 直進30%, 旋回25%
+    {'straight_percent': 45, 'turn_percent': 40},   # 直進45%, 旋回40%
+    {'straight_percent': 60, 'turn_percent': 55},   # 直進60%, 旋回55%
+    {'straight_percent': 75, 'turn_percent': 70},   # 直進75%, 旋回70%
+    {'straight_percent': 90, 'turn_percent': 85},   # 直進90%, 旋回85%
+]
+
+# テストするモーター出力設定
+MOTOR_POWER_SETTINGS = [50, 75, 100, 125, 150]
+
+# 最も速い設定を選ぶときの許容誤差 [度]（ミッションの区間ごとに使い分ける）
+TOLERANCES_DEG = [0.5, 1.0, 2.0]
 
-async def speed_comparison_test(robot, hub, target_angle=90):
+def add_accuracy(results):
+    """スイープの結果に目標角度・実際角度・誤差・精度を追加する"""
+    for result in results:
+        if result.get('mean_error') is None:
+            continue
+        target_angle = result['angle']
+        result['target'] = target_angle
+        result['actual'] = target_angle + result['mean_error']
+        result['error'] = result['mean_abs_error']
+        result['accuracy'] = max(0, 100 - (result['error'] / target_angle * 100))
+        result['straight_speed_mmps'] = 500 * result['straight_percent'] / 100
+        result['turn_speed_degps'] = 500 * result['turn_percent'] / 100
+    # 前回の実行で完了済み（値が保存されていない）条件は除く
+    return [result for result in results if 'accuracy' in result]
+
+async def speed_comparison_test(robot, hub, target_angle=90, tolerances=TOLERANCES_DEG):
     """異なる速度での精度比較テスト"""
     print(f"\n=== 速度比較テスト ({target_angle}度旋回) ===")
     
-    # テストする速度設定（15%ずつ）
-    speed_settings = [
-        (15, 10),   # 直進15%, 旋回10%
-        (30, 25),   # 直進30%, 旋回25%
-        (45, 40),   # 直進45%, 旋回40%
-        (60, 55),   # 直進60%, 旋回55%
-        (75, 70),   # 直進75%, 旋回70%
-        (90, 85),   # 直進90%, 旋回85%
-    ]
-    
-    speed_results = []
-    
-    for straight_speed, turn_speed in speed_settings:
-        print(f"\n--- 速度設定: 直進{straight_speed}%, 旋回{turn_speed}% ---")
-        
-        # ロボットの速度設定を更新
-        straight_spd = 500 * (straight_speed / 100)
-        turn_spd = 500 * (turn_speed / 100)
-        
-        # 速度設定を適用
-        robot.settings(straight_speed=straight_spd, turn_rate=turn_spd)
-        
-        print(f"実際の速度: 直進{straight_spd:.0f}mm/s, 旋回{turn_spd:.0f}deg/s")
-        
-        # リセット
-        robot.use_gyro(False)
-        hub.imu.reset_heading(0)
-        robot.use_gyro(True)
-        await wait(500)
-        
-        # テスト実行
-        result = await single_angle_test(robot, hub, target_angle)
-        
-        # 速度情報を追加
-        result['straight_speed_percent'] = straight_speed
-        result['turn_speed_percent'] = turn_speed
-        result['straight_speed_mmps'] = straight_spd
-        result['turn_speed_degps'] = turn_spd
-        
-        speed_results.append(result)
-        
-        # 次のテストのため待機
-        await wait(1000)
-        robot.stop()
+    # 速度設定ごとに1回ずつ旋回して誤差を測る
+    conditions = make_grid(("speed", SPEED_SETTINGS), ("angle", [target_angle]))
+    speed_results = add_accuracy(await run_sweep(hub, robot, "turn", conditions, repeat=1))
     
     # 速度比較結果を表示
     print(f"\n=== 速度比較テスト結果サマリー ===")
@@ -240,8 +234,8 @@ async def speed_comparison_test(robot, hub, target_angle=90):
     print("-" * 70)
     
     for result in speed_results:
-        straight_info = f"{result['straight_speed_percent']:3.0f}% ({result['straight_speed_mmps']:3.0f}mm/s)"
-        turn_info = f"{result['turn_speed_percent']:3.0f}% ({result['turn_speed_degps']:3.0f}deg/s)"
+        straight_info = f"{result['straight_percent']:3.0f}% ({result['straight_speed_mmps']:3.0f}mm/s)"
+        turn_info = f"{result['turn_percent']:3.0f}% ({result['turn_speed_degps']:3.0f}deg/s)"
         target_info = f"{result['target']:3.0f}°"
         actual_info = f"{result['actual']:5.1f}°"
         error_info = f"{result['error']:4.1f}°"
@@ -249,72 +243,26 @@ async def speed_comparison_test(robot, hub, target_angle=90):
         
         print(f"{straight_info}\t{turn_info}\t{target_info}\t{actual_info}\t{error_info}\t{accuracy_info}")
     
-    # 最良の精度を特定
-    best_result = min(speed_results, key=lambda x: x['error'])
-    print(f"\n最良の精度: 直進{best_result['straight_speed_percent']}%, 旋回{best_result['turn_speed_percent']}%")
-    print(f"誤差: {best_result['error']:.1f}°, 精度: {best_result['accuracy']:.1f}%")
+    # 誤差が最小の設定はたいてい最も遅いので、時間と誤差の釣り合いで選ぶ
+    if speed_results:
+        print_tradeoff(speed_results, ("straight_percent", "turn_percent"), "度", tolerances)
     
     return speed_results
 
-async def comprehensive_test(robot, hub, target_angle=90):
+async def comprehensive_test(robot, hub, target_angle=90, tolerances=TOLERANCES_DEG):
     """速度とモーター出力の組み合わせによる包括的テスト"""
     print(f"\n=== 包括的テスト ({target_angle}度旋回) ===")
     
-    # テストする速度設定
-    speed_settings = [
-        (15, 10),   # 直進15%, 旋回10%
-        (30, 25),   # 直進30%, 旋回25%
-        (45, 40),   # 直進45%, 旋回40%
-        (60, 55),   # 直進60%, 旋回55%
-        (75, 70),   # 直進75%, 旋回70%
-        (90, 85),   # 直進90%, 旋回85%
-    ]
-    
-    # テストするモーター出力設定
-    motor_power_settings = [50, 75, 100, 125, 150]
+    def set_motor_power(condition):
+        # モーター出力設定を適用
+        robot.left_motor.control.limits(power=condition['motor_power'])
+        robot.right_motor.control.limits(power=condition['motor_power'])
     
-    comprehensive_results = []
-    
-    for straight_speed, turn_speed in speed_settings:
-        for motor_power in motor_power_settings:
-            print(f"\n--- 速度: 直進{straight_speed}%/旋回{turn_speed}%, モーター出力: {motor_power}% ---")
-            
-            # ロボットの速度設定を更新
-            straight_spd = 500 * (straight_speed / 100)
-            turn_spd = 500 * (turn_speed / 100)
-            
-            # 速度設定を適用
-            robot.settings(straight_speed=straight_spd, turn_rate=turn_spd)
-            
-            # モーター出力設定を適用
-            left_motor = robot.left_motor
-            right_motor = robot.right_motor
-            left_motor.control.limits(power=motor_power)
-            right_motor.control.limits(power=motor_power)
-            
-            print(f"実際の設定: 直進{straight_spd:.0f}mm/s, 旋回{turn_spd:.0f}deg/s, モーター出力{motor_power}%")
-            
-            # リセット
-            robot.use_gyro(False)
-            hub.imu.reset_heading(0)
-            robot.use_gyro(True)
-            await wait(500)
-            
-            # テスト実行
-            result = await single_angle_test(robot, hub, target_angle)
-            
-            # 設定情報を追加
-            result['straight_speed_percent'] = straight_speed
-            result['turn_speed_percent'] = turn_speed
-            result['motor_power_percent'] = motor_power
-            result['straight_speed_mmps'] = straight_spd
-            result['turn_speed_degps'] = turn_spd
-            
-            comprehensive_results.append(result)
-            
-            # 次のテストのため待機
-            await wait(1000)
-            robot.stop()
+    # 速度設定とモーター出力の全組み合わせで1回ずつ旋回して誤差を測る
+    conditions = make_grid(("speed", SPEED_SETTINGS), ("motor_power", MOTOR_POWER_SETTINGS),
+                           ("angle", [target_angle]))
+    comprehensive_results = add_accuracy(
+        await run_sweep(hub, robot, "turn", conditions, repeat=1, prepare=set_motor_power))
     
     # 包括的テスト結果を表示
     print(f"\n=== 包括的テスト結果サマリー ===")
@@ -322,9 +270,9 @@ async def comprehensive_test(robot, hub, target_angle=90):
     print("-" * 90)
     
     for result in comprehensive_results:
-        straight_info = f"{result['straight_speed_percent']:3.0f}%"
-        turn_info = f"{result['turn_speed_percent']:3.0f}%"
-        power_info = f"{result['motor_power_percent']:3.0f}%"
+        straight_info = f"{result['straight_percent']:3.0f}%"
+        turn_info = f"{result['turn_percent']:3.0f}%"
+        power_info = f"{result['motor_power']:3.0f}%"
         target_info = f"{result['target']:3.0f}°"
         actual_info = f"{result['actual']:5.1f}°"
         error_info = f"{result['error']:4.1f}°"
@@ -332,15 +280,42 @@ async def comprehensive_test(robot, hub, target_angle=90):
         
         print(f"{straight_info}\t\t{turn_info}\t\t{power_info}\t\t{target_info}\t{actual_info}\t{error_info}\t{accuracy_info}")
     
-    # 最良の精度を特定
-    best_result = min(comprehensive_results, key=lambda x: x['error'])
-    print(f"\n最良の精度設定:")
-    print(f"直進速度: {best_result['straight_speed_percent']}%, 旋回速度: {best_result['turn_speed_percent']}%")
-    print(f"モーター出力: {best_result['motor_power_percent']}%")
-    print(f"誤差: {best_result['error']:.1f}°, 精度: {best_result['accuracy']:.1f}%")
+    # 誤差が最小の設定はたいてい最も遅いので、時間と誤差の釣り合いで選ぶ
+    if comprehensive_results:
+        print_tradeoff(comprehensive_results, ("straight_percent", "turn_percent", "motor_power"), "度", tolerances)
     
     return comprehensive_results
 
+# 最適化で試す旋回PIDゲイン (kp, ki, kd)
+HEADING_PID_SETTINGS = [
+    (2000, 50, 100),   # setup.py の既定値
+    (1500, 30, 80),
+    (2500, 50, 150),
+    (3000, 80, 200),
+]
+
+async def optimize_test(robot, hub, target_angle=90, goal="accuracy", tolerance=1.0, candidates=8):
+    """速度・モーター出力・PIDゲインの最適化テスト（全組み合わせを試す代わり）"""
+    print(f"\n=== 最適化テスト ({target_angle}度旋回, 目標: {goal}) ===")
+    
+    def set_motor_power(condition):
+        # モーター出力設定を適用
+        robot.left_motor.control.limits(power=condition['motor_power'])
+        robot.right_motor.control.limits(power=condition['motor_power'])
+    
+    space = [
+        ("speed", SPEED_SETTINGS),
+        ("motor_power", MOTOR_POWER_SETTINGS),
+        ("heading_pid", HEADING_PID_SETTINGS),
+    ]
+    best = await successive_halving(hub, robot, "turn", space, {"angle": target_angle}, goal, tolerance,
+                                    candidates, prepare=set_motor_power)
+    
+    print(f"直進速度: {best['straight_percent']}%, 旋回速度: {best['turn_percent']}%")
+    print(f"モーター出力: {best['motor_power']}%, 旋回PID: {best['heading_pid']}")
+    print(f"平均絶対誤差: {best['mean_abs_error']:.2f}°, 平均時間: {best['mean_time_ms']:.0f}ms")
+    return best
+
 def run_experiment(straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100):
     """実験の実行"""
     print("=== 旋回精度実験開始 ===")
@@ -348,11 +323,14 @@ def run_experiment(straight_speed_percent=40, turn_speed_percent=30, motor_power
     # 初期化
     hub, left, right, robot = initialize_robot(straight_speed_percent, turn_speed_percent, motor_power_percent)
     
-    # 実験実行
+    # 実験実行（センサー値はバッファに記録し、終了後にまとめて出力）
+    recorder = TelemetryRecorder(hub, left, right, robot)
     run_task(multitask(
-        sensor_logger_task(hub, left, right, robot),  # センサー値ログ
-        turn_accuracy_test(robot, hub)                # 旋回精度測定テスト
+        recorder.run(),                               # センサー値ログ
+        turn_accuracy_test(robot, hub),               # 旋回精度測定テスト
+        race=True
     ))
+    recorder.dump()
 
     print("=== 実験完了 ===")
 
@@ -366,7 +344,8 @@ def run_single_test(straight_speed_percent=40, turn_speed_percent=30, motor_powe
     # テスト実行
     run_task(single_angle_test(robot, hub, target_angle))
 
-def run_repeat_test(straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100, target_angle=90, repeat_count=5):
+def run_repeat_test(straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100, target_angle=90, repeat_count=5,
+                    ci_width=None):
     """繰り返しテストの実行"""
     print("=== 繰り返し精度テスト開始 ===")
     
@@ -374,7 +353,7 @@ def run_repeat_test(straight_speed_percent=40, turn_speed_percent=30, motor_powe
     hub, left, right, robot = initialize_robot(straight_speed_percent, turn_speed_percent, motor_power_percent)
     
     # テスト実行
-    run_task(repeat_accuracy_test(robot, hub, target_angle, repeat_count))
+    run_task(repeat_accuracy_test(robot, hub, target_angle, repeat_count, ci_width))
 
 def run_speed_comparison_test(target_angle=90, motor_power_percent=100):
     """速度比較テストの実行"""
@@ -396,6 +375,16 @@ def run_comprehensive_test(target_angle=90):
     # テスト実行
     run_task(comprehensive_test(robot, hub, target_angle))
 
+def run_optimize_test(target_angle=90, goal="accuracy", tolerance=1.0, candidates=8):
+    """最適化テストの実行"""
+    print("=== 最適化テスト開始 ===")
+    
+    # 初期化
+    hub, left, right, robot = initialize_robot(40, 30, 100)  # 初期設定（後で変更される）
+    
+    # テスト実行
+    return run_task(optimize_test(robot, hub, target_angle, goal, tolerance, candidates))
+
 # プログラムの実行
 if __name__ == "__main__":
     print("=== 旋回精度テストメニュー ===")
@@ -405,12 +394,13 @@ if __name__ == "__main__":
     print("4. 速度比較テスト")
     print("5. 包括的テスト（速度とモーター出力の全組み合わせ）")
     print("6. 全パターンテスト（モーター出力別 + 包括的テスト）")
+    print("7. 最適化テスト（少ない回数で最良の設定を探す）")
     print("0. 終了")
     print("=" * 40)
     
     while True:
         try:
-            choice = input("実行したいテストの番号を入力してください (0-6): ")
+            choice = input("実行したいテストの番号を入力してください (0-7): ")
             
             if choice == "0":
                 print("プログラムを終了します。")
@@ -481,8 +471,16 @@ if __name__ == "__main__":
                 print("\n" + "="*60)
                 print("全モーター出力パターンのテスト完了！")
                 print("="*60)
+            elif choice == "7":
+                print("\n=== 最適化テスト開始 ===")
+                target_angle = int(input("目標角度を入力してください (度): "))
+                goal = input("目標を入力してください (accuracy: 最も正確 / fast: 許容誤差内で最速): ") or "accuracy"
+                tolerance = 1.0
+                if goal == "fast":
+                    tolerance = float(input("許容誤差を入力してください (度): "))
+                run_optimize_test(target_angle=target_angle, goal=goal, tolerance=tolerance)
             else:
-                print("無効な選択です。0-6の数字を入力してください。")
+                print("無効な選択です。0-7の数字を入力してください。")
             
             print("\n" + "="*40)
             print("メニューに戻ります...")
@@ -0,0 +1,116 @@
+# タイヤ直径とトレッド幅（axle_track）を実測から求めるキャリブレーション
+#
+# 1. タイヤ直径: 決まった距離を直進し、実際に進んだ距離をメジャーで測って入力する
+#    （入力した実測値が基準。タイヤの回転から計算した距離との比で直径を補正する）
+# 2. トレッド幅: ジャイロを使わずにその場で数回転し、タイヤの回転角と IMU の heading から求める
+# 3. ジャイロのバイアス: 静止した状態で補正前の角速度を数回測って平均する
+#
+# どちらも数回繰り返して平均と95%信頼区間（±）を表示し、確認後にハブに保存します。
+# 保存した値は setup.py の initialize_robot() が次回から読み込みます。
+
+import math
+from setup import initialize_robot
+from settle import wait_until_settled
+from sweep import confidence_width
+from calibration import load_calibration, update_calibration, measure_gyro_bias
+
+# ===== キャリブレーションの設定 =====
+DISTANCE_MM = 1000     # 直径の測定で直進する距離（メジャーで測りやすい長さ）
+SPIN_TURNS = 3         # トレッド幅の測定で回転する回数（多いほど誤差の影響が小さい）
+RUNS = 3               # 各測定の繰り返し回数
+
+
+def report(name, values, unit):
+    """測定値の平均と95%信頼区間の半幅を表示し、(平均, 半幅) を返す"""
+    mean = sum(values) / len(values)
+    width = confidence_width(values)
+    half = width / 2 if width is not None else 0
+    print(f"{name}: {mean:.2f} ± {half:.2f} {unit}（95%信頼区間, {len(values)}回）")
+    print("  各回: " + ", ".join(f"{v:.2f}" for v in values))
+    return mean, half
+
+
+def calibrate_wheel_diameter(hub, robot, wheel_diameter, distance_mm=DISTANCE_MM, runs=RUNS):
+    """決まった距離を直進し、実測した距離との比から実効的なタイヤ直径を求める"""
+    print(f"\n=== タイヤ直径のキャリブレーション（{distance_mm}mm 直進 x {runs}回）===")
+    print(f"現在の設定: {wheel_diameter:.2f} mm")
+    diameters = []
+    for run in range(1, runs + 1):
+        print(f"\n--- {run}/{runs}回目 ---")
+        input("ロボットをスタート位置に置いて Enter を押してください: ")
+        robot.reset()
+        robot.straight(distance_mm)
+        wait_until_settled(robot, hub)
+        reported = robot.distance()
+
+        # ロボットが計算した距離は「回転角 x π x 設定した直径」なので、
+        # 実際の距離との比で直径を補正できる
+        measured = float(input(f"実際に進んだ距離を入力してください [mm]（ロボットの計算値 {reported}mm）: "))
+        diameters.append(wheel_diameter * measured / reported)
+
+        robot.straight(-reported)
+        wait_until_settled(robot, hub)
+    return report("タイヤ直径", diameters, "mm")
+
+
+def calibrate_axle_track(hub, robot, left, right, wheel_diameter, turns=SPIN_TURNS, runs=RUNS):
+    """その場で回転し、左右のタイヤが進んだ距離の差と IMU の回転角からトレッド幅を求める"""
+    print(f"\n=== トレッド幅のキャリブレーション（{turns}回転 x {runs}回）===")
+    # タイヤの回転角で旋回させる（ジャイロで補正すると回転角と heading が常に一致してしまう）
+    robot.use_gyro(False)
+    tracks = []
+    for run in range(1, runs + 1):
+        direction = 1 if run % 2 else -1    # 左右交互に回ってケーブルのねじれなどを打ち消す
+        wait_until_settled(robot, hub)
+        start_heading = hub.imu.heading()
+        start_left = left.angle()
+        start_right = right.angle()
+
+        robot.turn(direction * 360 * turns)
+        wait_until_settled(robot, hub)
+
+        rotation = hub.imu.heading() - start_heading
+        # 左右のタイヤの移動距離の差 = 回転角[rad] x トレッド幅
+        wheel_mm = math.pi * wheel_diameter / 360
+        difference = ((left.angle() - start_left) - (right.angle() - start_right)) * wheel_mm
+        track = difference / math.radians(rotation)
+        tracks.append(track)
+        print(f"{run}/{runs}回目: IMU {rotation:.1f}度, 左右差 {difference:.1f}mm → {track:.2f}mm")
+    robot.use_gyro(True)
+    return report("トレッド幅", tracks, "mm")
+
+
+def calibrate_gyro_bias(hub, runs=RUNS):
+    """静止した状態で補正前の角速度を測り、ジャイロのバイアスを求める"""
+    print(f"\n=== ジャイロのバイアス（静止 x {runs}回）===")
+    input("ロボットを平らな場所に置き、触らずに Enter を押してください: ")
+    biases = []
+    for run in range(1, runs + 1):
+        bias = measure_gyro_bias(hub)
+        biases.append(bias)
+        print(f"{run}/{runs}回目: {bias:+.3f} deg/s")
+    return report("ジャイロのバイアス", biases, "deg/s")
+
+
+def run_calibration():
+    """タイヤ直径 → トレッド幅 → ジャイロのバイアスの順にキャリブレーションし、確認後に保存"""
+    hub, left, right, robot = initialize_robot()
+    calibration = load_calibration(hub)
+
+    wheel_diameter, _ = calibrate_wheel_diameter(hub, robot, calibration["wheel_diameter"])
+    # トレッド幅は求めた直径で計算する（直径の誤差がそのまま乗るため）
+    axle_track, _ = calibrate_axle_track(hub, robot, left, right, wheel_diameter)
+    gyro_bias, _ = calibrate_gyro_bias(hub)
+
+    print(f"\n=== 結果 ===")
+    print(f"タイヤ直径: {calibration['wheel_diameter']:.2f} → {wheel_diameter:.2f} mm")
+    print(f"トレッド幅: {calibration['axle_track']:.2f} → {axle_track:.2f} mm")
+    print(f"ジャイロのバイアス: {calibration['gyro_bias']:+.3f} → {gyro_bias:+.3f} deg/s")
+    if input("この値をハブに保存しますか？ (y/n): ") == "y":
+        update_calibration(hub, "wheel_diameter", wheel_diameter)
+        update_calibration(hub, "axle_track", axle_track)
+        update_calibration(hub, "gyro_bias", gyro_bias)
+
+
+if __name__ == "__main__":
+    run_calibration()
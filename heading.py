@@ -0,0 +1,35 @@
+from pybricks.parameters import Stop
+
+
+class HeadingReference:
+    """IMU の heading に対するソフトウェアの原点
+
+    hub.imu.reset_heading() は DriveBase が使っている heading まで動かしてしまうので、
+    これまでは use_gyro(False) → reset_heading(0) → use_gyro(True) → wait(500) と切り替えていました。
+    ここでは原点の値を覚えておき、読むときに差し引くだけにします。
+    IMU にも DriveBase にも触らないので、zero() の直後にそのまま次の旋回や測定を始められます。
+    """
+
+    def __init__(self, hub, angle=0):
+        self.hub = hub
+        self.offset = 0
+        self.zero(angle)
+
+    def zero(self, angle=0):
+        """今の向きを angle 度とみなす（hub.imu.reset_heading(angle) の代わり）"""
+        self.offset = self.hub.imu.heading() - angle
+
+    def heading(self):
+        """原点からの向き [度]"""
+        return self.hub.imu.heading() - self.offset
+
+    def error(self, target):
+        """target 度の向きまで旋回すべき角度 [度]（-180〜180 の最短側）"""
+        return (target - self.heading() + 180) % 360 - 180
+
+    def turn_to(self, robot, target, then=Stop.HOLD, wait=True):
+        """原点から target 度の向きまで旋回する
+
+        前の旋回の誤差も含めて今の向きから計算するので、相対の turn() を重ねても誤差がたまりません。
+        """
+        return robot.turn(self.error(target), then=then, wait=wait)
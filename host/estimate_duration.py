@@ -0,0 +1,500 @@
+"""ミッションのスクリプトを読んで、ロボットを動かさずに所要時間を見積もる
+
+使い方（リポジトリのルートで実行）:
+    python host/estimate_duration.py SUBMERGED_M10.py
+    python host/estimate_duration.py run.py SUBMERGED_M10.py          # 複数のスクリプトを比較
+    python host/estimate_duration.py Speed_test.py -f main_robot_sequence_task
+
+スクリプトは実行せずに構文木（ast）を読み、次の呼び出しを上から順に拾います。
+    robot.settings(...) / robot.straight / turn / curve / reset
+    <モーター>.run_target / run_angle / wait(ms)
+    run_table(robot, lift, 表)（mission.py。表の中の table_rows() は motion.py を呼んで展開）
+定数はモジュールの代入文から、関数の引数は get_mission_parameters() のような
+「dict を返すだけの関数」から値を求めます。
+各動作の時間は、シミュレーターと同じ台形速度プロファイルで計算します。
+if / while の中身は見積もりません（警告を表示します）。
+"""
+
+import argparse
+import ast
+import math
+import os
+import sys
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOST_DIR)
+
+from pybricks._motion import Profile  # noqa: E402
+
+# DriveBase の既定の設定 [直進速度, 直進加速度, 旋回速度, 旋回加速度]（シミュレーターと同じ）
+DRIVE_DEFAULTS = [200, 400, 200, 400]
+# モーターの既定の加速度 [deg/s^2]
+MOTOR_ACCEL = 2000
+# 試合時間 [ms]
+MATCH_BUDGET_MS = 150000
+# 既定で見積もる関数
+DEFAULT_FUNCTION = "main_robot_sequence_task"
+
+DRIVE_METHODS = ("straight", "turn", "curve", "arc", "settings", "reset")
+# 表を作るためにリポジトリの実物を呼んで評価する関数 {名前: モジュール}
+HELPERS = {"table_rows": "motion"}
+MOTOR_METHODS = ("run_target", "run_angle")
+
+
+class Unknown(Exception):
+    """静的に値を決められない式"""
+
+
+# ───────────────────────────────────────────
+# 式の評価
+# ───────────────────────────────────────────
+
+class Evaluator:
+    """リテラル・定数・簡単な演算だけを評価する"""
+
+    def __init__(self, module):
+        self.module = module
+        self.constants = {}
+        self.functions = {}
+        for node in module.body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                self.functions[node.name] = node
+        for node in module.body:
+            if isinstance(node, ast.Assign):
+                self.assign(node, self.constants)
+
+    def assign(self, node, scope):
+        for target in node.targets:
+            try:
+                value = self.eval(node.value, scope)
+            except Unknown:
+                continue
+            if isinstance(target, ast.Name):
+                scope[target.id] = value
+            elif isinstance(target, ast.Tuple) and isinstance(value, tuple) and len(value) == len(target.elts):
+                for element, item in zip(target.elts, value):
+                    if isinstance(element, ast.Name):
+                        scope[element.id] = item
+
+    def eval(self, node, scope):
+        try:
+            return self._eval(node, scope)
+        except (TypeError, KeyError, IndexError, ValueError, ZeroDivisionError):
+            raise Unknown(ast.dump(node)[:40])
+
+    def _eval(self, node, scope):
+        if isinstance(node, ast.Constant):
+            return node.value
+        if isinstance(node, ast.Name):
+            if node.id in scope:
+                return scope[node.id]
+            if node.id in self.constants:
+                return self.constants[node.id]
+            raise Unknown(node.id)
+        if isinstance(node, ast.Attribute) and isinstance(node.value, ast.Name):
+            # Stop.NONE などは "NONE" という文字列として扱う
+            return node.attr
+        if isinstance(node, (ast.Tuple, ast.List)):
+            return tuple(self.eval(e, scope) for e in node.elts)
+        if isinstance(node, ast.Dict):
+            return {self.eval(k, scope): self.eval(v, scope) for k, v in zip(node.keys, node.values)}
+        if isinstance(node, ast.Subscript):
+            return self.eval(node.value, scope)[self.eval(node.slice, scope)]
+        if isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.USub):
+            return -self.eval(node.operand, scope)
+        if isinstance(node, ast.BinOp):
+            left = self.eval(node.left, scope)
+            right = self.eval(node.right, scope)
+            ops = {ast.Add: lambda a, b: a + b, ast.Sub: lambda a, b: a - b,
+                   ast.Mult: lambda a, b: a * b, ast.Div: lambda a, b: a / b,
+                   ast.FloorDiv: lambda a, b: a // b}
+            if type(node.op) in ops:
+                return ops[type(node.op)](left, right)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Name):
+            if node.func.id in self.functions:
+                args = [self.eval(a, scope) for a in node.args]
+                return self.call(self.functions[node.func.id], args)
+            if node.func.id == "range":
+                return tuple(range(*[self.eval(a, scope) for a in node.args]))
+            if node.func.id in HELPERS:
+                sys.path.insert(0, os.getcwd())
+                module = __import__(HELPERS[node.func.id])
+                args = [self.eval(a, scope) for a in node.args]
+                kwargs = {k.arg: self.eval(k.value, scope) for k in node.keywords}
+                return getattr(module, node.func.id)(*args, **kwargs)
+        raise Unknown(ast.dump(node)[:40])
+
+    def call(self, function, args):
+        """代入文と return だけの関数を評価する（get_mission_parameters() など）"""
+        scope = {}
+        for param, value in zip(function.args.args, args):
+            scope[param.arg] = value
+        for node in function.body:
+            if isinstance(node, ast.Assign):
+                self.assign(node, scope)
+            elif isinstance(node, ast.Return):
+                return self.eval(node.value, scope)
+        raise Unknown(function.name)
+
+
+# ───────────────────────────────────────────
+# 時間の見積もり
+# ───────────────────────────────────────────
+
+def _accel(value):
+    return value[0] if isinstance(value, tuple) else value
+
+
+class Estimator:
+    """動作を順に積み上げて時刻を進める
+
+    走行（DriveBase）とモーターごとに「動作が終わる時刻」を持つので、
+    待たずに始めた動作（wait=False や "&"）は後の動作と重なります。
+    """
+
+    def __init__(self, settle_ms=0):
+        self.settle_ms = settle_ms
+        self.now = 0.0
+        self.settings = list(DRIVE_DEFAULTS)
+        self.drive_free = 0.0
+        self.carry = 0.0            # Stop.NONE で引き継ぐ走行速度 [mm/s]
+        self.turn_carry = 0.0       # Stop.NONE で引き継ぐカーブの旋回速度 [deg/s]
+        self.distance = 0.0         # 走行距離（robot.distance() に相当）[mm]
+        self.heading = 0.0          # 向き（robot.angle() に相当）[度]
+        self.segments = []          # (開始時刻[s], プロファイル, 開始距離, 換算係数, 開始の向き, 向きの係数)
+        self.motors = {}            # 名前 -> [角度, 動作が終わる時刻]
+        self.rows = []              # (行番号, 内容, 開始[ms], 時間[ms])
+        self.warnings = []
+
+    def record(self, line, text, start, duration):
+        self.rows.append((line, text, start, duration))
+
+    # --- 走行 ---
+
+    def _drive(self, line, text, profile, scale, then, wait, turn=0.0):
+        start = max(self.now, self.drive_free) if wait else self.now
+        duration = profile.duration * 1000
+        if then != "NONE":
+            duration += self.settle_ms
+        self.segments.append((start, profile, self.distance, scale, self.heading, turn))
+        self.distance += (profile.length * profile.sign) * scale
+        self.heading += (profile.length * profile.sign) * turn
+        self.drive_free = start + duration
+        self.record(line, text, start, duration)
+        if wait:
+            self.now = self.drive_free
+
+    def straight(self, line, distance, then="HOLD", wait=True):
+        speed, accel, _, _ = self.settings
+        v_end = speed if then == "NONE" else 0.0
+        profile = Profile(0, distance, speed, _accel(accel), _accel(accel), self.carry, v_end)
+        self.carry = v_end * profile.sign
+        self.turn_carry = 0.0
+        self._drive(line, f"straight({distance:g})", profile, 1.0, then, wait)
+
+    def turn(self, line, angle, then="HOLD", wait=True):
+        _, _, rate, accel = self.settings
+        profile = Profile(0, angle, rate, _accel(accel), _accel(accel))
+        self.carry = self.turn_carry = 0.0
+        self._drive(line, f"turn({angle:g})", profile, 0.0, then, wait, 1.0)
+
+    def curve(self, line, radius, angle, then="HOLD", wait=True):
+        # シミュレーターと同じく、旋回の角度のプロファイルに距離が比例してついていく
+        speed, _, rate, accel = self.settings
+        if radius:
+            rate = min(rate, math.degrees(speed / abs(radius)))
+        v_end = rate if then == "NONE" else 0.0
+        profile = Profile(0, abs(angle), rate, _accel(accel), _accel(accel), self.turn_carry, v_end)
+        # 角度 1 度あたりの走行距離（robot.distance() は |radius| x angle だけ変わる）
+        scale = math.radians(1) * abs(radius) * (1 if angle >= 0 else -1)
+        self.carry = v_end * scale
+        self.turn_carry = v_end
+        # 向きは半径の符号で決まる向きに |angle| だけ変わる（後退では逆向き）
+        turn = -1.0 if (radius < 0) == (angle >= 0) else 1.0
+        self._drive(line, f"curve({radius:g}, {angle:g})", profile, scale, then, wait, turn)
+
+    def time_at_distance(self, distance):
+        """走行距離の絶対値が distance を超える時刻 [ms]（見つからなければ走行の終わり）"""
+        for start, profile, base, scale, _, _ in self.segments:
+            steps = int(profile.duration * 200) + 1
+            for k in range(steps + 1):
+                t = k / 200
+                pos = profile.sample(t)[0]
+                if abs(base + pos * scale) > distance:
+                    return start + t * 1000
+        return self.drive_free
+
+    def time_at_heading(self, angle):
+        """向きが angle を 0 から見て超える時刻 [ms]（見つからなければ走行の終わり）"""
+        direction = 1 if angle >= 0 else -1
+        for start, profile, _, _, base, turn in self.segments:
+            steps = int(profile.duration * 200) + 1
+            for k in range(steps + 1):
+                t = k / 200
+                pos = profile.sample(t)[0]
+                if (base + pos * turn) * direction >= angle * direction:
+                    return start + t * 1000
+        return self.drive_free
+
+    # --- モーター ---
+
+    def run_target(self, line, name, speed, target, wait=True):
+        angle, free = self.motors.get(name, [0.0, 0.0])
+        start = self.now
+        profile = Profile(angle, target, min(abs(speed), 1000), MOTOR_ACCEL, MOTOR_ACCEL)
+        duration = profile.duration * 1000 + self.settle_ms
+        self.motors[name] = [target, start + duration]
+        self.record(line, f"{name}.run_target({speed:g}, {target:g})", start, duration)
+        if wait:
+            self.now = start + duration
+
+    def join(self, line, names):
+        start = self.now
+        self.now = max([self.now, self.drive_free] + [self.motors[n][1] for n in names if n in self.motors])
+        self.record(line, "（走行とアームの完了を待つ）", start, self.now - start)
+
+    def wait(self, line, ms):
+        self.record(line, f"wait({ms:g})", self.now, ms)
+        self.now += ms
+
+    @property
+    def total(self):
+        return max([self.now, self.drive_free] + [m[1] for m in self.motors.values()])
+
+
+# ───────────────────────────────────────────
+# スクリプトの読み取り
+# ───────────────────────────────────────────
+
+def _keywords(call, evaluator, scope):
+    values = {}
+    for keyword in call.keywords:
+        try:
+            values[keyword.arg] = evaluator.eval(keyword.value, scope)
+        except Unknown:
+            pass
+    return values
+
+
+class Walker:
+    """関数の本文を上から順にたどって Estimator に動作を積む"""
+
+    def __init__(self, evaluator, estimator):
+        self.evaluator = evaluator
+        self.estimator = estimator
+        self.depth = 0
+
+    def run_function(self, function, scope):
+        self.depth += 1
+        if self.depth > 10:
+            return
+        self.body(function.body, scope)
+        self.depth -= 1
+
+    def body(self, statements, scope):
+        for node in statements:
+            self.statement(node, scope)
+
+    def statement(self, node, scope):
+        if isinstance(node, ast.Assign):
+            for call in self.calls(node.value):
+                self.call(call, scope)
+            self.evaluator.assign(node, scope)
+        elif isinstance(node, (ast.Expr, ast.Return)) and node.value is not None:
+            for call in self.calls(node.value):
+                self.call(call, scope)
+        elif isinstance(node, ast.For):
+            try:
+                values = self.evaluator.eval(node.iter, scope)
+            except Unknown:
+                self.estimator.warnings.append(f"{node.lineno}行目: 回数が分からない for 文は1回として見積もります")
+                values = (None,)
+            for value in values:
+                if isinstance(node.target, ast.Name):
+                    scope[node.target.id] = value
+                self.body(node.body, scope)
+        elif isinstance(node, (ast.If, ast.While, ast.Try)):
+            self.estimator.warnings.append(f"{node.lineno}行目: if / while / try の中は見積もりません")
+        elif isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            self.evaluator.functions[node.name] = node
+
+    def calls(self, node):
+        """式に含まれる呼び出しを外側から順に返す（await や multitask の中も含む）"""
+        if isinstance(node, ast.Await):
+            return self.calls(node.value)
+        if isinstance(node, ast.Call):
+            if isinstance(node.func, ast.Name) and node.func.id in ("multitask", "run_task"):
+                found = []
+                for arg in node.args:
+                    found.extend(self.calls(arg))
+                return found
+            return [node]
+        return []
+
+    def call(self, node, scope):
+        est = self.estimator
+        ev = self.evaluator
+        line = node.lineno
+        # robot や lift のように値の分からない引数は None にしておく
+        args = []
+        known = True
+        for a in node.args:
+            try:
+                args.append(ev.eval(a, scope))
+            except Unknown:
+                args.append(None)
+                known = False
+        kwargs = _keywords(node, ev, scope)
+        func = node.func
+
+        if isinstance(func, ast.Name):
+            name = func.id
+            if name == "wait" and known and args:
+                est.wait(line, args[0])
+            elif name == "run_table" and len(args) > 2 and args[2] is not None:
+                self.table(line, args[2], self.motor_name(node.args[1]))
+            elif name in ev.functions:
+                # 同じファイルの関数はその中身をたどる
+                function = ev.functions[name]
+                inner = {}
+                for param, value in zip(function.args.args, args):
+                    if value is not None:
+                        inner[param.arg] = value
+                self.run_function(function, inner)
+            return
+
+        if not isinstance(func, ast.Attribute):
+            return
+        method = func.attr
+        owner = self.motor_name(func.value)
+        if not known and method in DRIVE_METHODS + MOTOR_METHODS:
+            est.warnings.append(f"{line}行目: {owner}.{method}() の引数が分からないため見積もりません")
+            return
+        then = kwargs.get("then", "HOLD")
+        wait = kwargs.get("wait", True)
+        if method == "settings":
+            for i, key in enumerate(("straight_speed", "straight_acceleration", "turn_rate", "turn_acceleration")):
+                if key in kwargs:
+                    est.settings[i] = kwargs[key]
+            for i, value in enumerate(args):
+                est.settings[i] = value
+        elif method == "straight":
+            est.straight(line, args[0], then, wait)
+        elif method == "turn":
+            est.turn(line, args[0], then, wait)
+        elif method in ("curve", "arc"):
+            est.curve(line, args[0], args[1] if len(args) > 1 else kwargs.get("angle", 0), then, wait)
+        elif method == "reset" and owner == "robot":
+            est.distance = 0.0
+            est.heading = 0.0
+            est.segments = []
+        elif method == "run_target":
+            est.run_target(line, owner, args[0], args[1], wait)
+        elif method == "run_angle":
+            angle = est.motors.get(owner, [0.0, 0.0])[0]
+            est.run_target(line, owner, args[0], angle + args[1], wait)
+
+    @staticmethod
+    def motor_name(node):
+        return node.id if isinstance(node, ast.Name) else "motor"
+
+    def table(self, line, table, lift):
+        """mission.py のステップ表を見積もる"""
+        est = self.estimator
+        for op, arg, speed, then, timeout in table:
+            kind = op[0]
+            wait = op[-1] != "&"
+            # table_rows() が作った行は Stop.NONE の実物なので名前にそろえる
+            then = getattr(then, "name", then) or "HOLD"
+            if kind in ("S", "C") and speed:
+                est.settings[0] = speed
+            if kind == "T" and speed:
+                est.settings[2] = speed
+            if kind == "S":
+                est.straight(line, arg, then, wait)
+            elif kind == "T":
+                est.turn(line, arg, then, wait)
+            elif kind == "C":
+                est.curve(line, arg[0], arg[1], then, wait)
+            elif kind == "L":
+                est.run_target(line, lift, speed or 180, arg, wait)
+            elif kind == "W":
+                est.wait(line, arg)
+            elif kind == "D":
+                start = est.now
+                est.now = max(est.now, est.time_at_distance(arg))
+                est.record(line, f"（走行距離 {arg}mm まで待つ）", start, est.now - start)
+            elif kind == "H":
+                start = est.now
+                est.now = max(est.now, est.time_at_heading(arg))
+                est.record(line, f"（向き {arg}° まで待つ）", start, est.now - start)
+            elif kind == "J":
+                est.join(line, [lift])
+            elif kind == "G":
+                est.warnings.append(f"{line}行目: \"G\"（座標への移動）は今の位置によるので見積もりません")
+
+
+def estimate(path, function=None, settle_ms=0):
+    """スクリプトの所要時間を見積もって Estimator を返す"""
+    with open(path, encoding="utf-8") as f:
+        module = ast.parse(f.read(), path)
+    evaluator = Evaluator(module)
+    estimator = Estimator(settle_ms)
+    walker = Walker(evaluator, estimator)
+
+    name = function or (DEFAULT_FUNCTION if DEFAULT_FUNCTION in evaluator.functions else None)
+    if name is None:
+        walker.body(module.body, {})
+        return estimator
+    target = evaluator.functions[name]
+    # 引数は同じ名前のモジュール定数、なければ get_<引数名> 系の関数の戻り値から求める
+    scope = {}
+    for param in target.args.args:
+        if param.arg in evaluator.constants:
+            scope[param.arg] = evaluator.constants[param.arg]
+        elif param.arg == "params" and "get_mission_parameters" in evaluator.functions:
+            scope[param.arg] = evaluator.call(evaluator.functions["get_mission_parameters"], [])
+    # 関数の外で settings() を呼んでいる場合があるので、先にモジュールの直下をたどる
+    for node in module.body:
+        if isinstance(node, ast.Expr):
+            for call in walker.calls(node.value):
+                if isinstance(call.func, ast.Attribute) and call.func.attr == "settings":
+                    walker.call(call, {})
+    walker.run_function(target, scope)
+    return estimator
+
+
+def print_report(path, estimator, verbose=True):
+    if verbose:
+        print(f"\n=== {path} ===")
+        print("  行  開始[ms]  時間[ms]  動作")
+        for line, text, start, duration in estimator.rows:
+            print(f"{line:>4}  {start:>8.0f}  {duration:>8.0f}  {text}")
+        for warning in estimator.warnings:
+            print("注意: " + warning)
+    total = estimator.total
+    print(f"{path}: 推定 {total / 1000:.2f}秒（試合時間 {MATCH_BUDGET_MS / 1000:.0f}秒 の {total * 100 / MATCH_BUDGET_MS:.1f}%）")
+    return total
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="ミッションの所要時間をスクリプトから見積もる")
+    parser.add_argument("scripts", nargs="+", help="見積もるスクリプト（複数指定で比較）")
+    parser.add_argument("-f", "--function", help=f"見積もる関数（既定: {DEFAULT_FUNCTION}、なければモジュール全体）")
+    parser.add_argument("--settle-ms", type=float, default=0, help="止まる動作ごとに足す静定時間 [ms]")
+    parser.add_argument("-q", "--quiet", action="store_true", help="動作ごとの内訳を表示しない")
+    options = parser.parse_args(argv)
+
+    totals = []
+    for path in options.scripts:
+        estimator = estimate(path, options.function, options.settle_ms)
+        totals.append((print_report(path, estimator, not options.quiet), path))
+    if len(totals) > 1:
+        print("\n=== 比較（速い順）===")
+        for total, path in sorted(totals):
+            print(f"{total / 1000:8.2f}秒  {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,6 @@
+"""ホスト（PC）上で Pybricks のプログラムを動かすためのシミュレーター
+
+ハブの pybricks モジュールと同じ名前・同じ使い方のクラスを提供します。
+時間は仮想時計で進むので、wait() や走行は実時間を待たずに終わります。
+使い方は host/run_sim.py を参照してください。
+"""
@@ -0,0 +1,279 @@
+"""モーター・DriveBase 共通の制御モデル
+
+目標値は台形速度プロファイルで作り、実際の位置はPID制御と
+モーターの応答遅れを含む1自由度の運動モデルで追従させます。
+PIDゲインや加速度を変えると、オーバーシュートや整定時間も変わります。
+"""
+
+import math
+
+# モーター出力の応答遅れ [s]
+LAG = 0.03
+
+# 惰性・ブレーキ時の減速 [単位/s^2] と粘性抵抗 [1/s]
+COAST_DECEL = 300.0
+BRAKE_DECEL = 1500.0
+VISCOUS = 2.0
+
+# これより小さい誤差・速度は「止まっている」とみなす
+REST = 0.01
+
+
+def _ramp_length(va, vb, rate):
+    return abs(vb * vb - va * va) / (2 * rate)
+
+
+class Profile:
+    """start から target までの台形速度プロファイル
+
+    v0 は開始時の速度、v_end は終了時の速度（Stop.NONE なら巡航速度のまま）です。
+    """
+
+    def __init__(self, start, target, speed, accel, decel, v0=0.0, v_end=0.0):
+        dist = target - start
+        self.start = start
+        self.sign = 1 if dist >= 0 else -1
+        self.length = abs(dist)
+        vmax = max(abs(speed), 1e-6)
+        v0 = max(0.0, v0 * self.sign)
+        v_end = min(abs(v_end), vmax)
+        self.phases = self._plan(self.length, v0, vmax, v_end, accel, decel)
+        self.duration = sum(p[0] for p in self.phases)
+
+    @staticmethod
+    def _plan(length, v0, vmax, v_end, accel, decel):
+        up = _ramp_length(v0, vmax, accel if vmax >= v0 else decel)
+        down = _ramp_length(vmax, v_end, decel)
+        if up + down <= length:
+            vc = vmax
+            cruise = (length - up - down) / vc
+        else:
+            vc = math.sqrt((2 * length + v0 * v0 / accel + v_end * v_end / decel) / (1 / accel + 1 / decel))
+            cruise = 0.0
+            if vc < max(v0, v_end):
+                if v_end > v0:
+                    # 加速しきれないまま目標に着く
+                    vc = math.sqrt(v0 * v0 + 2 * accel * length)
+                    return [((vc - v0) / accel, v0, accel)]
+                # 減速が間に合わないので強めに減速する
+                rate = (v0 * v0 - v_end * v_end) / (2 * length) if length else decel
+                return [((v0 - v_end) / rate, v0, -rate)]
+        phases = []
+        if vc != v0:
+            rate = accel if vc > v0 else -decel
+            phases.append(((vc - v0) / rate, v0, rate))
+        if cruise > 0:
+            phases.append((cruise, vc, 0.0))
+        if vc != v_end:
+            phases.append(((vc - v_end) / decel, vc, -decel))
+        return phases
+
+    def sample(self, t):
+        """時刻 t [s] の (位置, 速度, 加速度, 終了したか)"""
+        pos = 0.0
+        vel = self.phases[0][1] if self.phases else 0.0
+        for duration, v, a in self.phases:
+            if t < duration:
+                pos += v * t + a * t * t / 2
+                return (self.start + self.sign * pos, self.sign * (v + a * t), self.sign * a, False)
+            pos += v * duration + a * duration * duration / 2
+            vel = v + a * duration
+            t -= duration
+        return (self.start + self.sign * self.length, self.sign * vel, 0.0, True)
+
+
+class Control:
+    """pybricks の Control（pid / limits / target_tolerances）に相当"""
+
+    def __init__(self, kp, ki, kd, speed, acceleration, torque, speed_tolerance, position_tolerance):
+        self._pid = [kp, ki, kd, 0, 0]
+        self._limits = [speed, acceleration, torque]
+        self._tolerances = [speed_tolerance, position_tolerance]
+        self._stall = [20, 200]
+
+    def pid(self, kp=None, ki=None, kd=None, integral_deadzone=None, integral_rate=None):
+        values = (kp, ki, kd, integral_deadzone, integral_rate)
+        if all(v is None for v in values):
+            return tuple(self._pid)
+        for i, v in enumerate(values):
+            if v is not None:
+                self._pid[i] = v
+
+    def limits(self, speed=None, acceleration=None, torque=None, power=None):
+        # power は古いファームウェアの書き方（experiment.py で使用）。torque と同じ扱いにする
+        if torque is None:
+            torque = power
+        values = (speed, acceleration, torque)
+        if all(v is None for v in values):
+            return tuple(self._limits)
+        for i, v in enumerate(values):
+            if v is not None:
+                self._limits[i] = v
+
+    def target_tolerances(self, speed=None, position=None):
+        if speed is None and position is None:
+            return tuple(self._tolerances)
+        if speed is not None:
+            self._tolerances[0] = speed
+        if position is not None:
+            self._tolerances[1] = position
+
+    def stall_tolerances(self, speed=None, time=None):
+        if speed is None and time is None:
+            return tuple(self._stall)
+        if speed is not None:
+            self._stall[0] = speed
+        if time is not None:
+            self._stall[1] = time
+
+
+class Axis:
+    """PID制御で目標値に追従する1自由度の軸
+
+    pos は制御に使う計測値で、ジャイロ使用時などは外部から上書きされます。
+    """
+
+    def __init__(self, control, scales, max_accel, stiction):
+        self.control = control
+        self.kp_scale, self.ki_scale, self.kd_scale = scales
+        self.max_accel = max_accel
+        self.stiction = stiction    # 停止中に動き出すのに必要な加速度指令
+        self.pos = 0.0
+        self.vel = 0.0
+        self.acc = 0.0
+        self.rpos = 0.0
+        self.rvel = 0.0
+        self.racc = 0.0
+        self.integral = 0.0
+        self.mode = "idle"          # idle / track / speed / hold / coast / brake
+        self.profile = None
+        self.elapsed = 0.0
+        self.then = None
+        self.reached = True         # プロファイルが最後まで進んだか
+        self.target_speed = 0.0
+        self.ramp = (1.0, 1.0)
+
+    # --- 指令 ---
+
+    def moving_reference(self):
+        """次の動作の開始点（走行中ならその目標値から続ける）"""
+        if self.mode in ("track", "speed"):
+            return self.rpos, self.rvel
+        return self.pos, 0.0
+
+    def track(self, profile, then):
+        if self.mode not in ("track", "speed", "hold"):
+            self.integral = 0.0
+        self.profile = profile
+        self.elapsed = 0.0
+        self.then = then
+        self.reached = False
+        self.mode = "track"
+
+    def run(self, speed, accel, decel):
+        if self.mode not in ("track", "speed"):
+            self.rpos = self.pos
+            self.rvel = self.vel
+        self.mode = "speed"
+        self.target_speed = speed
+        self.ramp = (accel, decel)
+        self.reached = True
+
+    def hold(self, target=None):
+        self.rpos = self.pos if target is None else target
+        self.rvel = 0.0
+        self.racc = 0.0
+        self.mode = "hold"
+        self.reached = True
+
+    def coast(self):
+        self.mode = "coast"
+        self.reached = True
+
+    def brake(self):
+        self.mode = "brake"
+        self.reached = True
+
+    # --- 状態 ---
+
+    def done(self):
+        if not self.reached:
+            return False
+        if self.mode == "hold":
+            speed_tol, pos_tol = self.control.target_tolerances()
+            return abs(self.rpos - self.pos) <= pos_tol and abs(self.vel) <= speed_tol
+        return True
+
+    def busy(self):
+        if self.mode in ("track", "speed"):
+            return True
+        if abs(self.vel) > REST or abs(self.acc) > REST:
+            return True
+        if self.mode != "hold":
+            return False
+        # 誤差が小さく静止摩擦に負けている間は状態が変わらない
+        error = abs(self.rpos - self.pos)
+        return error > REST and error * self.control.pid()[0] * self.kp_scale >= self.stiction
+
+    # --- 1周期分の計算 ---
+
+    def _update_reference(self, dt):
+        if self.mode == "track":
+            self.elapsed += dt
+            self.rpos, self.rvel, self.racc, finished = self.profile.sample(self.elapsed)
+            if finished:
+                self.reached = True
+                self._finish()
+        elif self.mode == "speed":
+            accel, decel = self.ramp
+            diff = self.target_speed - self.rvel
+            rate = accel if abs(self.target_speed) >= abs(self.rvel) else decel
+            change = max(-rate * dt, min(rate * dt, diff))
+            self.racc = change / dt
+            self.rvel += change
+            self.rpos += self.rvel * dt
+
+    def _finish(self):
+        from pybricks.parameters import Stop
+        then = self.then
+        if then == Stop.NONE:
+            self.mode = "speed"
+            self.target_speed = self.rvel
+        elif then == Stop.HOLD:
+            self.mode = "hold"
+            self.rvel = 0.0
+            self.racc = 0.0
+        elif then == Stop.BRAKE:
+            self.mode = "brake"
+        else:
+            self.mode = "coast"
+
+    def update(self, dt):
+        """dt [s] 進め、今回の移動量を返す"""
+        self._update_reference(dt)
+        if self.mode in ("track", "speed", "hold"):
+            kp, ki, kd = self.control.pid()[:3]
+            error = self.rpos - self.pos
+            self.integral = max(-50.0, min(50.0, self.integral + error * dt))
+            command = (self.racc + kp * self.kp_scale * error
+                       + ki * self.ki_scale * self.integral
+                       + kd * self.kd_scale * (self.rvel - self.vel))
+            torque = self.control.limits()[2]
+            limit = self.max_accel * min(100, max(1, torque)) / 100
+            command = max(-limit, min(limit, command))
+            if self.mode == "hold" and abs(command) < self.stiction and abs(self.vel) < self.stiction * dt:
+                # 静止摩擦に負けて止まったまま（小さな誤差は残る）
+                self.acc = 0.0
+                self.vel = 0.0
+                return 0.0
+            self.acc += (command - self.acc) * min(1.0, dt / LAG)
+            self.vel += self.acc * dt
+        else:
+            decel = BRAKE_DECEL if self.mode == "brake" else COAST_DECEL
+            slow = decel * dt + abs(self.vel) * VISCOUS * dt
+            if abs(self.vel) <= slow:
+                self.vel = 0.0
+            else:
+                self.vel -= slow if self.vel > 0 else -slow
+            self.acc = 0.0
+        return self.vel * dt
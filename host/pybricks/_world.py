@@ -0,0 +1,184 @@
+"""シミュレーター全体の状態（仮想時計・デバイス・ロボット本体の姿勢）
+
+ハブ上の pybricks を置き換えるホスト用シミュレーターの中核です。
+時間は実時間ではなく仮想時計で進み、待ち時間は一瞬で終わります。
+"""
+
+import math
+import random
+
+# 物理モデルの更新周期 [ms]
+PHYSICS_MS = 5
+
+# 物理モデルの定数（config() で変更可能）
+DEFAULTS = {
+    "seed": 0,
+    "noise": 1.0,               # 床の凹凸などによる向きの乱れの大きさ（0で無効）
+    "scrub": 0.985,             # 旋回時のタイヤの横滑りによる回転不足の割合
+    "traction": 2500.0,         # これを超える加速度 [mm/s^2] でタイヤが滑り始める
+    "slip_gain": 0.3,           # 滑り始めた後の滑り量の係数
+    "gyro_drift": 0.0,          # ジャイロのドリフト [deg/s]
+    "accel_noise": 20.0,        # 加速度センサーの雑音の標準偏差 [mm/s^2]
+    "imu_ready_ms": 500,        # 起動後、静止してから IMU が準備完了になるまでの時間
+}
+
+params = dict(DEFAULTS)
+
+now = 0.0           # 仮想時刻 [ms]
+in_task = False     # run_task() の中で実行中かどうか
+limit_ms = None     # シミュレーション時間の上限（無限ループ対策）
+
+devices = []        # step() を持つデバイス
+rng = random.Random(0)
+imu_rng = random.Random(0)      # 加速度センサーの雑音用（読む回数で走行の乱れが変わらないように分ける）
+
+# ロボット本体の物理的な姿勢（フィールド座標）
+# speed, accel は本体の前後方向の速度 [mm/s] と加速度 [mm/s^2]（タイヤが滑るとタイヤの回転とずれる）
+body = {"x": 0.0, "y": 0.0, "heading": 0.0, "rate": 0.0, "still_ms": 0.0, "ds": 0.0, "speed": 0.0, "accel": 0.0}
+
+# ボタン・フォースセンサーの押下予定 [(開始ms, 終了ms, 名前, 力)]
+presses = []
+
+# ハブの永続ストレージ
+storage = bytearray(512)
+storage_path = None
+
+
+class SimulationTimeout(Exception):
+    """シミュレーション時間が上限を超えた"""
+
+
+def config(**kwargs):
+    """物理モデルの定数を変更"""
+    for key in kwargs:
+        if key not in DEFAULTS:
+            raise TypeError("unknown simulator parameter: " + key)
+    params.update(kwargs)
+    if "seed" in kwargs:
+        rng.seed(kwargs["seed"])
+        imu_rng.seed(kwargs["seed"])
+
+
+def reset():
+    """仮想時計とすべての状態を初期化"""
+    global now, in_task, limit_ms
+    now = 0.0
+    in_task = False
+    limit_ms = None
+    params.clear()
+    params.update(DEFAULTS)
+    rng.seed(params["seed"])
+    imu_rng.seed(params["seed"])
+    devices.clear()
+    presses.clear()
+    body.update(x=0.0, y=0.0, heading=0.0, rate=0.0, still_ms=0.0, ds=0.0, speed=0.0, accel=0.0)
+    storage[:] = bytes(len(storage))
+
+
+def register(device):
+    """デバイスを登録（同じポートの古いデバイスは置き換える）"""
+    port = getattr(device, "port", None)
+    if port is not None:
+        for old in list(devices):
+            if getattr(old, "port", None) == port:
+                release(old)
+    devices.append(device)
+
+
+def release(device):
+    """デバイスと、それを使っている DriveBase を登録解除"""
+    if device in devices:
+        devices.remove(device)
+    owner = getattr(device, "owner", None)
+    if owner is not None and owner in devices:
+        devices.remove(owner)
+
+
+def busy():
+    """物理状態が変化し続けているデバイスがあるか"""
+    for device in devices:
+        if device.busy():
+            return True
+    return False
+
+
+def step():
+    """物理モデルを1周期進める"""
+    global now
+    dt = PHYSICS_MS / 1000
+    body["rate"] = 0.0
+    body["ds"] = 0.0
+    for device in devices:
+        device.step(dt)
+    speed = body["ds"] / dt
+    body["accel"] = (speed - body["speed"]) / dt
+    body["speed"] = speed
+    body["heading"] += params["gyro_drift"] * dt
+    if abs(body["rate"]) < 1 and not busy():
+        body["still_ms"] += PHYSICS_MS
+    else:
+        body["still_ms"] = 0.0
+    now += PHYSICS_MS
+    if limit_ms is not None and now > limit_ms:
+        raise SimulationTimeout("simulated time exceeded {:.0f} s".format(limit_ms / 1000))
+
+
+def advance_to(t_ms):
+    """仮想時刻を t_ms まで進める（何も動いていなければ一気に進める）"""
+    global now
+    while now < t_ms:
+        if busy():
+            step()
+        else:
+            skipped = t_ms - now
+            body["still_ms"] += skipped
+            body["speed"] = body["accel"] = 0.0
+            now = t_ms
+            if limit_ms is not None and now > limit_ms:
+                raise SimulationTimeout("simulated time exceeded {:.0f} s".format(limit_ms / 1000))
+
+
+def move_body(ds, dheading):
+    """ロボット本体を ds [mm] 前進、dheading [deg] 旋回させる"""
+    heading = body["heading"] + dheading / 2
+    noise = params["noise"]
+    if noise:
+        dheading += rng.gauss(0, 0.02 * noise * math.sqrt(abs(ds) + abs(dheading)))
+    rad = math.radians(heading)
+    body["x"] += ds * math.cos(rad)
+    body["y"] += ds * math.sin(rad)
+    body["heading"] += dheading
+    body["rate"] += dheading / (PHYSICS_MS / 1000)
+    body["ds"] += ds
+
+
+def pressed(name):
+    """name のボタン・センサーが現在押されているときの力 [N]（押されていなければ0）"""
+    for start, end, target, force in presses:
+        if target == name and start <= now < end:
+            return force
+    return 0.0
+
+
+def schedule_press(name, start_ms, duration_ms=100, force=10.0):
+    """ボタン（Button の名前）またはフォースセンサー（"FORCE"）の押下を予約"""
+    presses.append((start_ms, start_ms + duration_ms, name, force))
+
+
+def load_storage(path):
+    """永続ストレージの内容をファイルから読み込み、終了時に書き戻す"""
+    global storage_path
+    storage_path = path
+    try:
+        with open(path, "rb") as f:
+            data = f.read(len(storage))
+        storage[:len(data)] = data
+    except OSError:
+        pass
+
+
+def save_storage():
+    """永続ストレージの内容をファイルに書き戻す"""
+    if storage_path is not None:
+        with open(storage_path, "wb") as f:
+            f.write(storage)
@@ -0,0 +1,184 @@
+"""pybricks.hubs のホスト用代替"""
+
+from pybricks import _world
+from pybricks.parameters import Button
+from pybricks.tools import wait
+
+
+class _IMU:
+    """ロボット本体の向き（_world.body）を読む IMU"""
+
+    def __init__(self):
+        self._offset = _world.body["heading"]
+
+    def heading(self):
+        return _world.body["heading"] - self._offset
+
+    def reset_heading(self, angle):
+        self._offset = _world.body["heading"] - angle
+
+    def angular_velocity(self, axis=None, calibrated=True):
+        # ハブと同じく Z 軸は反時計回りが正（heading とは逆向き）
+        # calibrated=False はバイアスを差し引く前の値（ドリフトがそのまま残る）
+        rate = -_world.body["rate"]
+        if not calibrated:
+            rate -= _world.params["gyro_drift"]
+        if axis is None:
+            return (0.0, 0.0, rate)
+        if axis.name == "Z":
+            return rate * axis.sign
+        return 0.0
+
+    def acceleration(self, axis=None):
+        # X はロボット本体の前後方向の加速度（タイヤが滑ってもエンコーダーではなく本体の動きを表す）
+        forward = _world.body["accel"] + _world.imu_rng.gauss(0, _world.params["accel_noise"])
+        if axis is None:
+            return (forward, 0.0, 9806.65)
+        if axis.name == "X":
+            return forward * axis.sign
+        return 9806.65 * axis.sign if axis.name == "Z" else 0.0
+
+    def tilt(self):
+        return (0, 0)
+
+    def up(self):
+        from pybricks.parameters import Side
+        return Side.TOP
+
+    def stationary(self):
+        return _world.body["still_ms"] > 0
+
+    def ready(self):
+        return _world.body["still_ms"] >= _world.params["imu_ready_ms"]
+
+    def settings(self, *args, **kwargs):
+        pass
+
+    def rotation(self, axis):
+        return -self.heading() * axis.sign if axis.name == "Z" else 0.0
+
+
+class _Display:
+    """表示内容と更新回数だけを記録するディスプレイ"""
+
+    def __init__(self):
+        self.shown = None
+        self.updates = 0
+
+    def _show(self, value):
+        self.shown = value
+        self.updates += 1
+
+    def number(self, number):
+        self._show(number)
+
+    def char(self, char):
+        self._show(char)
+
+    def text(self, text, on=500, off=50):
+        self._show(text)
+        wait(len(str(text)) * (on + off))
+
+    def icon(self, icon):
+        self._show(icon)
+
+    def pixel(self, row, column, brightness=100):
+        self.updates += 1
+
+    def animate(self, matrices, interval):
+        self._show(matrices)
+
+    def orientation(self, up):
+        pass
+
+    def off(self):
+        self._show(None)
+
+    def clear(self):
+        self.off()
+
+
+class _Buttons:
+    def pressed(self):
+        result = set()
+        for name in ("LEFT", "RIGHT", "CENTER", "BLUETOOTH"):
+            if _world.pressed(name):
+                result.add(getattr(Button, name))
+        return result
+
+
+class _Light:
+    def __init__(self):
+        self.color = None
+
+    def on(self, color):
+        self.color = color
+
+    def off(self):
+        self.color = None
+
+    def blink(self, color, durations):
+        self.color = color
+
+    def animate(self, colors, interval):
+        self.color = colors[0] if colors else None
+
+
+class _Speaker:
+    def volume(self, volume=None):
+        return 100 if volume is None else None
+
+    def beep(self, frequency=500, duration=100):
+        return wait(duration)
+
+    def play_notes(self, notes, tempo=120):
+        return wait(len(notes) * 60000 / tempo / 4)
+
+
+class _System:
+    def name(self):
+        return "Pybricks Hub"
+
+    def storage(self, offset, write=None, read=None):
+        if write is not None:
+            if offset + len(write) > len(_world.storage):
+                raise ValueError("storage overflow")
+            _world.storage[offset:offset + len(write)] = write
+            return None
+        if offset + read > len(_world.storage):
+            raise ValueError("storage overflow")
+        return bytes(_world.storage[offset:offset + read])
+
+    def set_stop_button(self, button):
+        pass
+
+    def shutdown(self):
+        raise SystemExit
+
+    def reset_reason(self):
+        return 0
+
+
+class _Battery:
+    def voltage(self):
+        return 8000
+
+    def current(self):
+        return 100
+
+
+class PrimeHub:
+    def __init__(self, top_side=None, front_side=None, broadcast_channel=None, observe_channels=None):
+        self.imu = _IMU()
+        self.display = _Display()
+        self.buttons = _Buttons()
+        self.light = _Light()
+        self.speaker = _Speaker()
+        self.system = _System()
+        self.battery = _Battery()
+        self.charger = None
+
+
+InventorHub = PrimeHub
+EssentialHub = PrimeHub
+TechnicHub = PrimeHub
@@ -0,0 +1,107 @@
+"""pybricks.parameters のホスト用代替"""
+
+
+class _Constant:
+    """名前だけを持つ定数（表示用）"""
+
+    def __init__(self, group, name):
+        self.group = group
+        self.name = name
+
+    def __repr__(self):
+        return self.group + "." + self.name
+
+    def __hash__(self):
+        return hash((self.group, self.name))
+
+    def __eq__(self, other):
+        return isinstance(other, _Constant) and (self.group, self.name) == (other.group, other.name)
+
+
+def _group(cls, names):
+    for name in names:
+        setattr(cls, name, _Constant(cls.__name__, name))
+    return cls
+
+
+class Port:
+    pass
+
+
+class Direction:
+    pass
+
+
+class Stop:
+    pass
+
+
+class Button:
+    pass
+
+
+class Side:
+    pass
+
+
+class Icon:
+    pass
+
+
+_group(Port, ["A", "B", "C", "D", "E", "F"])
+_group(Direction, ["CLOCKWISE", "COUNTERCLOCKWISE"])
+_group(Stop, ["COAST", "COAST_SMART", "BRAKE", "HOLD", "NONE"])
+_group(Button, ["LEFT", "RIGHT", "CENTER", "BLUETOOTH", "UP", "DOWN"])
+_group(Side, ["TOP", "BOTTOM", "FRONT", "BACK", "LEFT", "RIGHT"])
+_group(Icon, [
+    "HAPPY", "SAD", "HEART", "FALSE", "TRUE", "EMPTY", "FULL", "PAUSE",
+    "UP", "DOWN", "LEFT", "RIGHT", "ARROW_UP", "ARROW_DOWN", "ARROW_LEFT", "ARROW_RIGHT",
+    "TRIANGLE_UP", "TRIANGLE_DOWN", "TRIANGLE_LEFT", "TRIANGLE_RIGHT",
+    "CIRCLE", "SQUARE", "CLOCKWISE", "COUNTERCLOCKWISE",
+    "EYE_LEFT", "EYE_RIGHT", "EYE_LEFT_BLINK", "EYE_RIGHT_BLINK",
+])
+
+
+class _Axis:
+    def __init__(self, name, sign=1):
+        self.name = name
+        self.sign = sign
+
+    def __neg__(self):
+        return _Axis(self.name, -self.sign)
+
+    def __repr__(self):
+        return ("-" if self.sign < 0 else "") + "Axis." + self.name
+
+
+class Axis:
+    X = _Axis("X")
+    Y = _Axis("Y")
+    Z = _Axis("Z")
+
+
+class _Color:
+    def __init__(self, name, h=0, s=0, v=0):
+        self.name = name
+        self.h = h
+        self.s = s
+        self.v = v
+
+    def __repr__(self):
+        return "Color." + self.name
+
+
+class Color:
+    NONE = _Color("NONE")
+    BLACK = _Color("BLACK", 0, 0, 10)
+    GRAY = _Color("GRAY", 0, 0, 50)
+    WHITE = _Color("WHITE", 0, 0, 100)
+    RED = _Color("RED", 0, 100, 100)
+    ORANGE = _Color("ORANGE", 30, 100, 100)
+    BROWN = _Color("BROWN", 30, 100, 50)
+    YELLOW = _Color("YELLOW", 60, 100, 100)
+    GREEN = _Color("GREEN", 120, 100, 100)
+    CYAN = _Color("CYAN", 180, 100, 100)
+    BLUE = _Color("BLUE", 240, 100, 100)
+    VIOLET = _Color("VIOLET", 270, 100, 100)
+    MAGENTA = _Color("MAGENTA", 300, 100, 100)
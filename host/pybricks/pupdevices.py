@@ -0,0 +1,187 @@
+"""pybricks.pupdevices のホスト用代替"""
+
+from pybricks import _world
+from pybricks._motion import Axis, Control, Profile
+from pybricks.parameters import Color, Direction, Stop
+from pybricks.tools import _Awaitable, _block_until
+
+# SPIKE モーターの最大速度 [deg/s] と最大加速度 [deg/s^2]
+MAX_SPEED = 1000
+MAX_ACCEL = 20000
+
+
+def _finish_motion(is_done, on_cancel, wait):
+    """動作の完了待ち（run_task の中なら awaitable を返す）"""
+    if not wait:
+        return None
+    if _world.in_task:
+        return _Awaitable(is_done, None, on_cancel)
+    _block_until(is_done)
+
+
+class Motor:
+    """角度をPID制御で追従するモーター
+
+    DriveBase に組み込まれている間は、角度は DriveBase の状態から計算されます。
+    """
+
+    def __init__(self, port, positive_direction=Direction.CLOCKWISE, gears=None, reset_angle=True, profile=None):
+        self.port = port
+        self.positive_direction = positive_direction
+        self.owner = None
+        self.offset = 0.0
+        self.control = Control(1000, 100, 30, MAX_SPEED, 2000, 100, 50, 10)
+        self.axis = Axis(self.control, (0.9, 2.0, 1.4), MAX_ACCEL, 2000)
+        _world.register(self)
+
+    # --- 状態 ---
+
+    def angle(self):
+        if self.owner is not None:
+            return int(round(self.owner._wheel_angle(self) - self.offset))
+        return int(round(self.axis.pos - self.offset))
+
+    def speed(self):
+        if self.owner is not None:
+            return int(round(self.owner._wheel_speed(self)))
+        return int(round(self.axis.vel))
+
+    def reset_angle(self, angle=None):
+        current = self.angle() + self.offset
+        self.offset = current - (0 if angle is None else angle)
+
+    def load(self):
+        return 0
+
+    def stalled(self):
+        return False
+
+    def done(self):
+        if self.owner is not None:
+            return self.owner.done()
+        return self.axis.done()
+
+    # --- 動作 ---
+
+    def _release_owner(self):
+        # DriveBase のモーターを直接動かすと DriveBase の制御は止まる
+        if self.owner is not None:
+            self.owner.stop()
+
+    def stop(self):
+        self._release_owner()
+        self.axis.coast()
+
+    def brake(self):
+        self._release_owner()
+        self.axis.brake()
+
+    def hold(self):
+        self._release_owner()
+        self.axis.hold()
+
+    def dc(self, duty):
+        self._release_owner()
+        if self.owner is None:
+            self.axis.run(MAX_SPEED * max(-100, min(100, duty)) / 100, MAX_ACCEL, MAX_ACCEL)
+
+    def run(self, speed):
+        self._release_owner()
+        if self.owner is None:
+            accel = self.control.limits()[1]
+            self.axis.run(speed, accel, accel)
+
+    def track_target(self, target_angle):
+        self._release_owner()
+        self.axis.hold(target_angle + self.offset)
+
+    def run_target(self, speed, target_angle, then=Stop.HOLD, wait=True):
+        self._release_owner()
+        start, v0 = self.axis.moving_reference()
+        limit, accel, _ = self.control.limits()
+        speed = min(abs(speed), limit)
+        v_end = speed if then == Stop.NONE else 0.0
+        self.axis.track(Profile(start, target_angle + self.offset, speed, accel, accel, v0, v_end), then)
+        return _finish_motion(self.axis.done, self.axis.coast, wait)
+
+    def run_angle(self, speed, rotation_angle, then=Stop.HOLD, wait=True):
+        start, _ = self.axis.moving_reference()
+        sign = -1 if speed < 0 else 1
+        return self.run_target(abs(speed), start - self.offset + sign * rotation_angle, then, wait)
+
+    def run_time(self, speed, time, then=Stop.HOLD, wait=True):
+        # 加減速を無視して、time の間に進む角度だけ回す近似
+        return self.run_angle(speed, abs(speed) * time / 1000, then, wait)
+
+    def run_until_stalled(self, speed, then=Stop.COAST, duty_limit=None):
+        # シミュレーターには障害物がないので、1回転したところで止まったことにする
+        result = self.run_angle(speed, 360, then, True)
+        if result is not None:
+            return result
+        return self.angle()
+
+    # --- シミュレーター用 ---
+
+    def busy(self):
+        return self.owner is None and self.axis.busy()
+
+    def step(self, dt):
+        if self.owner is None:
+            self.axis.pos += self.axis.update(dt)
+
+
+class ForceSensor:
+    """押下予定（_world.schedule_press の "FORCE"）に従うフォースセンサー"""
+
+    def __init__(self, port):
+        self.port = port
+
+    def force(self):
+        return _world.pressed("FORCE")
+
+    def distance(self):
+        return 8.0 if self.force() > 0 else 0.0
+
+    def pressed(self, force=3):
+        return self.force() >= force
+
+    def touched(self):
+        return self.force() > 0
+
+
+class ColorSensor:
+    """何も検出しないカラーセンサー"""
+
+    def __init__(self, port):
+        self.port = port
+
+    def color(self, surface=True):
+        return Color.NONE
+
+    def reflection(self):
+        return 0
+
+    def ambient(self):
+        return 0
+
+    def hsv(self, surface=True):
+        return Color.NONE
+
+    def detectable_colors(self, colors=None):
+        pass
+
+    def lights(self):
+        pass
+
+
+class UltrasonicSensor:
+    """何も検出しない（常に最大距離を返す）超音波センサー"""
+
+    def __init__(self, port):
+        self.port = port
+
+    def distance(self):
+        return 2000
+
+    def presence(self):
+        return False
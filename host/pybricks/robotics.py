@@ -0,0 +1,197 @@
+"""pybricks.robotics のホスト用代替（差動二輪の運動モデル）"""
+
+import math
+
+from pybricks import _world
+from pybricks._motion import Axis, Control, Profile
+from pybricks.parameters import Stop
+from pybricks.pupdevices import _finish_motion
+
+# DriveBase の最大加速度 [mm/s^2, deg/s^2]（モーター出力の上限）
+MAX_ACCEL = 3000
+
+
+class DriveBase:
+    """走行距離と向きの2軸をPID制御する差動二輪ロボット
+
+    向きの軸は use_gyro(True) のとき IMU（ロボット本体の実際の向き）で、
+    それ以外はタイヤの回転から計算した向きで制御します。
+    """
+
+    def __init__(self, left_motor, right_motor, wheel_diameter, axle_track):
+        self.left_motor = left_motor
+        self.right_motor = right_motor
+        self.wheel_diameter = wheel_diameter
+        self.axle_track = axle_track
+        left_motor.owner = self
+        right_motor.owner = self
+        left_motor.offset = right_motor.offset = 0.0
+
+        self.distance_control = Control(1000, 50, 10, 1000, 2000, 100, 20, 2)
+        self.heading_control = Control(2000, 50, 100, 1000, 2000, 100, 20, 1)
+        self._distance = Axis(self.distance_control, (0.4, 2.0, 2.8), MAX_ACCEL, 300)
+        self._heading = Axis(self.heading_control, (0.4, 2.0, 2.8), MAX_ACCEL, 500)
+        self._settings = [200, 400, 200, 400]
+        self._enc_heading = 0.0
+        self._gyro = False
+        self._gyro_base = _world.body["heading"]
+        self._distance_base = 0.0
+        self._angle_base = 0.0
+        _world.register(self)
+
+    # --- 設定 ---
+
+    def settings(self, straight_speed=None, straight_acceleration=None, turn_rate=None, turn_acceleration=None):
+        values = (straight_speed, straight_acceleration, turn_rate, turn_acceleration)
+        if all(v is None for v in values):
+            return tuple(self._settings)
+        for i, v in enumerate(values):
+            if v is not None:
+                self._settings[i] = v
+
+    def _accel(self, index):
+        value = self._settings[index]
+        if isinstance(value, (tuple, list)):
+            return value[0], value[1]
+        return value, value
+
+    def use_gyro(self, use_gyro):
+        measured = self._measured_heading()
+        self._gyro = bool(use_gyro)
+        # 計測方法が変わっても robot.angle() が連続になるように基準を合わせる
+        self._heading.pos = self._measured_heading()
+        self._angle_base += self._heading.pos - measured
+        if self._heading.mode not in ("track", "speed"):
+            self._heading.hold()
+
+    # --- 状態 ---
+
+    def _measured_heading(self):
+        if self._gyro:
+            return _world.body["heading"] - self._gyro_base
+        return self._enc_heading
+
+    def distance(self):
+        return int(round(self._distance.pos - self._distance_base))
+
+    def angle(self):
+        return int(round(self._heading.pos - self._angle_base))
+
+    def state(self):
+        return (self.distance(), self._distance.vel, self.angle(), self._heading.vel)
+
+    def reset(self, distance=0, angle=0):
+        self._distance_base = self._distance.pos - distance
+        self._angle_base = self._heading.pos - angle
+
+    def done(self):
+        return self._distance.done() and self._heading.done()
+
+    def stalled(self):
+        return False
+
+    def _wheel_mm(self, motor):
+        arc = math.radians(self._enc_heading) * self.axle_track / 2
+        return self._distance.pos + (arc if motor is self.left_motor else -arc)
+
+    def _wheel_angle(self, motor):
+        return self._wheel_mm(motor) * 360 / (math.pi * self.wheel_diameter)
+
+    def _wheel_speed(self, motor):
+        arc = math.radians(self._heading.vel) * self.axle_track / 2
+        speed = self._distance.vel + (arc if motor is self.left_motor else -arc)
+        return speed * 360 / (math.pi * self.wheel_diameter)
+
+    # --- 動作 ---
+
+    def _move(self, axis, other, delta, speed, accel_index, then, wait):
+        start, v0 = axis.moving_reference()
+        accel, decel = self._accel(accel_index)
+        v_end = abs(speed) if then == Stop.NONE else 0.0
+        axis.track(Profile(start, start + delta, abs(speed), accel, decel, v0, v_end), then)
+        if other.mode not in ("track", "hold"):
+            other.hold()
+        elif other.mode == "track" and other.then == Stop.NONE:
+            # 前の動作の勢いを残したまま、もう一方の軸は今の位置で止める
+            other.hold(other.rpos)
+        return _finish_motion(self.done, self.stop, wait)
+
+    def straight(self, distance, then=Stop.HOLD, wait=True):
+        return self._move(self._distance, self._heading, distance, self._settings[0], 1, then, wait)
+
+    def turn(self, angle, then=Stop.HOLD, wait=True):
+        return self._move(self._heading, self._distance, angle, self._settings[2], 3, then, wait)
+
+    def curve(self, radius, angle, then=Stop.HOLD, wait=True):
+        heading_change = -angle if radius < 0 else angle
+        # pbio と同じく、半径の符号は曲がる向き（正で右）、角度の符号は進む向き（正で前進）
+        length = abs(radius) * math.radians(angle)
+        rate = self._settings[2]
+        if radius:
+            rate = min(rate, math.degrees(self._settings[0] / abs(radius)))
+        h_start, h_v0 = self._heading.moving_reference()
+        d_start, _ = self._distance.moving_reference()
+        accel, decel = self._accel(3)
+        v_end = rate if then == Stop.NONE else 0.0
+        heading_profile = Profile(h_start, h_start + heading_change, rate, accel, decel, h_v0, v_end)
+        self._heading.track(heading_profile, then)
+        scale = length / heading_change if heading_change else 0.0
+        self._distance.track(_Follow(heading_profile, h_start, d_start, scale), then)
+        return _finish_motion(self.done, self.stop, wait)
+
+    def arc(self, radius, angle=None, distance=None, then=Stop.HOLD, wait=True):
+        if angle is None:
+            angle = math.degrees(distance / abs(radius))
+        return self.curve(radius, angle, then, wait)
+
+    def drive(self, speed, turn_rate):
+        accel, decel = self._accel(1)
+        self._distance.run(speed, accel, decel)
+        accel, decel = self._accel(3)
+        self._heading.run(turn_rate, accel, decel)
+
+    def stop(self):
+        self._distance.coast()
+        self._heading.coast()
+
+    def brake(self):
+        self._distance.brake()
+        self._heading.brake()
+
+    # --- シミュレーター用 ---
+
+    def busy(self):
+        return self._distance.busy() or self._heading.busy()
+
+    def step(self, dt):
+        ds = self._distance.update(dt)
+        dh = self._heading.update(dt)
+        self._distance.pos += ds
+        self._enc_heading += dh
+
+        # 急加速するとタイヤが滑り、本体は計測値ほど進まない
+        acc = abs(self._distance.acc)
+        traction = _world.params["traction"]
+        if acc > traction:
+            ds *= 1 - _world.params["slip_gain"] * (acc - traction) / acc
+        _world.move_body(ds, dh * _world.params["scrub"])
+
+        if self._gyro:
+            self._heading.pos = self._measured_heading()
+        else:
+            self._heading.pos = self._enc_heading
+
+
+class _Follow:
+    """カーブ走行で、距離の目標値を向きの目標値に連動させるプロファイル"""
+
+    def __init__(self, heading_profile, h_start, d_start, scale):
+        self.heading_profile = heading_profile
+        self.h_start = h_start
+        self.d_start = d_start
+        self.scale = scale
+
+    def sample(self, t):
+        pos, vel, acc, finished = self.heading_profile.sample(t)
+        s = self.scale
+        return (self.d_start + (pos - self.h_start) * s, vel * s, acc * s, finished)
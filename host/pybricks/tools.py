@@ -0,0 +1,130 @@
+"""pybricks.tools のホスト用代替（仮想時計で動く wait / multitask / run_task）"""
+
+from pybricks import _world
+
+
+class _Awaitable:
+    """条件が成立するまで待つ awaitable
+
+    deadline は「この時刻までは起こさなくてよい」という目安で、
+    run_task() はすべてのタスクが待機中なら仮想時刻をそこまで一気に進めます。
+    """
+
+    def __init__(self, is_done, deadline=None, on_cancel=None):
+        self.is_done = is_done
+        self.deadline = deadline
+        self.on_cancel = on_cancel
+
+    def __await__(self):
+        try:
+            # ハブと同じく、終わっていても最低1回は他のタスクに実行を譲る
+            yield self.deadline
+            while not self.is_done():
+                yield self.deadline
+        except GeneratorExit:
+            if self.on_cancel is not None:
+                self.on_cancel()
+            raise
+
+    __iter__ = __await__
+
+
+def wait(time):
+    """time [ms] 待つ（run_task の中では awaitable を返す）"""
+    if _world.in_task:
+        deadline = _world.now + max(0, time)
+        return _Awaitable(lambda: _world.now >= deadline, deadline)
+    _world.advance_to(_world.now + max(0, time))
+
+
+def _block_until(is_done):
+    """run_task の外で使われたブロッキング動作を完了まで進める"""
+    while not is_done():
+        _world.step()
+
+
+class StopWatch:
+    """仮想時計で時間を計るストップウォッチ"""
+
+    def __init__(self):
+        self._start = _world.now
+        self._paused_at = None
+
+    def time(self):
+        end = self._paused_at if self._paused_at is not None else _world.now
+        return int(end - self._start)
+
+    def pause(self):
+        if self._paused_at is None:
+            self._paused_at = _world.now
+
+    def resume(self):
+        if self._paused_at is not None:
+            self._start += _world.now - self._paused_at
+            self._paused_at = None
+
+    def reset(self):
+        self._start = _world.now
+        if self._paused_at is not None:
+            self._paused_at = _world.now
+
+
+class multitask:
+    """複数のタスクを1周期ずつ交互に実行する
+
+    race=True のときは、どれか1つが終わった時点で残りをキャンセルします。
+    戻り値は各タスクの戻り値のリスト（終わらなかったタスクは None）です。
+    """
+
+    def __init__(self, *tasks, race=False):
+        self.tasks = tasks
+        self.race = race
+
+    def __await__(self):
+        iters = [task.__await__() for task in self.tasks]
+        results = [None] * len(iters)
+        active = list(range(len(iters)))
+        try:
+            while active:
+                deadline = None
+                poll = False
+                for i in list(active):
+                    try:
+                        value = iters[i].send(None)
+                    except StopIteration as e:
+                        results[i] = e.value
+                        active.remove(i)
+                        if self.race:
+                            return results
+                        continue
+                    if value is None:
+                        poll = True
+                    elif deadline is None or value < deadline:
+                        deadline = value
+                if active:
+                    yield None if poll else deadline
+            return results
+        finally:
+            for i in active:
+                iters[i].close()
+
+    __iter__ = __await__
+
+
+def run_task(task, loop_time=10):
+    """task を最後まで実行して戻り値を返す"""
+    _world.in_task = True
+    it = task.__await__()
+    try:
+        while True:
+            try:
+                value = it.send(None)
+            except StopIteration as e:
+                return e.value
+            target = _world.now + loop_time
+            if value is not None and value > target:
+                target = value
+            _world.advance_to(target)
+    finally:
+        it.close()
+        _world.in_task = False
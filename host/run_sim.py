@@ -0,0 +1,88 @@
+"""ハブ用のプログラムを PC 上のシミュレーターで実行する
+
+使い方（リポジトリのルートで実行）:
+    python host/run_sim.py SUBMERGED_M10.py
+    python host/run_sim.py experiment.py run_comprehensive_test 90
+    python host/run_sim.py -q --press FORCE@2000 change_projects.py
+
+関数名を指定するとモジュールを import してその関数を呼び出します
+（引数は Python のリテラルとして解釈します）。
+指定しなければスクリプトを __main__ として実行します。
+wait() や走行は仮想時計で進むため、実時間を待たずに終わります。
+"""
+
+import argparse
+import ast
+import io
+import os
+import runpy
+import sys
+import time
+
+HOST_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HOST_DIR)
+
+from pybricks import _world  # noqa: E402
+
+
+def parse_press(spec):
+    """NAME@開始ms[:押す時間ms] を (名前, 開始, 時間) にする"""
+    name, _, timing = spec.partition("@")
+    start, _, duration = timing.partition(":")
+    return name.upper(), float(start or 0), float(duration or 100)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Pybricks プログラムを仮想時計で実行する")
+    parser.add_argument("script", help="実行するスクリプト（.py）")
+    parser.add_argument("function", nargs="?", help="呼び出す関数名（省略時は __main__ として実行）")
+    parser.add_argument("args", nargs="*", help="関数に渡す引数")
+    parser.add_argument("-q", "--quiet", action="store_true", help="プログラムの出力を表示しない")
+    parser.add_argument("--seed", type=int, default=0, help="乱数の種（ノイズの再現用）")
+    parser.add_argument("--noise", type=float, default=None, help="ノイズの大きさ（0で無効）")
+    parser.add_argument("--max-time", type=float, default=3600, help="シミュレーション時間の上限 [s]")
+    parser.add_argument("--storage", help="ハブの永続ストレージを保存するファイル")
+    parser.add_argument("--press", action="append", default=[],
+                        help="ボタン押下の予約 NAME@開始ms[:時間ms]（NAME は LEFT/RIGHT/CENTER/BLUETOOTH/FORCE）")
+    options = parser.parse_args(argv)
+
+    _world.reset()
+    _world.config(seed=options.seed)
+    if options.noise is not None:
+        _world.config(noise=options.noise)
+    _world.limit_ms = options.max_time * 1000
+    if options.storage:
+        _world.load_storage(options.storage)
+    for spec in options.press:
+        name, start, duration = parse_press(spec)
+        _world.schedule_press(name, start, duration)
+
+    script = os.path.abspath(options.script)
+    sys.path.insert(1, os.path.dirname(script))
+
+    stdout = sys.stdout
+    if options.quiet:
+        sys.stdout = io.StringIO()
+    started = time.perf_counter()
+    status = 0
+    try:
+        if options.function:
+            module = __import__(os.path.splitext(os.path.basename(script))[0])
+            args = [ast.literal_eval(a) for a in options.args]
+            getattr(module, options.function)(*args)
+        else:
+            runpy.run_path(script, run_name="__main__")
+    except _world.SimulationTimeout as e:
+        print("simulation stopped:", e, file=sys.stderr)
+        status = 1
+    finally:
+        sys.stdout = stdout
+        _world.save_storage()
+
+    wall = time.perf_counter() - started
+    print("simulated {:.1f} s in {:.3f} s".format(_world.now / 1000, wall), file=sys.stderr)
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
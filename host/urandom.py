@@ -0,0 +1,3 @@
+"""MicroPython の urandom のホスト用代替"""
+
+from random import *  # noqa: F401,F403
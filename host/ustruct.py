@@ -0,0 +1,3 @@
+"""MicroPython の ustruct のホスト用代替"""
+
+from struct import *  # noqa: F401,F403
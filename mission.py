@@ -0,0 +1,166 @@
+from array import array
+from pybricks.parameters import Stop
+from pybricks.tools import wait, multitask, StopWatch
+
+# ステップ表の1行: (op, arg, speed, then, timeout)
+#   op:      "S" 直進 [mm] / "T" 旋回 [度] / "C" カーブ ((半径mm, 角度)) / "L" アーム [度]
+#            （カーブの半径は正で右・負で左に曲がり、角度は正で前進・負で後退）
+#            末尾に "&" を付けると動作を始めるだけで完了を待たない（"S&" "L&" など）
+#            "W" arg ミリ秒待つ / "D" 走行距離が arg mm を超えるまで待つ / "J" 走行とアームの完了を待つ
+#            "H" 向き（robot.angle()、時計回りが正）が arg 度を 0 から見て超えるまで待つ
+#            （"&" 付きの走行の後に "D" や "H" を置くと、その位置からアームを走行と並行して動かせる）
+#            （"J" の停止の時刻は走行が完了した時刻で、motion.report_time_saved() に渡せる）
+#            "G" フィールド座標 arg = (x, y, heading) へ移動（navigation.go_to()。heading は None でもよい）
+#   speed:   直進速度 [mm/s]・旋回速度 [deg/s]・アーム速度 [deg/s]（None なら今の設定のまま）
+#   then:    動作の終わり方（None なら Stop.HOLD）。Stop.NONE で次の動作へ止まらずにつなぐ
+#   timeout: この時間 [ms] で打ち切る（None なら打ち切らない）
+# 表は tuple のまま置いておくだけなので、ミッションを増やしてもコードは増えません。
+
+DEFAULT_LIFT_SPEED = 180    # アームの速度を指定しないときの速度 [deg/s]
+POLL_MS = 5                 # "D" "H" "J" の条件や動作中の速度を確認する周期
+SPEED_TOLERANCE = 5         # これ以下の速度 [mm/s, deg/s] になったら「止まった（静定中）」とみなす
+MATCH_BUDGET_MS = 150000    # 試合時間（2分30秒）
+
+
+async def _until(condition):
+    while not condition():
+        await wait(POLL_MS)
+
+
+def _start(robot, lift, op, arg, speed, then, odometry=None):
+    """1ステップを開始し、完了を待つための awaitable を返す（待たない場合は None）"""
+    kind = op[0]
+    background = op[-1] == "&"
+    if then is None:
+        then = Stop.HOLD
+    if kind == "G":
+        if odometry is None:
+            raise ValueError("G needs odometry")
+        # "G" を使うミッションだけが navigation と settle を読み込むように、ここで import する
+        from navigation import go_to
+        if speed:
+            robot.settings(straight_speed=speed)
+        return go_to(robot, odometry, arg[0], arg[1], arg[2])
+    if kind == "S" or kind == "C":
+        if speed:
+            robot.settings(straight_speed=speed)
+        if kind == "S":
+            action = robot.straight(arg, then=then, wait=not background)
+        else:
+            action = robot.curve(arg[0], arg[1], then=then, wait=not background)
+    elif kind == "T":
+        if speed:
+            robot.settings(turn_rate=speed)
+        action = robot.turn(arg, then=then, wait=not background)
+    elif kind == "L":
+        action = lift.run_target(speed or DEFAULT_LIFT_SPEED, arg, then=then, wait=not background)
+    elif kind == "W":
+        return wait(arg)
+    elif kind == "D":
+        return _until(lambda: abs(robot.distance()) > arg)
+    elif kind == "H":
+        if arg >= 0:
+            return _until(lambda: robot.angle() >= arg)
+        return _until(lambda: robot.angle() <= arg)
+    else:
+        raise ValueError("unknown op: " + op)
+    return None if background else action
+
+
+def _speed(robot, lift, kind):
+    if kind == "L":
+        return abs(lift.speed())
+    _, drive_speed, _, turn_rate = robot.state()
+    return max(abs(drive_speed), abs(turn_rate))
+
+
+async def _watch_motion(robot, lift, kind, stops, i, watch):
+    """動作が完了するまで速度を見て、動いていた最後の時刻を stops[i] に書き続ける
+
+    timeout 付きのステップでは、動作が終わった時点で multitask(..., race=True) に
+    打ち切られるので、ループの後ではなく周期ごとに書いておきます。
+    """
+    is_done = lift.done if kind == "L" else robot.done
+    while not is_done():
+        if _speed(robot, lift, kind) > SPEED_TOLERANCE:
+            stops[i] = watch.time()
+        await wait(POLL_MS)
+
+
+async def _join(robot, lift, stops, i, watch):
+    """走行とアームの完了を待ち、走行が完了した時刻を stops[i] に書く"""
+    await _until(robot.done)
+    stops[i] = watch.time()
+    await _until(lambda: lift is None or lift.done())
+
+
+async def run_table(robot, lift, table, odometry=None):
+    """ステップ表を上から順に実行し、各ステップの時刻 [ms] を (開始, 停止, 終了) の array で返す
+
+    停止は動作が止まった時刻で、そこから終了までが静定（目標位置に収まるまで）の時間です。
+    待つだけのステップ（"W" "D" "H" と "&" 付き）の停止は開始と同じ時刻、"J" の停止は走行が完了した時刻です。
+    "G" は途中の補正も含めて全体を走行の時間とします（odometry が必要）。
+    """
+    count = len(table)
+    starts = array("i", [0] * count)
+    stops = array("i", [0] * count)
+    ends = array("i", [0] * count)
+    watch = StopWatch()
+    for i in range(count):
+        op, arg, speed, then, timeout = table[i]
+        starts[i] = stops[i] = watch.time()
+        if op == "J":
+            action = _join(robot, lift, stops, i, watch)
+        else:
+            action = _start(robot, lift, op, arg, speed, then, odometry)
+        if action is not None:
+            if op == "G":
+                await action
+                stops[i] = watch.time()
+            elif op in ("S", "T", "C", "L"):
+                monitor = _watch_motion(robot, lift, op, stops, i, watch)
+                if timeout:
+                    await multitask(action, monitor, wait(timeout), race=True)
+                else:
+                    await multitask(action, monitor)
+            elif timeout:
+                await multitask(action, wait(timeout), race=True)
+            else:
+                await action
+        ends[i] = watch.time()
+    return starts, stops, ends
+
+
+def print_profile(table, starts, stops, ends, budget_ms=MATCH_BUDGET_MS):
+    """ステップごとの走行・静定・待機時間と、試合時間に対する合計を表示
+
+    走行は動いている時間、静定は止まってから動作が完了するまで、
+    待機は "W"（wait）と "D" "H" "J"（他の動作を待つ）の時間です。
+    """
+    moving = settling = idle = sync = 0
+    waste = []      # (静定 + 待機の時間, ステップ番号)
+    print(" No  op   arg            開始[ms]  走行[ms]  静定[ms]  待機[ms]")
+    for i in range(len(table)):
+        op, arg, _, _, timeout = table[i]
+        move = stops[i] - starts[i]
+        settle = ends[i] - stops[i]
+        waited = 0
+        if op in ("W", "D", "H", "J"):
+            move, settle, waited = 0, 0, ends[i] - starts[i]
+            if op == "W":
+                idle += waited
+            else:
+                sync += waited
+        moving += move
+        settling += settle
+        waste.append((settle + waited, i))
+        note = "  タイムアウト" if timeout and ends[i] - starts[i] >= timeout else ""
+        print(f"{i + 1:>3}  {op:<3}  {str(arg):<12} {starts[i]:>8}  {move:>8}  {settle:>8}  {waited:>8}{note}")
+
+    total = ends[-1] if len(ends) else 0
+    print(f"合計: {total}ms = 走行 {moving}ms + 静定 {settling}ms + wait() {idle}ms + 待ち合わせ {sync}ms")
+    print(f"試合時間 {budget_ms / 1000:.0f}秒 のうち {total / 1000:.1f}秒 ({total * 100 / budget_ms:.1f}%)"
+          f"、残り {(budget_ms - total) / 1000:.1f}秒")
+    waste.sort(reverse=True)
+    print("短縮候補（静定・待機が長いステップ）: " + ", ".join(
+        f"No.{i + 1} {table[i][0]} {t}ms" for t, i in waste[:3] if t > 0))
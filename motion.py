@@ -0,0 +1,122 @@
+import math
+from pybricks.parameters import Stop
+
+# 停止して待つ従来の書き方で、動作の間に入れていた待ち時間
+LEGACY_WAIT_MS = 1000
+
+
+def _value(setting):
+    # settings() の加速度は (加速, 減速) の組のこともある
+    return setting[0] if isinstance(setting, (tuple, list)) else setting
+
+
+def _profile_ms(length, speed, accel):
+    """台形速度プロファイルで length だけ動く時間 [ms]（停止から停止まで）"""
+    length = abs(length)
+    if length == 0:
+        return 0
+    ramp = speed * speed / accel
+    if length >= ramp:
+        return (length / speed + speed / accel) * 1000
+    return 2 * math.sqrt(length / accel) * 1000
+
+
+def blend(segments, corner_radius=0):
+    """直進 → 旋回 → 直進 の角を半径 corner_radius の円弧（curve）に置き換える
+
+    円弧の接線の長さ（R x tan(角度/2)）だけ前後の直進を短くするので、最後に着く位置と向きは
+    元の動作と同じです。直進が短くて円弧が入らない角は、その場旋回のまま残します。
+    """
+    if not corner_radius:
+        return list(segments)
+    result = []
+    i = 0
+    while i < len(segments):
+        segment = segments[i]
+        if (segment[0] == "turn" and result and result[-1][0] == "straight"
+                and i + 1 < len(segments) and segments[i + 1][0] == "straight"):
+            angle = segment[1]
+            tangent = corner_radius * math.tan(math.radians(abs(angle)) / 2)
+            before = result[-1][1]
+            after = segments[i + 1][1]
+            if before > tangent and after > tangent:
+                result[-1] = ("straight", before - tangent)
+                # 半径の符号が曲がる向き（正で右、負で左）、角度は前進なので正
+                radius = corner_radius if angle > 0 else -corner_radius
+                result.append(("curve", radius, abs(angle)))
+                result.append(("straight", after - tangent))
+                i += 2
+                continue
+        result.append(segment)
+        i += 1
+    return result
+
+
+def _flows(segment, following):
+    """segment の終わりで止まらずに次へつなげられるか（進む向きが同じ直進・カーブどうし）"""
+    if following is None:
+        return False
+    moving = ("straight", "curve")
+    if segment[0] not in moving or following[0] not in moving:
+        return False
+    # 直進は距離、カーブは角度の符号が進む向き
+    return (segment[-1] > 0) == (following[-1] > 0)
+
+
+def table_rows(segments, corner_radius=0, wait_last=True):
+    """動作のリストを blend() で角を円弧にしてから、mission.py のステップ表の行にする
+
+    segments の要素:
+        ("straight", 距離mm) / ("turn", 角度) / ("curve", 半径mm, 角度)
+        （curve の半径は正で右・負で左に曲がり、角度は正で前進・負で後退）
+
+    前進どうしのつなぎ目は then=Stop.NONE で減速せずに次の動作へ移ります。
+    wait_last=False にすると最後の行を "&" 付き（完了を待たない）にするので、
+    後ろに "D" や "L&" をつなげて走行中にアームを動かせます。
+    円弧の接線の長さを手で計算して直進から引く必要はありません。
+    """
+    plan = blend(segments, corner_radius)
+    rows = []
+    for i, segment in enumerate(plan):
+        following = plan[i + 1] if i + 1 < len(plan) else None
+        then = Stop.NONE if _flows(segment, following) else None
+        if segment[0] == "straight":
+            op, arg = "S", round(segment[1], 1)
+        elif segment[0] == "turn":
+            op, arg = "T", segment[1]
+        else:
+            op, arg = "C", (segment[1], segment[2])
+        if following is None and not wait_last:
+            op += "&"
+        rows.append((op, arg, None, then, None))
+    return tuple(rows)
+
+
+def estimate_stop_and_wait_ms(robot, segments, wait_ms=LEGACY_WAIT_MS):
+    """各動作で止まって wait_ms 待つ従来の書き方でかかる時間の推定値 [ms]
+
+    segments は table_rows() に渡すのと同じ（角を円弧にする前の）動作のリストです。
+    現在の settings() の速度と加速度で、台形速度プロファイルの時間を足し合わせます。
+    """
+    straight_speed, straight_accel, turn_rate, turn_accel = robot.settings()
+    straight_accel = _value(straight_accel)
+    turn_accel = _value(turn_accel)
+    total = 0
+    for segment in segments:
+        if segment[0] == "straight":
+            total += _profile_ms(segment[1], straight_speed, straight_accel)
+        elif segment[0] == "turn":
+            total += _profile_ms(segment[1], turn_rate, turn_accel)
+        else:
+            total += _profile_ms(abs(segment[1]) * math.radians(segment[2]), straight_speed, straight_accel)
+    return total + wait_ms * (len(segments) - 1)
+
+
+def report_time_saved(robot, segments, elapsed_ms, wait_ms=LEGACY_WAIT_MS):
+    """table_rows() で走った実測時間と、同じ segments を停止して待つ書き方の推定時間を比べて表示
+
+    elapsed_ms には run_table() の結果から走行が終わった時刻（"J" の停止）を渡します。
+    """
+    legacy_ms = estimate_stop_and_wait_ms(robot, segments, wait_ms)
+    print(f"走行時間: {elapsed_ms}ms（停止して{wait_ms}ms待つ場合の推定 {legacy_ms:.0f}ms, "
+          f"{legacy_ms - elapsed_ms:.0f}ms 短縮）")
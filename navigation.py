@@ -0,0 +1,73 @@
+import math
+from pybricks.parameters import Stop
+from settle import wait_until_settled_async
+
+# go_to() の既定値
+POSITION_TOLERANCE_MM = 5     # 目標からこれ以内なら位置の補正をしない
+HEADING_TOLERANCE_DEG = 1     # 目標の向きからこれ以内なら向きの補正をしない
+MAX_CORRECTIONS = 2           # 1回目の移動のあとに補正する回数の上限
+CORRECTION_TURN_MM = 50       # 補正でこれより近いときは旋回せずに前後だけで合わせる
+
+
+def _wrap(angle):
+    """角度を -180〜180 度にする"""
+    return (angle + 180) % 360 - 180
+
+
+def plan_move(pose, x, y, allow_reverse=True):
+    """pose (x, y, heading) から (x, y) へ行く (旋回角度[度], 直進距離[mm]) を返す
+
+    その場で向きを変えてからまっすぐ進む、いちばん短い動き方です。
+    allow_reverse=True なら、目標が後ろ側にあるときは向きを変える量が少ない後退を選びます。
+    座標と向きは odometry.py と同じ（y は右が正、heading は時計回りが正）です。
+    """
+    px, py, heading = pose
+    dx = x - px
+    dy = y - py
+    distance = math.sqrt(dx * dx + dy * dy)
+    if distance == 0:
+        return 0, 0
+    turn = _wrap(math.degrees(math.atan2(dy, dx)) - heading)
+    if allow_reverse and abs(turn) > 90:
+        return _wrap(turn - 180), -distance
+    return turn, distance
+
+
+async def go_to(robot, odometry, x, y, heading=None, allow_reverse=True,
+                tolerance_mm=POSITION_TOLERANCE_MM, tolerance_deg=HEADING_TOLERANCE_DEG,
+                max_corrections=MAX_CORRECTIONS):
+    """フィールド座標 (x, y) へ移動し、heading を指定すればその向きにそろえる
+
+    odometry（odometry.py の Odometry）の run() を並行して動かしておく必要があります。
+    移動のたびに静止を待って推定位置を読み直し、目標からのずれが tolerance_mm を超えていれば
+    その位置からもう一度 plan_move() で補正します（最多 max_corrections 回）。
+    相対の移動量を手で調整しなくても、前の動作の誤差を次の動作で取り返せます。
+    移動後の推定位置からの目標までの距離 [mm] を返します。
+    """
+    for attempt in range(max_corrections + 1):
+        if attempt and odometry.distance_to(x, y) <= tolerance_mm:
+            break
+        pose = odometry.pose()
+        turn, distance = plan_move(pose, x, y, allow_reverse)
+        if attempt and abs(distance) < CORRECTION_TURN_MM:
+            # 近くまで来ていれば向きは変えず、進行方向のずれだけを前後に動いて直す
+            # （横方向の数 mm のために大きく旋回すると、かえってずれが増える）
+            theta = math.radians(pose[2])
+            turn = 0
+            distance = (x - pose[0]) * math.cos(theta) + (y - pose[1]) * math.sin(theta)
+            if abs(distance) <= tolerance_mm:
+                break
+        if abs(turn) > tolerance_deg:
+            await robot.turn(turn)
+        if distance:
+            await robot.straight(distance)
+        await wait_until_settled_async(robot, odometry.hub)
+
+    if heading is not None:
+        for _ in range(max_corrections + 1):
+            turn = _wrap(heading - odometry.pose()[2])
+            if abs(turn) <= tolerance_deg:
+                break
+            await robot.turn(turn, then=Stop.HOLD)
+            await wait_until_settled_async(robot, odometry.hub)
+    return odometry.distance_to(x, y)
@@ -0,0 +1,90 @@
+import math
+from array import array
+from pybricks.tools import wait, StopWatch
+from heading import HeadingReference
+
+
+class Odometry:
+    """左右のモーター角と IMU の heading からロボットの位置 (x, y, heading) を推定する
+
+    走行距離はタイヤの回転（左右の平均）から、向きは IMU から取り、
+    固定周期で少しずつ足し合わせます（run() をミッションと並行して動かす）。
+    座標はスタート位置が原点で、x はスタート時の前方、y は右方向 [mm]、
+    heading は時計回りが正 [度]（hub.imu.heading() と同じ向き）です。
+    wheel_diameter には DriveBase と同じ値（キャリブレーションしたタイヤ径）を渡します。
+
+    状態は最初に確保した array に書き込むだけなので、周期ごとにリストなどを作りません。
+    """
+
+    def __init__(self, hub, left, right, wheel_diameter, period_ms=10):
+        self.hub = hub
+        self.left = left
+        self.right = right
+        self.period_ms = period_ms
+        # タイヤ 1 度あたりの距離の半分（左右の平均をとるため）
+        self.mm_per_deg = math.pi * wheel_diameter / 360 / 2
+        self.reference = HeadingReference(hub)
+
+        # [x, y, heading, 前回の左右の角度の和, 前回の heading]
+        self.state = array("f", [0, 0, 0, 0, 0])
+        self.active = False
+        self.watch = StopWatch()
+        self.reset()
+
+    def reset(self, x=0, y=0, heading=0):
+        """今の位置を (x, y, heading) とみなす"""
+        self.reference.zero(heading)
+        state = self.state
+        state[0] = x
+        state[1] = y
+        state[2] = heading
+        state[3] = self.left.angle() + self.right.angle()
+        state[4] = heading
+
+    def update(self):
+        """前回からの移動を足し合わせる（run() が固定周期で呼ぶ）"""
+        state = self.state
+        wheels = self.left.angle() + self.right.angle()
+        heading = self.reference.heading()
+        step = (wheels - state[3]) * self.mm_per_deg
+        # 区間の途中の向きで進んだとみなす（円弧の近似）
+        theta = math.radians((heading + state[4]) / 2)
+        state[0] += step * math.cos(theta)
+        state[1] += step * math.sin(theta)
+        state[2] = heading
+        state[3] = wheels
+        state[4] = heading
+
+    def pose(self):
+        """推定した位置 (x[mm], y[mm], heading[度])"""
+        state = self.state
+        return state[0], state[1], state[2]
+
+    def distance_to(self, x, y):
+        """今の位置から (x, y) までの距離 [mm]"""
+        state = self.state
+        return math.sqrt((x - state[0]) ** 2 + (y - state[1]) ** 2)
+
+    async def run(self):
+        """固定周期で update() を呼び続ける非同期タスク
+
+        multitask(..., race=True) でミッションと一緒に実行すると、
+        ミッションの終了と同時に止まります。
+        """
+        self.active = True
+        self.watch.reset()
+        next_ms = 0
+        while self.active:
+            self.update()
+            # 処理時間の分だけ待ち時間を短くして周期を保つ
+            next_ms += self.period_ms
+            delay = next_ms - self.watch.time()
+            await wait(delay if delay > 0 else 0)
+
+    def stop(self):
+        """run() のループを次の周期で終了させる"""
+        self.active = False
+
+    def print_pose(self, label="位置"):
+        x, y, heading = self.pose()
+        print(f"{label}: x={x:.1f}mm, y={y:.1f}mm, heading={heading:.1f}°")
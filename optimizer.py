@@ -0,0 +1,162 @@
+from urandom import randrange
+from sweep import run_sweep
+
+# 既定の探索設定
+DEFAULT_CANDIDATES = 8     # 最初に試す候補の数
+DEFAULT_TOLERANCE = 1.0    # goal="fast" のときに許容する平均絶対誤差（mm または 度）
+
+
+def apply_settings(robot, condition):
+    """条件に含まれる PID ゲインを DriveBase に反映
+
+    distance_pid / heading_pid に (kp, ki, kd) を指定します。
+    速度・加速度は run_sweep が apply_condition() で反映します。
+    """
+    if "distance_pid" in condition:
+        kp, ki, kd = condition["distance_pid"]
+        robot.distance_control.pid(kp=kp, ki=ki, kd=kd)
+    if "heading_pid" in condition:
+        kp, ki, kd = condition["heading_pid"]
+        robot.heading_control.pid(kp=kp, ki=ki, kd=kd)
+
+
+def save_settings(robot):
+    """候補を試す前の速度・加速度、PID ゲイン、左右のモーターの出力の上限を覚えておく"""
+    return (robot.settings(), robot.distance_control.pid(), robot.heading_control.pid(),
+            robot.left_motor.control.limits(), robot.right_motor.control.limits())
+
+
+def restore_settings(robot, saved):
+    """save_settings() で覚えた設定に戻す"""
+    settings, distance_pid, heading_pid, left_limits, right_limits = saved
+    robot.settings(*settings)
+    robot.distance_control.pid(*distance_pid)
+    robot.heading_control.pid(*heading_pid)
+    robot.left_motor.control.limits(*left_limits)
+    robot.right_motor.control.limits(*right_limits)
+
+
+def _make_condition(space, indexes, fixed):
+    condition = dict(fixed)
+    for (name, values), i in zip(space, indexes):
+        value = values[i]
+        if isinstance(value, dict):
+            for key in value:
+                condition[key] = value[key]
+        else:
+            condition[name] = value
+    return condition
+
+
+def sample_candidates(space, count, fixed=None):
+    """探索空間 [(名前, 値のリスト), ...] から重複なしで count 個の条件を選ぶ
+
+    組み合わせの総数が count 以下なら全部を返します。
+    """
+    fixed = fixed or {}
+    total = 1
+    for _, values in space:
+        total *= len(values)
+    if total <= count:
+        picks = range(total)
+    else:
+        picks = []
+        while len(picks) < count:
+            pick = randrange(total)
+            if pick not in picks:
+                picks.append(pick)
+    candidates = []
+    for pick in picks:
+        indexes = []
+        for _, values in reversed(space):
+            indexes.insert(0, pick % len(values))
+            pick //= len(values)
+        candidates.append(_make_condition(space, indexes, fixed))
+    return candidates
+
+
+def score(result, goal="accuracy", tolerance=DEFAULT_TOLERANCE):
+    """候補の評価値（小さいほど良い）
+
+    goal="accuracy" は平均絶対誤差、goal="fast" は誤差が tolerance 以内の候補の中での
+    平均時間です（tolerance を超える候補は、どの許容内の候補よりも悪い扱い）。
+    """
+    if goal == "fast":
+        if result["mean_abs_error"] <= tolerance:
+            return result["mean_time_ms"]
+        return 1000000 + result["mean_abs_error"]
+    return result["mean_abs_error"]
+
+
+def _merge(total, result):
+    """これまでの結果に今回の実験結果を足し合わせる"""
+    if total is None:
+        return result
+    n = total["trials"] + result["trials"]
+    errors = total["errors"] + result["errors"]
+    total["trials"] = n
+    total["errors"] = errors
+    total["mean_error"] = sum(errors) / n
+    total["mean_abs_error"] = sum(abs(e) for e in errors) / n
+    total["mean_time_ms"] = (total["mean_time_ms"] * (n - result["trials"])
+                             + result["mean_time_ms"] * result["trials"]) / n
+    return total
+
+
+async def successive_halving(hub, robot, kind, space, fixed=None, goal="accuracy", tolerance=DEFAULT_TOLERANCE,
+                             candidates=DEFAULT_CANDIDATES, prepare=None, lift=None):
+    """逐次半減法で最も良い設定を探し、その結果（dict）を返す
+
+    Args:
+        kind: run_sweep と同じ（"straight" / "turn" / "lift"）
+        space: [(名前, 値のリスト), ...]（make_grid と同じ形。PID は distance_pid / heading_pid）
+        fixed: すべての候補に共通の条件（{"angle": 90} など）
+        goal: "accuracy"（最も正確）か "fast"（誤差 tolerance 以内で最も速い）
+        candidates: 最初に試す候補の数
+        prepare: 各候補の実験前に prepare(condition) として呼ぶ関数
+
+    最初は全候補を1回ずつ試し、評価の良い半分だけを残して実験回数を倍にする、を
+    1候補になるまで繰り返します。全組み合わせを何回も試すより、ずっと少ない回数で済みます。
+    候補の設定（PID ゲインや prepare で変えたモーターの出力）は、終わったら探索前の設定に戻します。
+    """
+    pool = sample_candidates(space, candidates, fixed)
+    saved = save_settings(robot)
+
+    def setup(condition):
+        apply_settings(robot, condition)
+        if prepare is not None:
+            prepare(condition)
+
+    totals = [None] * len(pool)
+    trials = 1
+    round_number = 1
+    total_trials = 0
+    while True:
+        print(f"\n--- 第{round_number}ラウンド: {len(pool)}候補 x 累計{trials}回 ---")
+        for i, condition in enumerate(pool):
+            done = totals[i]["trials"] if totals[i] is not None else 0
+            extra = trials - done
+            if extra <= 0:
+                continue
+            result = (await run_sweep(hub, robot, kind, [condition], extra, lift=lift,
+                                      prepare=setup, resume=False))[0]
+            totals[i] = _merge(totals[i], result)
+            total_trials += extra
+
+        ranked = sorted(range(len(pool)), key=lambda i: score(totals[i], goal, tolerance))
+        for rank, i in enumerate(ranked):
+            result = totals[i]
+            print(f"{rank + 1}. {pool[i]} 平均絶対誤差={result['mean_abs_error']:.2f} "
+                  f"平均時間={result['mean_time_ms']:.0f}ms ({result['trials']}回)")
+        if len(pool) == 1:
+            break
+        keep = ranked[:(len(pool) + 1) // 2]
+        pool = [pool[i] for i in keep]
+        totals = [totals[i] for i in keep]
+        trials *= 2
+        round_number += 1
+
+    restore_settings(robot, saved)
+    best = totals[0]
+    print(f"\n最良の設定: {pool[0]}（実験 合計{total_trials}回）")
+    return best
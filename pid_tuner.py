@@ -0,0 +1,174 @@
+from array import array
+from pybricks.tools import wait, StopWatch
+from settle import wait_until_settled_async
+
+# ステップ応答の記録設定
+SAMPLE_MS = 5              # 記録周期（高速に記録するため print はしない）
+MAX_SAMPLES = 800          # 記録できる最大サンプル数（5ms 周期で4秒）
+
+# 評価の設定
+SETTLE_BAND = 0.02         # 目標値の±2%以内に収まったら整定とみなす
+MIN_BAND = {"distance": 1.0, "heading": 0.5}   # 整定幅の下限 [mm, 度]
+OVERSHOOT_PENALTY = 200    # オーバーシュート1%あたりの評価値の悪化 [ms]
+ERROR_PENALTY = 500        # 定常偏差1単位（mm または 度）あたりの評価値の悪化 [ms]
+
+# 既定のステップ量と探索の設定
+DEFAULT_STEP = {"distance": 200, "heading": 90}
+START_FACTOR = 1.5         # 最初にゲインを何倍・何分の1にして試すか
+MIN_FACTOR = 1.1           # 倍率がこれより小さくなったら終了
+MAX_EVALUATIONS = 24       # ゲインの組を試す最大回数
+
+
+def _control(robot, axis):
+    return robot.distance_control if axis == "distance" else robot.heading_control
+
+
+def _position(robot, axis):
+    distance, _, angle, _ = robot.state()
+    return distance if axis == "distance" else angle
+
+
+async def record_step(hub, robot, axis, step):
+    """ステップ移動を1回行い、(時刻[ms], 位置) の array を返す
+
+    位置は移動開始時を0とした値です（distance は mm、heading は度）。
+    """
+    times = array("i", [0] * MAX_SAMPLES)
+    values = array("f", [0] * MAX_SAMPLES)
+    start = _position(robot, axis)
+    if axis == "distance":
+        robot.straight(step, wait=False)
+    else:
+        robot.turn(step, wait=False)
+
+    watch = StopWatch()
+    count = 0
+    while count < MAX_SAMPLES:
+        times[count] = watch.time()
+        values[count] = _position(robot, axis) - start
+        count += 1
+        if robot.done():
+            break
+        await wait(SAMPLE_MS)
+    # 動作完了後の揺れも記録する
+    settle_ms = await wait_until_settled_async(robot, hub)
+    if count < MAX_SAMPLES:
+        times[count] = times[count - 1] + settle_ms
+        values[count] = _position(robot, axis) - start
+        count += 1
+    return times[:count], values[:count]
+
+
+def step_metrics(times, values, target, band=None):
+    """ステップ応答から立ち上がり時間・オーバーシュート・整定時間・定常偏差を求める
+
+    Returns:
+        dict: rise_ms（10%→90%）, overshoot（%）, settle_ms, steady_error
+    """
+    sign = 1 if target >= 0 else -1
+    size = abs(target)
+    if band is None:
+        band = size * SETTLE_BAND
+
+    t10 = t90 = None
+    peak = 0
+    settle_ms = 0
+    for t, v in zip(times, values):
+        v = v * sign
+        if t10 is None and v >= size * 0.1:
+            t10 = t
+        if t90 is None and v >= size * 0.9:
+            t90 = t
+        if v > peak:
+            peak = v
+        if abs(v - size) > band:
+            settle_ms = t
+    rise_ms = (t90 - t10) if t10 is not None and t90 is not None else times[-1]
+    overshoot = max(0, peak - size) / size * 100 if size else 0
+    return {
+        "rise_ms": rise_ms,
+        "overshoot": overshoot,
+        "settle_ms": settle_ms,
+        "steady_error": values[-1] - target,
+    }
+
+
+def cost(metrics):
+    """評価値（小さいほど良い）: 整定時間にオーバーシュートと定常偏差のペナルティを足したもの"""
+    return (metrics["settle_ms"]
+            + OVERSHOOT_PENALTY * metrics["overshoot"]
+            + ERROR_PENALTY * abs(metrics["steady_error"]))
+
+
+async def evaluate(hub, robot, axis, gains, step):
+    """ゲイン (kp, ki, kd) で往復のステップ移動を行い、平均の評価値と往路の指標を返す"""
+    kp, ki, kd = gains
+    _control(robot, axis).pid(kp=kp, ki=ki, kd=kd)
+    band = max(abs(step) * SETTLE_BAND, MIN_BAND[axis])
+    total = 0
+    forward = None
+    for target in (step, -step):
+        times, values = await record_step(hub, robot, axis, target)
+        metrics = step_metrics(times, values, target, band)
+        total += cost(metrics)
+        if forward is None:
+            forward = metrics
+    return total / 2, forward
+
+
+def _print_metrics(gains, score, metrics):
+    print(f"kp={gains[0]:5d} ki={gains[1]:4d} kd={gains[2]:4d} | 評価={score:6.0f} "
+          f"立ち上がり={metrics['rise_ms']:4d}ms オーバーシュート={metrics['overshoot']:4.1f}% "
+          f"整定={metrics['settle_ms']:4d}ms 定常偏差={metrics['steady_error']:+.2f}")
+
+
+async def tune(hub, robot, axis="heading", step=None, gains=None, max_evaluations=MAX_EVALUATIONS):
+    """座標降下法で PID ゲインを調整し、最良の (kp, ki, kd) を返す
+
+    Args:
+        axis: "distance"（直進の distance_control）か "heading"（旋回の heading_control）
+        step: ステップ移動の大きさ（mm または 度）。往復するので元の位置に戻ります
+        gains: 初期ゲイン。省略すると現在の設定から始めます
+
+    kp → kd → ki の順に、ゲインを倍率 factor 倍・1/factor 倍にして評価が良くなれば採用します。
+    1巡して改善しなければ倍率を小さくし、MIN_FACTOR を下回るか max_evaluations 回で終了します。
+    """
+    if step is None:
+        step = DEFAULT_STEP[axis]
+    if gains is None:
+        gains = _control(robot, axis).pid()[:3]
+    best = [int(g) for g in gains]
+
+    print(f"\n=== PIDゲイン自動調整 ({axis}, ステップ {step}) ===")
+    best_score, metrics = await evaluate(hub, robot, axis, best, step)
+    _print_metrics(best, best_score, metrics)
+    evaluations = 1
+
+    factor = START_FACTOR
+    while factor >= MIN_FACTOR and evaluations < max_evaluations:
+        improved = False
+        for index in (0, 2, 1):
+            for scale in (factor, 1 / factor):
+                if evaluations >= max_evaluations:
+                    break
+                trial = list(best)
+                trial[index] = max(1, int(round(best[index] * scale)))
+                if trial[index] == best[index]:
+                    continue
+                score, metrics = await evaluate(hub, robot, axis, trial, step)
+                evaluations += 1
+                _print_metrics(trial, score, metrics)
+                if score < best_score:
+                    best, best_score = trial, score
+                    improved = True
+                    break
+        if not improved:
+            factor = factor ** 0.5
+
+    _control(robot, axis).pid(kp=best[0], ki=best[1], kd=best[2])
+    prefix = "DISTANCE" if axis == "distance" else "HEADING"
+    print(f"\n最良のゲイン（評価 {best_score:.0f}, {evaluations}回試行）:")
+    print(f"{prefix}_KP = {best[0]}")
+    print(f"{prefix}_KI = {best[1]}")
+    print(f"{prefix}_KD = {best[2]}")
+    return tuple(best)
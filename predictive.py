@@ -0,0 +1,282 @@
+from pybricks.parameters import Axis
+from pybricks.tools import wait, StopWatch
+from heading import HeadingReference
+from settle import wait_until_settled_async
+from sweep import make_grid, run_sweep, measure_straight, measure_turn, print_table
+
+# 止め始めてから止まるまでに回る角度のモデル: 角度 = a x 角速度 + b x 角速度^2
+# （a は応答遅れ [s]、b は 1 / (2 x 減速度) に相当）
+# learn_turn_model() の実行後に表示される値を貼り付けて使います。
+TURN_STOP_MODEL = (0.03, 0.0003)
+# 直進でブレーキをかけてから止まるまでに進む距離のモデル: 距離 = a x 速度 + b x 速度^2
+# learn_straight_model() の実行後に表示される値を貼り付けて使います。
+# まだ学習していないので None です（このままでは predictive_straight() に model を渡す必要があります）。
+STRAIGHT_STOP_MODEL = None
+
+POLL_MS = 2                 # 止め始める位置を判定する周期
+CORRECTION_RATE = 60        # 最後の補正旋回の速度 [deg/s]
+TOLERANCE_DEG = 0.5         # 誤差がこれ以下なら補正旋回をしない
+LEARN_RATES = (150, 300, 450, 600)
+CORRECTION_SPEED = 50       # 直進の最後の補正の速度 [mm/s]
+STRAIGHT_TOLERANCE_MM = 1   # 誤差がこれ以下なら補正しない
+MODEL_TOLERANCE_MM = 3      # 直進モデルの残差の許容値（超えたら警告）
+# ayumu_accuracy_test_20250621.py の TEST_PATTERNS と同じ速度 [mm/s]
+LEARN_SPEEDS = (100, 200, 300, 500, 760)
+RUN_UP_MM = 600             # 学習で最高速度に達するまでに使う距離の上限
+TIMEOUT_MARGIN_MS = 1000    # 目標まで最高速度で進む時間にこれを足した時間で打ち切る
+
+
+def heading_rate(hub):
+    """IMU の角速度を heading と同じ向き（時計回りが正）で返す [deg/s]"""
+    return -hub.imu.angular_velocity(Axis.Z)
+
+
+def stopping_amount(model, rate):
+    """速度 rate で止め始めたときに止まるまでに進む量（モデルの予測）"""
+    a, b = model
+    rate = abs(rate)
+    return a * rate + b * rate * rate
+
+
+async def drive_until(robot, reached, timeout_ms):
+    """reached() が True になるまで待ち、着いたら True を返す
+
+    timeout_ms を過ぎるか、ぶつかってモーターが止められた（stalled）ときは False を返します。
+    """
+    watch = StopWatch()
+    while not reached():
+        if watch.time() >= timeout_ms or robot.stalled():
+            return False
+        await wait(POLL_MS)
+    return True
+
+
+def fit_stop_model(points):
+    """(速度, 止まるまでに進んだ量) の組から a, b を最小二乗法で求め、(a, b) を返す"""
+    s2 = s3 = s4 = sy1 = sy2 = 0
+    for rate, amount in points:
+        r2 = rate * rate
+        s2 += r2
+        s3 += r2 * rate
+        s4 += r2 * r2
+        sy1 += amount * rate
+        sy2 += amount * r2
+    det = s2 * s4 - s3 * s3
+    if not det:
+        return (sy1 / s2 if s2 else 0, 0)
+    return ((sy1 * s4 - sy2 * s3) / det, (s2 * sy2 - s3 * sy1) / det)
+
+
+def print_fit(name, model, points, unit):
+    """モデルを貼り付けられる形で表示し、各点の残差を表示して残差の最大値を返す"""
+    print(f"{name} = ({model[0]:.5f}, {model[1]:.7f})")
+    worst = 0
+    for rate, amount in points:
+        predicted = stopping_amount(model, rate)
+        worst = max(worst, abs(amount - predicted))
+        print(f"  速度 {rate:6.1f}: 実測 {amount:6.2f}{unit}, 予測 {predicted:6.2f}{unit}, 残差 {amount - predicted:+.2f}{unit}")
+    return worst
+
+
+async def learn_turn_model(hub, robot, rates=LEARN_RATES, repeat=2):
+    """各旋回速度で回転中にブレーキをかけ、止まるまでに回った角度からモデルを求める"""
+    reference = HeadingReference(hub)
+    points = []
+    for rate in rates:
+        for i in range(repeat):
+            direction = 1 if i % 2 == 0 else -1    # 左右交互に回って元の向きに戻す
+            robot.drive(0, direction * rate)
+            watch = StopWatch()
+            # 指定の速度に達するまで回す（届かなければ 1.5 秒で打ち切る）
+            while abs(heading_rate(hub)) < 0.95 * rate and watch.time() < 1500:
+                await wait(POLL_MS)
+            measured = abs(heading_rate(hub))
+            start = reference.heading()
+            robot.brake()
+            await wait_until_settled_async(robot, hub)
+            amount = abs(reference.heading() - start)
+            points.append((measured, amount))
+            print(f"旋回速度 {rate}deg/s（実測 {measured:.0f}）: 止まるまで {amount:.1f}°")
+    model = fit_stop_model(points)
+    print_fit("TURN_STOP_MODEL", model, points, "°")
+    return model
+
+
+async def predictive_turn(robot, hub, angle, rate=450, model=None, correction_rate=CORRECTION_RATE,
+                          tolerance=TOLERANCE_DEG):
+    """IMU の角速度から止まるまでに回る角度を予測し、早めにブレーキをかける旋回
+
+    robot.turn() の台形プロファイルより長く最高速度で回り、残りの角度が予測した停止角度に
+    なったところでブレーキをかけます。残った誤差は correction_rate の低速で旋回して直します。
+    ぶつかって回れないときや時間内に目標の角度に届かないときは、ブレーキをかけて補正せずに終わります。
+    最後の誤差 [度]（目標 − 実際）を返します。
+    """
+    if model is None:
+        model = TURN_STOP_MODEL
+    reference = HeadingReference(hub)
+    direction = 1 if angle >= 0 else -1
+
+    def reached():
+        remaining = (angle - reference.heading()) * direction
+        return remaining <= stopping_amount(model, heading_rate(hub))
+
+    robot.drive(0, direction * rate)
+    arrived = await drive_until(robot, reached, abs(angle) * 1000 / rate + TIMEOUT_MARGIN_MS)
+    robot.brake()
+    await wait_until_settled_async(robot, hub)
+
+    error = angle - reference.heading()
+    if not arrived:
+        print(f"注意: 旋回が目標に届かずに打ち切りました（誤差 {error:.1f}°）")
+    elif abs(error) > tolerance:
+        straight_speed, straight_acceleration, turn_rate, turn_acceleration = robot.settings()
+        robot.settings(turn_rate=correction_rate)
+        await robot.turn(error)
+        robot.settings(turn_rate=turn_rate)
+        await wait_until_settled_async(robot, hub)
+        error = angle - reference.heading()
+    return error
+
+
+async def compare_turns(hub, robot, angles=(90,), rates=(150, 300, 450, 600), repeat=3, model=None):
+    """robot.turn() と predictive_turn() の誤差と時間を同じ条件で比べる"""
+    async def measure(condition):
+        if condition["method"] == "turn":
+            return await measure_turn(hub, robot, condition)
+        watch = StopWatch()
+        error = await predictive_turn(robot, hub, condition["angle"], condition["speed"], model)
+        # measure_turn と同じく「実際 − 目標」の向きにそろえる
+        return -error, watch.time()
+
+    conditions = make_grid(("method", ["turn", "predictive"]), ("speed", list(rates)), ("angle", list(angles)))
+    results = await run_sweep(hub, robot, "turn", conditions, repeat, measure=measure, resume=False)
+    print("\n=== robot.turn() と predictive_turn() の比較 ===")
+    print_table(results, ("method", "speed", "angle"), "度")
+    return results
+
+
+async def learn_straight_model(hub, robot, speeds=LEARN_SPEEDS, repeat=2, tolerance=MODEL_TOLERANCE_MM):
+    """各速度で直進中にブレーキをかけ、止まるまでに進んだ距離からモデルを求める
+
+    前進と後退を交互に行うので、ほぼ元の位置に戻ります（前後に RUN_UP_MM 程度の余裕が必要）。
+    """
+    points = []
+    for speed in speeds:
+        for i in range(repeat):
+            direction = 1 if i % 2 == 0 else -1
+            start = robot.distance()
+            robot.drive(direction * speed, 0)
+            # 指定の速度に達するまで走る（届かなければ RUN_UP_MM で打ち切る）
+            while (abs(robot.state()[1]) < 0.95 * speed
+                   and abs(robot.distance() - start) < RUN_UP_MM):
+                await wait(POLL_MS)
+            measured = abs(robot.state()[1])
+            braked_at = robot.distance()
+            robot.brake()
+            await wait_until_settled_async(robot, hub)
+            amount = abs(robot.distance() - braked_at)
+            points.append((measured, amount))
+            print(f"直進速度 {speed}mm/s（実測 {measured:.0f}）: 止まるまで {amount:.1f}mm")
+    model = fit_stop_model(points)
+    worst = print_fit("STRAIGHT_STOP_MODEL", model, points, "mm")
+    if worst > tolerance:
+        print(f"注意: 残差が最大 {worst:.1f}mm で許容値 {tolerance}mm を超えています（速度の範囲を狭めてください）")
+    return model
+
+
+async def predictive_straight(robot, hub, distance, speed=500, model=None, correction_speed=CORRECTION_SPEED,
+                              tolerance=STRAIGHT_TOLERANCE_MM):
+    """止まるまでに進む距離を予測し、ぎりぎりまで最高速度で走ってからブレーキをかける直進
+
+    robot.straight() の減速区間のぶん長く最高速度で走ります。
+    残った誤差は correction_speed の低速で直進して直します。
+    壁などにぶつかったときや時間内に目標の距離に届かないときは、ブレーキをかけて補正せずに終わります。
+    最後の誤差 [mm]（目標 − 実際）を返します。
+    model を省略すると STRAIGHT_STOP_MODEL を使います（未学習の None なら ValueError）。
+    """
+    if model is None:
+        model = STRAIGHT_STOP_MODEL
+    if model is None:
+        raise ValueError("STRAIGHT_STOP_MODEL is not learned yet")
+    start = robot.distance()
+    direction = 1 if distance >= 0 else -1
+
+    def reached():
+        remaining = (distance - (robot.distance() - start)) * direction
+        return remaining <= stopping_amount(model, robot.state()[1])
+
+    robot.drive(direction * speed, 0)
+    arrived = await drive_until(robot, reached, abs(distance) * 1000 / speed + TIMEOUT_MARGIN_MS)
+    robot.brake()
+    await wait_until_settled_async(robot, hub)
+
+    error = distance - (robot.distance() - start)
+    if not arrived:
+        print(f"注意: 直進が目標に届かずに打ち切りました（誤差 {error:.1f}mm）")
+    elif abs(error) > tolerance:
+        straight_speed, straight_acceleration, turn_rate, turn_acceleration = robot.settings()
+        robot.settings(straight_speed=correction_speed)
+        await robot.straight(error)
+        robot.settings(straight_speed=straight_speed)
+        await wait_until_settled_async(robot, hub)
+        error = distance - (robot.distance() - start)
+    return error
+
+
+def print_time_saved(results, keys, baseline, method):
+    """同じ条件（keys）で baseline と method の平均時間と平均絶対誤差を並べて表示"""
+    rows = {}
+    for result in results:
+        rows[(result["method"],) + tuple(result[key] for key in keys)] = result
+    print(f"\n=== {method} の時間短縮（{baseline} との比較）===")
+    for result in results:
+        if result["method"] != baseline:
+            continue
+        other = rows.get((method,) + tuple(result[key] for key in keys))
+        if other is None:
+            continue
+        saved = result["mean_time_ms"] - other["mean_time_ms"]
+        label = ", ".join(f"{key}={result[key]}" for key in keys)
+        print(f"{label}: {result['mean_time_ms']:.0f}ms → {other['mean_time_ms']:.0f}ms "
+              f"({saved:+.0f}ms, {saved * 100 / result['mean_time_ms']:.0f}%短縮), "
+              f"平均絶対誤差 {result['mean_abs_error']:.2f} → {other['mean_abs_error']:.2f}")
+
+
+async def compare_straights(hub, robot, distances=(200, 500, 1000), speeds=(300, 500, 760), repeat=3, model=None):
+    """robot.straight() と predictive_straight() の誤差と時間を同じ条件で比べる
+
+    model には learn_straight_model() で求めたモデルを渡します（省略すると STRAIGHT_STOP_MODEL）。
+    """
+    async def measure(condition):
+        if condition["method"] == "straight":
+            return await measure_straight(hub, robot, condition)
+        watch = StopWatch()
+        error = await predictive_straight(robot, hub, condition["distance"], condition["speed"], model)
+        elapsed = watch.time()
+        # measure_straight と同じく元の位置に戻り、「実際 − 目標」の向きにそろえる
+        await robot.straight(error - condition["distance"])
+        await wait_until_settled_async(robot, hub)
+        return -error, elapsed
+
+    conditions = make_grid(("method", ["straight", "predictive"]), ("speed", list(speeds)),
+                           ("distance", list(distances)))
+    results = await run_sweep(hub, robot, "straight", conditions, repeat, measure=measure, resume=False)
+    print("\n=== robot.straight() と predictive_straight() の比較 ===")
+    print_table(results, ("method", "speed", "distance"), "mm")
+    print_time_saved(results, ("speed", "distance"), "straight", "predictive")
+    return results
+
+
+def run_comparison():
+    """停止モデルを学習してから、通常の旋回・直進と比較する"""
+    from pybricks.tools import run_task
+    from setup import initialize_robot
+    hub, left, right, robot = initialize_robot()
+    model = run_task(learn_turn_model(hub, robot))
+    run_task(compare_turns(hub, robot, model=model))
+    model = run_task(learn_straight_model(hub, robot))
+    run_task(compare_straights(hub, robot, model=model))
+
+
+if __name__ == "__main__":
+    run_comparison()
@@ -3,23 +3,37 @@ from pybricks.parameters import Port, Axis, Direction, Stop
 from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
 from pybricks.tools import wait, multitask, run_task
-
-hub = PrimeHub(top_side=Axis.Z,
-               front_side=Axis.X)
-
-left  = Motor(Port.F, positive_direction=Direction.COUNTERCLOCKWISE)
-right = Motor(Port.B, positive_direction=Direction.CLOCKWISE)
-
-lift = Motor(Port.A,positive_direction=Direction.CLOCKWISE)
-
-robot = DriveBase(left, right, wheel_diameter=56, axle_track=115)
-
+from telemetry import TelemetryRecorder
+from mission import run_table, print_profile
+from motion import table_rows, report_time_saved
+from odometry import Odometry
+from calibration import load_calibration
 
 FIRST_STRAIGHT_DISTANCE_MM = 260
 TURN_ANGLE_REG = -45
 TO_TOWER_DISTANCE_MM = 670
 LIFT_ARM_TURN_ANGLE = 500
 LIFT_ARM_TURN_SPEED = 180
+CORNER_RADIUS_MM = 80
+LIFT_START_DISTANCE_MM = 750
+
+#タワーまでの道のり（曲がるところは table_rows() が止まらずに走る円弧にする）
+ROUTE = (
+    ("straight", FIRST_STRAIGHT_DISTANCE_MM),
+    ("straight", 100),
+    ("turn", -48),              # 左へ48度
+    ("straight", 640),
+)
+
+#ミッションのステップ表 (op, arg, speed, then, timeout)（書き方は mission.py を参照）
+MISSION = table_rows(ROUTE, CORNER_RADIUS_MM, wait_last=False) + (
+    #アームは LIFT_START_DISTANCE_MM 走ったところから走行と並行して動かす
+    ("D", LIFT_START_DISTANCE_MM, None, None, None),
+    ("L&", LIFT_ARM_TURN_ANGLE, LIFT_ARM_TURN_SPEED, None, None),
+    ("J", None, None, None, 5000),
+    ("W", 1000, None, None, None),
+    ("L", LIFT_ARM_TURN_ANGLE, LIFT_ARM_TURN_SPEED, None, None),
+)
 
 
 DISTANCE_KP = 1000
@@ -31,58 +45,62 @@ HEADING_KI = 50
 HEADING_KD = 100
 
 
-robot.distance_control.pid(
-    kp=DISTANCE_KP,
-    ki=HEADING_KI,
-    kd=HEADING_KD
-)
+def setup_robot():
+    """ハブ・モーター・DriveBase を作って初期化し、(hub, left, right, robot, lift, calibration) を返す"""
+    hub = PrimeHub(top_side=Axis.Z,
+                   front_side=Axis.X)
 
+    left  = Motor(Port.F, positive_direction=Direction.COUNTERCLOCKWISE)
+    right = Motor(Port.B, positive_direction=Direction.CLOCKWISE)
 
-robot.use_gyro(True)
-hub.imu.reset_heading(0)
-robot.reset()
-lift.reset_angle(0)
+    lift = Motor(Port.A,positive_direction=Direction.CLOCKWISE)
 
+    # 保存済みのキャリブレーション値（なければ既定値）。Odometry にも同じタイヤ径を渡す
+    calibration = load_calibration(hub)
+    robot = DriveBase(left, right, wheel_diameter=calibration["wheel_diameter"],
+                      axle_track=calibration["axle_track"])
 
+    robot.distance_control.pid(
+        kp=DISTANCE_KP,
+        ki=HEADING_KI,
+        kd=HEADING_KD
+    )
 
-async def sensor_logger_task():
+    robot.use_gyro(True)
+    hub.imu.reset_heading(0)
+    robot.reset()
+    lift.reset_angle(0)
+    return hub, left, right, robot, lift, calibration
 
-    while True:
-        heading = hub.imu.heading()
-        left_deg = left.angle()
-        right_deg = right.angle()
-        dist = robot.distance()
-        print(f"LOG:dist={dist:4.0f} mm headimg={heading:4.0f}゜ L={left_deg:5.0f}゜ R={right_deg:5.0f}°")
-        await wait(1000)
-async def main_robot_sequence_task():
+
+async def main_robot_sequence_task(robot, lift):
+    """ミッション本体（change_projects.py からも robot と lift を渡して呼び出す）"""
     print("start GO forward")
-    await robot.straight(FIRST_STRAIGHT_DISTANCE_MM)
-    print("Stop")
-
-    await wait(1000)
-
-    print("Start GO To Mission tower")
-    await robot.straight(100)
-    print("Stop")
-#曲がるところ
-    await wait(1000)
-    await robot.turn(-48)
-    print("Start Lefting tower")
-    await robot.straight(640)
-    await lift.run_target(LIFT_ARM_TURN_SPEED,LIFT_ARM_TURN_ANGLE)
-
-    await wait(1000)
-    
-    print("Return")
-    await lift.run_target(LIFT_ARM_TURN_SPEED,LIFT_ARM_TURN_ANGLE)
+    starts, stops, ends = await run_table(robot, lift, MISSION)
+    print_profile(MISSION, starts, stops, ends)
+    # 走行が終わった時刻（"J" の停止）を、停止して待つ書き方の推定時間と比べる
+    join = [row[0] for row in MISSION].index("J")
+    report_time_saved(robot, ROUTE, stops[join])
     print("Mission Complete")
 
     robot.stop()
 
 
-run_task(multitask(
-    sensor_logger_task(),
-    main_robot_sequence_task()
-))
+def run_mission():
+    """このファイルだけで実行するときの入口"""
+    hub, left, right, robot, lift, calibration = setup_robot()
+    recorder = TelemetryRecorder(hub, left, right, robot)
+    odometry = Odometry(hub, left, right, calibration["wheel_diameter"])
+
+    run_task(multitask(
+        recorder.run(),
+        odometry.run(),
+        main_robot_sequence_task(robot, lift),
+        race=True
+    ))
+    recorder.dump()
+    odometry.print_pose("終了位置")
+
 
-    
\ No newline at end of file
+if __name__ == "__main__":
+    run_mission()
@@ -0,0 +1,61 @@
+from pybricks.parameters import Axis
+from pybricks.tools import wait, StopWatch
+
+# 静定判定の既定値
+SPEED_TOLERANCE = 5      # 直進速度の許容値 [mm/s]
+RATE_TOLERANCE = 3       # 旋回速度・ジャイロ角速度の許容値 [deg/s]
+STABLE_MS = 40           # この時間だけ連続して許容値内なら静定とみなす
+TIMEOUT_MS = 1500        # 静定しなくてもこの時間で打ち切る
+POLL_MS = 10             # 判定の周期
+
+
+def is_settled(robot, hub, speed_tolerance=SPEED_TOLERANCE, rate_tolerance=RATE_TOLERANCE):
+    """動作が完了し、車輪速度とジャイロの角速度が許容値内か"""
+    if not robot.done():
+        return False
+    _, drive_speed, _, turn_rate = robot.state()
+    if abs(drive_speed) > speed_tolerance or abs(turn_rate) > rate_tolerance:
+        return False
+    return abs(hub.imu.angular_velocity(Axis.Z)) <= rate_tolerance
+
+
+def wait_until_settled(robot, hub, speed_tolerance=SPEED_TOLERANCE, rate_tolerance=RATE_TOLERANCE,
+                       stable_ms=STABLE_MS, timeout_ms=TIMEOUT_MS):
+    """ロボットが静止するまで待ち、かかった時間 [ms] を返す
+
+    固定の wait(1000) の代わりに使います。
+    timeout_ms を超えた場合は timeout_ms 以上の値が返ります。
+    """
+    watch = StopWatch()
+    stable_since = None
+    while True:
+        now = watch.time()
+        if is_settled(robot, hub, speed_tolerance, rate_tolerance):
+            if stable_since is None:
+                stable_since = now
+            if now - stable_since >= stable_ms:
+                return stable_since
+        else:
+            stable_since = None
+        if now >= timeout_ms:
+            return now
+        wait(POLL_MS)
+
+
+async def wait_until_settled_async(robot, hub, speed_tolerance=SPEED_TOLERANCE, rate_tolerance=RATE_TOLERANCE,
+                                   stable_ms=STABLE_MS, timeout_ms=TIMEOUT_MS):
+    """wait_until_settled() の非同期版（run_task の中で await して使う）"""
+    watch = StopWatch()
+    stable_since = None
+    while True:
+        now = watch.time()
+        if is_settled(robot, hub, speed_tolerance, rate_tolerance):
+            if stable_since is None:
+                stable_since = now
+            if now - stable_since >= stable_ms:
+                return stable_since
+        else:
+            stable_since = None
+        if now >= timeout_ms:
+            return now
+        await wait(POLL_MS)
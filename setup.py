@@ -2,6 +2,9 @@ from pybricks.hubs import PrimeHub
 from pybricks.parameters import Port, Axis, Direction, Stop
 from pybricks.pupdevices import Motor
 from pybricks.robotics import DriveBase
+from pybricks.tools import wait, StopWatch
+from calibration import load_calibration, print_calibration
+from compensation import use_tables
 
 def setup_hub():
     """ハブの向きを設定"""
@@ -13,7 +16,8 @@ def setup_motors():
     right = Motor(Port.B, positive_direction=Direction.CLOCKWISE)
     return left, right
 
-def setup_robot_parameters(left, right, straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100):
+def setup_robot_parameters(left, right, straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100,
+                           wheel_diameter=56, axle_track=115):
     """ロボットのパラメータ設定"""
     # 速度設定（パーセンテージで指定）
     straight_rate = straight_speed_percent          # 直進速度の最大値に対する割合
@@ -22,38 +26,29 @@ def setup_robot_parameters(left, right, straight_speed_percent=40, turn_speed_pe
     turn_spd = 500 * (turn_rate / 100)              # 割合に沿って速度を決定
 
     print(f"速度設定: 直進={straight_speed_percent}% ({straight_spd:.0f}mm/s), 旋回={turn_speed_percent}% ({turn_spd:.0f}deg/s)")
-    print(f"モーターパワー設定: {motor_power_percent}%")
 
     # ロボットパラメータ（実測に合わせると直進精度↑）
     robot = DriveBase(
                     left, 
                     right, 
-                    wheel_diameter=56, 
-                    axle_track=115   
+                    wheel_diameter=wheel_diameter, 
+                    axle_track=axle_track   
     )
 
     robot.settings(
         straight_speed=straight_spd,        # 直進速度
         turn_rate=turn_spd,                # 旋回速度
     )
-    
-    # モーターパワーの設定
-    motor_power = motor_power_percent / 100.0
-    left.dc(motor_power)
-    right.dc(motor_power)
-    
+
+    # motor_power_percent は互換のために残している引数
+    # （left.dc() / right.dc() で出力を決めても DriveBase の制御がすぐに上書きするため何もしない）
     return robot
 
-def setup_pid_control(robot):
+def setup_pid_control(robot, distance_pid=(1000, 50, 10), heading_pid=(2000, 50, 100)):
     """PID制御の設定"""
     # --- PIDゲイン変数の定義 ---
-    DISTANCE_KP = 1000
-    DISTANCE_KI = 50
-    DISTANCE_KD = 10
-
-    HEADING_KP = 2000
-    HEADING_KI = 50
-    HEADING_KD = 100
+    DISTANCE_KP, DISTANCE_KI, DISTANCE_KD = distance_pid
+    HEADING_KP, HEADING_KI, HEADING_KD = heading_pid
 
     # --- PIDゲインの設定 ---
     robot.distance_control.pid(
@@ -68,36 +63,81 @@ def setup_pid_control(robot):
         kd=HEADING_KD
     )
 
-def initialize_sensors(hub, robot):
+IMU_READY_TIMEOUT_MS = 3000   # IMU の準備完了（静止を検出してジャイロを補正し終わる）を待つ上限
+IMU_POLL_MS = 5
+
+def wait_for_imu(hub, timeout_ms=IMU_READY_TIMEOUT_MS):
+    """IMU が静止を検出して準備完了になるまで待ち、待った時間 [ms] を返す
+
+    決まった時間だけ待つのではなく hub.imu.ready() を見るので、置いたままなら待ち時間はほぼ 0 です。
+    timeout_ms を過ぎても準備完了にならなければ（ロボットを持っている・動いているなど）警告して続けます。
+    """
+    watch = StopWatch()
+    while not hub.imu.ready():
+        if watch.time() >= timeout_ms:
+            print(f"注意: IMU が {timeout_ms}ms で準備完了になりませんでした（ロボットを静止させてください）")
+            break
+        wait(IMU_POLL_MS)
+    return watch.time()
+
+def initialize_sensors(hub, robot, gyro_bias=0.0):
     """センサーとジャイロの初期化"""
+    if gyro_bias:
+        hub.imu.settings(angular_velocity_bias=(0, 0, gyro_bias))
     robot.use_gyro(True)
+    # heading の原点は IMU の準備ができてから決める
+    imu_ms = wait_for_imu(hub)
     hub.imu.reset_heading(0)
     robot.reset()
+    return imu_ms
+
+def initialize_robot(straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100, verbose=False):
+    """ロボットの完全な初期化
+
+    各段階の時間を測って1行にまとめて表示します。
+    verbose=True なら読み込んだキャリブレーション値も表示します。
+    """
+    watch = StopWatch()
+    times = []
 
-def initialize_robot(straight_speed_percent=40, turn_speed_percent=30, motor_power_percent=100):
-    """ロボットの完全な初期化"""
-    print("=== ロボット初期化開始 ===")
-    
     # ハブの設定
     hub = setup_hub()
-    print("✓ ハブ設定完了")
-    
+    times.append(("ハブ", watch.time()))
+
+    # 保存済みのキャリブレーション値を読み込む（なければ既定値）
+    calibration = load_calibration(hub)
+    use_tables(calibration["straight_table"], calibration["turn_table"])
+    if verbose:
+        print_calibration(calibration)
+    times.append(("キャリブレーション", watch.time()))
+
     # モーターの設定
     left, right = setup_motors()
-    print("✓ モーター設定完了")
-    
+    times.append(("モーター", watch.time()))
+
     # ロボットパラメータの設定
-    robot = setup_robot_parameters(left, right, straight_speed_percent, turn_speed_percent, motor_power_percent)
-    print("✓ ロボットパラメータ設定完了")
-    
+    robot = setup_robot_parameters(left, right, straight_speed_percent, turn_speed_percent, motor_power_percent,
+                                   calibration["wheel_diameter"], calibration["axle_track"])
     # PID制御の設定
-    setup_pid_control(robot)
-    print("✓ PID制御設定完了")
-    
-    # センサーの初期化
-    initialize_sensors(hub, robot)
-    print("✓ センサー初期化完了")
-    
-    print("=== ロボット初期化完了 ===")
-    
-    return hub, left, right, robot 
\ No newline at end of file
+    setup_pid_control(robot, calibration["distance_pid"], calibration["heading_pid"])
+    times.append(("DriveBase", watch.time()))
+
+    # センサーの初期化（IMU の準備完了を待つ）
+    initialize_sensors(hub, robot, calibration["gyro_bias"])
+    times.append(("IMU", watch.time()))
+
+    # 各段階の時間（前の段階が終わってからの差）を表示
+    stages = []
+    previous = 0
+    for name, end in times:
+        stages.append(f"{name} {end - previous}ms")
+        previous = end
+    saved = "保存値" if calibration["stored"] else "既定値"
+    print(f"ロボット初期化完了 {previous}ms（{', '.join(stages)}）キャリブレーション: {saved}")
+
+    return hub, left, right, robot
+
+
+if __name__ == "__main__":
+    # 起動から準備完了までの時間を測る（ハブに置いたまま実行する）
+    initialize_robot(verbose=True)
@@ -1,90 +1,38 @@
-from pybricks.hubs import PrimeHub
-from pybricks.parameters import Port, Axis, Direction
-from pybricks.pupdevices import Motor
-from pybricks.robotics import DriveBase
-from pybricks.tools import wait
-
-# --- 初期設定関数 ---
-def setup_hub():
-    return PrimeHub(top_side=Axis.Z, front_side=Axis.X)
-
-def setup_motors():
-    left = Motor(Port.F, positive_direction=Direction.COUNTERCLOCKWISE)
-    right = Motor(Port.B, positive_direction=Direction.CLOCKWISE)
-    return left, right
-
-def setup_robot_parameters(left, right, straight_speed_percent=40, motor_power_percent=100):
-    straight_spd = 500 * (straight_speed_percent / 100)
-    robot = DriveBase(
-        left,
-        right,
-        wheel_diameter=56,
-        axle_track=115
-    )
-    robot.settings(
-        straight_speed=straight_spd,
-        turn_rate=100
-    )
-    motor_power = motor_power_percent / 100.0
-    left.dc(motor_power)
-    right.dc(motor_power)
-    return robot
-
-def initialize_robot(straight_speed_percent=40, motor_power_percent=100):
-    hub = setup_hub()
-    left, right = setup_motors()
-    robot = setup_robot_parameters(left, right, straight_speed_percent, motor_power_percent)
-    robot.use_gyro(True)
-    hub.imu.reset_heading(0)
-    robot.reset()
-    return hub, left, right, robot
+from setup import initialize_robot
+from pybricks.tools import run_task
+from sweep import make_grid, run_sweep, print_table, print_tradeoff
+from compensation import build_table, print_table_literal
+from calibration import update_calibration
 
 # --- 実験条件 ---
 power_list = [40, 50, 60, 70, 80, 90, 100]
 distance_list = [d for d in range(20, 201, 20)]  # 20, 40, ..., 200
-repeat_num = 3
+repeat_num = 2      # 各条件の最少実験回数
+max_trials = 8      # 各条件の最多実験回数
+ci_width_mm = 2.0   # 平均誤差の95%信頼区間の幅がこれ以下になったら次の条件へ
+# 最も速い出力を選ぶときの許容誤差 [mm]
+tolerances_mm = [1.0, 2.0, 5.0]
 
-hub, left, right, robot = initialize_robot()
+# 最初に一度だけ初期化（保存済みのタイヤ径・トレッド幅・PID ゲインで、ミッションと同じ条件にする）
+hub, left, right, robot = initialize_robot(straight_speed_percent=40)
 
-all_results = []
-
-for power in power_list:
-    left.dc(power / 100)
-    right.dc(power / 100)
-    distance_results = []
-    for distance in distance_list:
-        errors = []
-        abs_errors = []
-        for trial in range(1, repeat_num + 1):
-            print(f"\n--- [出力{power}% 距離{distance}mm] 実験{trial}/{repeat_num} ---")
-            robot.reset()
-            robot.straight(distance)
-            wait(1000)
-            actual_distance = robot.distance()
-            error = actual_distance - distance
-            errors.append(error)
-            abs_errors.append(abs(error))
-            sign = "+" if error >= 0 else "-"
-            print(f"→ 実際の距離: {actual_distance:.1f}mm")
-            print(f"→ 誤差: {sign}{abs(error):.1f}mm")
-            print("→ {0}mm後退して元の位置に戻ります...".format(distance))
-            robot.straight(-distance)
-            wait(500)
-            print("-------------------------------")
-            robot.stop()
-            wait(200)
-        mean_error = sum(errors) / repeat_num
-        mean_abs_error = sum(abs_errors) / repeat_num
-        distance_results.append((distance, mean_error, mean_abs_error, repeat_num))
-    all_results.append((power, distance_results))
+# 出力は最大速度500mm/sに対する割合として直進速度に反映する
+conditions = make_grid(("power", power_list), ("distance", distance_list))
+results = run_task(run_sweep(hub, robot, "straight", conditions, repeat_num,
+                             ci_width=ci_width_mm, max_trials=max_trials))
 
 # 結果を罫線付き表形式で出力
-for power, distance_results in all_results:
-    print(f"\n=== モーター出力: {power}% の結果 ===")
-    print("+------------+----------------+-------------------+------------+")
-    print("| 指定距離[mm] | 平均誤差[mm]   | 平均絶対誤差[mm]   | 実験回数   |")
-    print("+------------+----------------+-------------------+------------+")
-    for distance, mean_error, mean_abs_error, repeat_num in distance_results:
-        sign = "+" if mean_error >= 0 else "-"
-        print(f"| {distance:>10} |   {sign}{abs(mean_error):>8.2f}   |      {mean_abs_error:>8.2f}      | {repeat_num:>6}    |")
-    print("+------------+----------------+-------------------+------------+")
+print_table(results, ("power", "distance"), "mm")
+
+# 距離ごとに、時間と誤差のパレートフロントと許容誤差ごとの最も速い出力を出力
+print_tradeoff(results, ("power",), "mm", tolerances_mm, group="distance")
+
+# 補正テーブルとして出力（compensation.py の STRAIGHT_TABLE に貼り付けると、
+# compensation.straight() がこの誤差を見込んで指令値を補正する）
+table = build_table(results, "distance")
+print_table_literal("STRAIGHT_TABLE", table)
+
+# 確認して y と答えたときだけハブにも保存する（次回から initialize_robot() が読み込んで使う）
+# 条件を減らした試しの実行で、本番用のテーブルを上書きしないため
+if input("この補正テーブルをハブに保存しますか？ (y/n): ") == "y":
+    update_calibration(hub, "straight_table", table)
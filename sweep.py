@@ -0,0 +1,362 @@
+from ustruct import pack, unpack_from
+from pybricks.tools import StopWatch
+from settle import wait_until_settled_async
+
+# 途中再開用データの保存場所（hub.system.storage の後半を使う）
+RESUME_OFFSET = 256
+RESUME_SIZE = 256
+RESUME_MAGIC = 0x5357          # "SW"
+HEADER_FORMAT = "<HHHH"        # マジック, 条件リストの署名, 次の条件番号, 保存済み行数
+ROW_FORMAT = "<hHBH"           # 平均誤差x100, 平均絶対誤差x100, 実験回数, 平均所要時間[ms]
+HEADER_SIZE = 8
+ROW_SIZE = 7
+
+# 条件の指定がないときの既定値
+DEFAULT_LIFT_SPEED = 180       # [deg/s]
+
+# t分布の両側95%点（自由度1〜30。それより大きい自由度は t_95() で近似）
+T_95 = [12.71, 4.30, 3.18, 2.78, 2.57, 2.45, 2.36, 2.31, 2.26, 2.23,
+        2.20, 2.18, 2.16, 2.14, 2.13, 2.12, 2.11, 2.10, 2.09, 2.09,
+        2.08, 2.07, 2.07, 2.06, 2.06, 2.06, 2.05, 2.05, 2.05, 2.04]
+Z_95 = 1.96
+
+
+def make_grid(*axes):
+    """(名前, 値のリスト) の全組み合わせを条件（dict）のリストにする
+
+    値が dict の場合はそのまま条件にまとめます（速度の組など）。
+    例: make_grid(("power", [40, 70]), ("distance", [100, 200]))
+    """
+    conditions = [{}]
+    for name, values in axes:
+        expanded = []
+        for base in conditions:
+            for value in values:
+                condition = dict(base)
+                if isinstance(value, dict):
+                    condition.update(value)
+                else:
+                    condition[name] = value
+                expanded.append(condition)
+        conditions = expanded
+    return conditions
+
+
+def apply_condition(robot, kind, condition):
+    """条件に含まれる速度・加速度の設定を DriveBase に反映"""
+    if kind == "lift":
+        return
+    if "straight_percent" in condition:
+        robot.settings(straight_speed=500 * condition["straight_percent"] / 100)
+    if "turn_percent" in condition:
+        robot.settings(turn_rate=500 * condition["turn_percent"] / 100)
+    if "power" in condition:
+        # 最大速度500に対する割合として設定（straight_accuracy_test.py と同じ換算）
+        speed = 500 * condition["power"] / 100
+        if kind == "straight":
+            robot.settings(straight_speed=speed)
+        else:
+            robot.settings(turn_rate=speed)
+    if "speed" in condition:
+        if kind == "straight":
+            robot.settings(straight_speed=condition["speed"])
+        else:
+            robot.settings(turn_rate=condition["speed"])
+    if "acceleration" in condition:
+        if kind == "straight":
+            robot.settings(straight_acceleration=condition["acceleration"])
+        else:
+            robot.settings(turn_acceleration=condition["acceleration"])
+
+
+def t_95(df):
+    """自由度 df の t分布の両側95%点"""
+    if df <= len(T_95):
+        return T_95[df - 1]
+    # 表より大きい自由度は正規分布の値に補正項を足して近似（自由度30以上で誤差0.01未満）
+    return Z_95 + (Z_95 ** 3 + Z_95) / (4 * df)
+
+
+def confidence_width(errors):
+    """平均誤差の95%信頼区間の幅（上限−下限）を返す（2回未満なら None）"""
+    n = len(errors)
+    if n < 2:
+        return None
+    mean = sum(errors) / n
+    variance = sum((e - mean) ** 2 for e in errors) / (n - 1)
+    return 2 * t_95(n - 1) * (variance / n) ** 0.5
+
+
+def _lift_speed(condition):
+    if "speed" in condition:
+        return condition["speed"]
+    if "power" in condition:
+        return 1000 * condition["power"] / 100
+    return DEFAULT_LIFT_SPEED
+
+
+async def measure_straight(hub, robot, condition):
+    """指定距離だけ直進して (誤差[mm], 所要時間[ms]) を返し、元の位置に戻る"""
+    target = condition["distance"]
+    robot.reset()
+    watch = StopWatch()
+    await robot.straight(target)
+    await wait_until_settled_async(robot, hub)
+    elapsed = watch.time()
+    actual = robot.distance()
+    await robot.straight(-actual)
+    await wait_until_settled_async(robot, hub)
+    return actual - target, elapsed
+
+
+async def measure_turn(hub, robot, condition):
+    """指定角度だけ旋回して (誤差[度], 所要時間[ms]) を返す
+
+    旋回前後の heading の差で測るので、heading のリセットは不要です。
+    """
+    target = condition["angle"]
+    start = hub.imu.heading()
+    watch = StopWatch()
+    await robot.turn(target)
+    await wait_until_settled_async(robot, hub)
+    elapsed = watch.time()
+    return hub.imu.heading() - start - target, elapsed
+
+
+async def measure_lift(lift, condition):
+    """アームを指定角度まで動かして (誤差[度], 所要時間[ms]) を返し、0度に戻す"""
+    target = condition["angle"]
+    speed = _lift_speed(condition)
+    watch = StopWatch()
+    await lift.run_target(speed, target)
+    elapsed = watch.time()
+    error = lift.angle() - target
+    await lift.run_target(speed, 0)
+    return error, elapsed
+
+
+def _signature(kind, conditions, repeat):
+    """条件リストが前回と同じか判定するための16ビットの署名"""
+    h = 0
+    for c in kind + str(repeat) + str([sorted(c.items()) for c in conditions]):
+        h = (h * 31 + ord(c)) & 0xFFFF
+    return h
+
+
+def _load_resume(hub, signature):
+    """保存済みの (次の条件番号, 結果の行) を読む（なければ (0, [])）"""
+    header = hub.system.storage(RESUME_OFFSET, read=HEADER_SIZE)
+    magic, saved_signature, next_index, count = unpack_from(HEADER_FORMAT, header)
+    if magic != RESUME_MAGIC or saved_signature != signature:
+        return 0, []
+    data = hub.system.storage(RESUME_OFFSET + HEADER_SIZE, read=count * ROW_SIZE)
+    rows = []
+    for i in range(count):
+        rows.append(unpack_from(ROW_FORMAT, data, i * ROW_SIZE))
+    return next_index, rows
+
+
+def _save_resume(hub, signature, next_index, result):
+    """完了した条件の結果を追記し、次の条件番号を更新"""
+    # 保存しきれない条件は番号だけ記録する（結果はターミナルのログに残っている）
+    index = next_index - 1
+    max_rows = (RESUME_SIZE - HEADER_SIZE) // ROW_SIZE
+    count = max_rows
+    if index < max_rows:
+        row = pack(ROW_FORMAT,
+                   max(-32768, min(32767, int(result["mean_error"] * 100))),
+                   min(65535, int(result["mean_abs_error"] * 100)),
+                   min(255, result["trials"]),
+                   min(65535, int(result["mean_time_ms"])))
+        hub.system.storage(RESUME_OFFSET + HEADER_SIZE + index * ROW_SIZE, write=row)
+        count = index + 1
+    hub.system.storage(RESUME_OFFSET, write=pack(HEADER_FORMAT, RESUME_MAGIC, signature, next_index, count))
+
+
+def clear_resume(hub):
+    """途中再開用データを消去（次回は最初から実行）"""
+    hub.system.storage(RESUME_OFFSET, write=pack(HEADER_FORMAT, 0, 0, 0, 0))
+
+
+def needs_more_trials(errors, repeat, ci_width, max_trials):
+    """この条件でさらに実験が必要か（逐次サンプリングの停止判定）"""
+    n = len(errors)
+    if n < repeat:
+        return True
+    if ci_width is None or n >= max_trials:
+        return False
+    width = confidence_width(errors)
+    return width is None or width > ci_width
+
+
+def _summarize(condition, errors, times):
+    n = len(errors)
+    result = dict(condition)
+    result["trials"] = n
+    result["errors"] = errors
+    result["mean_error"] = sum(errors) / n
+    result["mean_abs_error"] = sum(abs(e) for e in errors) / n
+    result["mean_time_ms"] = sum(times) / n
+    result["ci_width"] = confidence_width(errors)
+    return result
+
+
+async def run_sweep(hub, robot, kind, conditions, repeat=3, lift=None, prepare=None, measure=None, resume=True,
+                    ci_width=None, max_trials=10):
+    """条件リストの各条件で repeat 回ずつ実験し、条件ごとの結果（dict）のリストを返す
+
+    Args:
+        kind: "straight"（distance を直進）, "turn"（angle を旋回）, "lift"（angle までアームを回す）
+        conditions: 条件の dict のリスト（make_grid() で作れる）
+        lift: kind="lift" のときのアームのモーター
+        prepare: 各条件の実験前に prepare(condition) として呼ぶ関数（モーター出力の設定など）
+        measure: 独自の測定を行う async 関数。measure(condition) が (誤差, 所要時間[ms]) を返す
+        resume: True なら前回中断した条件から再開する（バッテリー交換など）
+        ci_width: 指定すると、平均誤差の95%信頼区間の幅がこの値以下になるまで
+            実験を追加する（repeat 回が最少、max_trials 回が最多）
+
+    1条件が終わるごとに結果を hub.system.storage に保存します。
+    """
+    signature = _signature(kind, conditions, repeat)
+    start_index, rows = (0, [])
+    if resume:
+        start_index, rows = _load_resume(hub, signature)
+    if start_index >= len(conditions):
+        start_index, rows = (0, [])
+    if start_index:
+        print(f"前回の続きから再開します: {start_index}/{len(conditions)} 条件完了済み")
+
+    results = []
+    for i in range(start_index):
+        result = dict(conditions[i])
+        if i < len(rows):
+            mean_error, mean_abs_error, trials, mean_time_ms = rows[i]
+            result["mean_error"] = mean_error / 100
+            result["mean_abs_error"] = mean_abs_error / 100
+            result["trials"] = trials
+            result["mean_time_ms"] = mean_time_ms
+            result["errors"] = None
+        results.append(result)
+
+    for index in range(start_index, len(conditions)):
+        condition = conditions[index]
+        apply_condition(robot, kind, condition)
+        if prepare is not None:
+            prepare(condition)
+
+        errors = []
+        times = []
+        while needs_more_trials(errors, repeat, ci_width, max_trials):
+            if measure is not None:
+                error, elapsed = await measure(condition)
+            elif kind == "straight":
+                error, elapsed = await measure_straight(hub, robot, condition)
+            elif kind == "turn":
+                error, elapsed = await measure_turn(hub, robot, condition)
+            else:
+                error, elapsed = await measure_lift(lift, condition)
+            errors.append(error)
+            times.append(elapsed)
+
+        result = _summarize(condition, errors, times)
+        results.append(result)
+        print(f"[{index + 1}/{len(conditions)}] {condition} 平均誤差={result['mean_error']:+.2f} "
+              f"平均絶対誤差={result['mean_abs_error']:.2f} 平均時間={result['mean_time_ms']:.0f}ms "
+              f"実験回数={result['trials']}")
+        if resume:
+            _save_resume(hub, signature, index + 1, result)
+
+    if resume:
+        clear_resume(hub)
+    return results
+
+
+def print_table(results, keys, unit):
+    """結果を罫線付き表形式で出力
+
+    keys は表に出す条件の名前、unit は誤差の単位（"mm" や "度"）です。
+    実験回数の列には、各条件で実際に行った回数（ci_width 指定時は条件ごとに違う）が出ます。
+    """
+    line = "+" + "+".join(["------------"] * len(keys)) + "+----------------+-------------------+----------+------------+------------+"
+    header = "|" + "|".join(f" {key:>10} " for key in keys)
+    header += f"| 平均誤差[{unit}]   | 平均絶対誤差[{unit}]   | 実験回数 | 平均時間[ms] | 95%CI幅    |"
+    print(line)
+    print(header)
+    print(line)
+    for result in results:
+        row = "|" + "|".join(f" {str(result.get(key, '')):>10} " for key in keys)
+        if result.get("mean_error") is None:
+            print(row + "|   （前回の実行で完了。値は保存されていません）")
+            continue
+        sign = "+" if result["mean_error"] >= 0 else "-"
+        row += f"|   {sign}{abs(result['mean_error']):>8.2f}   |      {result['mean_abs_error']:>8.2f}      "
+        row += f"| {result['trials']:>6}   | {result['mean_time_ms']:>8.0f}   |"
+        ci = result.get("ci_width")
+        row += f" {ci:>8.2f}   |" if ci is not None else "          -  |"
+        print(row)
+    print(line)
+
+
+def pareto_front(results, time_key="mean_time_ms", error_key="mean_abs_error"):
+    """時間と誤差のどちらでも他の条件に負けていない結果（パレート最適）を、速い順に返す
+
+    ある条件より「速くて誤差も小さい」条件があれば、その条件を選ぶ理由はありません。
+    残った条件は、速くするほど誤差が増える（誤差を減らすほど遅くなる）並びになります。
+    """
+    rows = [r for r in results if r.get(error_key) is not None and r.get(time_key) is not None]
+    rows.sort(key=lambda r: (r[time_key], r[error_key]))
+    front = []
+    for result in rows:
+        if not front or result[error_key] < front[-1][error_key]:
+            front.append(result)
+    return front
+
+
+def print_pareto(results, keys, unit, time_key="mean_time_ms", error_key="mean_abs_error"):
+    """パレート最適な条件だけを速い順に表で出力し、そのリストを返す"""
+    front = pareto_front(results, time_key, error_key)
+    print(f"\n=== 時間と誤差のパレートフロント（{len(front)}/{len(results)} 条件）===")
+    print_table(front, keys, unit)
+    return front
+
+
+def fastest_within(results, tolerance, time_key="mean_time_ms", error_key="mean_abs_error"):
+    """誤差が tolerance 以内の結果の中で最も速いものを返す（なければ None）
+
+    誤差が最小の条件は、たいてい最も遅い条件です。
+    ミッションの各区間で許せる誤差を決めておき、その範囲で最も速い設定を選びます。
+    """
+    for result in pareto_front(results, time_key, error_key):
+        if result[error_key] <= tolerance:
+            return result
+    return None
+
+
+def print_tradeoff(results, keys, unit, tolerances, group=None):
+    """パレートフロントと、許容誤差ごとの最も速い設定を表示
+
+    group に条件の名前（"distance" や "angle"）を指定すると、その値ごとに分けて比べます
+    （距離や角度が違えば時間も誤差も比べられないため）。
+    {(グループの値, 許容誤差): 結果} の dict を返します（group=None ならグループの値は None）。
+    """
+    groups = []
+    for result in results:
+        value = result.get(group) if group is not None else None
+        if value not in groups:
+            groups.append(value)
+    choices = {}
+    for value in groups:
+        rows = [r for r in results if group is None or r.get(group) == value]
+        if group is not None:
+            print(f"\n##### {group}={value} #####")
+        print_pareto(rows, keys, unit)
+        for tolerance in tolerances:
+            best = fastest_within(rows, tolerance)
+            choices[(value, tolerance)] = best
+            if best is None:
+                print(f"許容誤差 {tolerance}{unit}: 条件を満たす設定がありません")
+                continue
+            label = ", ".join(f"{key}={best.get(key)}" for key in keys)
+            print(f"許容誤差 {tolerance}{unit}: {label} "
+                  f"（{best['mean_time_ms']:.0f}ms, 平均絶対誤差 {best['mean_abs_error']:.2f}{unit}）")
+    return choices
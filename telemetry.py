@@ -0,0 +1,92 @@
+from array import array
+from pybricks.tools import wait, StopWatch
+
+# 記録する項目（dump() の列順）
+COLUMNS = "t_ms,dist_mm,heading_deg,left_deg,right_deg"
+
+
+class TelemetryRecorder:
+    """センサー値を固定周期で事前確保バッファに記録するレコーダー
+
+    走行中は print も BLE 通信も行わず、array に書き込むだけにします。
+    バッファが一杯になったら古いサンプルから上書きします（リングバッファ）。
+    記録した内容は走行終了後に dump() でまとめて出力します。
+    """
+
+    def __init__(self, hub, left, right, robot, period_ms=20, capacity=1000):
+        self.hub = hub
+        self.left = left
+        self.right = right
+        self.robot = robot
+        self.period_ms = period_ms
+        self.capacity = capacity
+
+        # バッファは最初に一度だけ確保する
+        self.t_ms = array("i", [0] * capacity)
+        self.dist = array("i", [0] * capacity)
+        self.heading = array("f", [0] * capacity)
+        self.left_deg = array("i", [0] * capacity)
+        self.right_deg = array("i", [0] * capacity)
+
+        self.index = 0      # 次に書き込む位置
+        self.count = 0      # 有効なサンプル数
+        self.active = False
+        self.watch = StopWatch()
+
+    def clear(self):
+        """記録内容を破棄して時刻を0に戻す"""
+        self.index = 0
+        self.count = 0
+        self.watch.reset()
+
+    def sample(self):
+        """現在のセンサー値を1サンプル記録"""
+        i = self.index
+        self.t_ms[i] = self.watch.time()
+        self.dist[i] = int(self.robot.distance())
+        self.heading[i] = self.hub.imu.heading()
+        self.left_deg[i] = self.left.angle()
+        self.right_deg[i] = self.right.angle()
+
+        i += 1
+        if i == self.capacity:
+            i = 0
+        self.index = i
+        if self.count < self.capacity:
+            self.count += 1
+
+    async def run(self):
+        """固定周期で sample() を呼び続ける非同期タスク
+
+        multitask(..., race=True) で走行タスクと一緒に実行すると、
+        走行タスクの終了と同時に記録も止まります。
+        """
+        self.clear()
+        self.active = True
+        next_ms = 0
+        while self.active:
+            self.sample()
+            # 処理時間の分だけ待ち時間を短くして周期を保つ
+            next_ms += self.period_ms
+            delay = next_ms - self.watch.time()
+            await wait(delay if delay > 0 else 0)
+
+    def stop(self):
+        """run() のループを次の周期で終了させる"""
+        self.active = False
+
+    def dump(self, label="TLM"):
+        """記録したサンプルを古い順にCSV形式でまとめて出力"""
+        start = self.index - self.count
+        if start < 0:
+            start += self.capacity
+
+        print(f"{label}:BEGIN period={self.period_ms}ms samples={self.count}")
+        print(f"{label}:{COLUMNS}")
+        i = start
+        for _ in range(self.count):
+            print(f"{self.t_ms[i]},{self.dist[i]},{self.heading[i]:.1f},{self.left_deg[i]},{self.right_deg[i]}")
+            i += 1
+            if i == self.capacity:
+                i = 0
+        print(f"{label}:END")
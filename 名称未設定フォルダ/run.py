@@ -28,7 +28,8 @@ def turn_with_power(robot,hub,angle_deg, motor_power):
     """
     robot.settings(turn_rate=abs(motor_power) * 5)  # 出力を回転速度に変換
     robot.turn(angle_deg)
+    # turn() は今の向きからの相対角度なので、毎回 heading をリセットする必要はない
+    # （hub は呼び出し側との互換のために残している引数）
     robot.stop()
-    hub.imu.reset_heading(0)
 
    
\ No newline at end of file